@@ -31,6 +31,9 @@ import sys
 from ..tools.load_tool import load_syn_tool, load_sim_tool
 from ..util import shell
 from ..sourcefiles import new_dep_solver as dep_solver
+from ..sourcefiles.parse_cache import ParseCache
+from ..sourcefiles.library_index import LibraryIndex
+from ..sourcefiles.symbol_index import SymbolIndex
 from ..sourcefiles.srcfile import VHDLFile, VerilogFile, SVFile
 from ..sourcefiles.sourcefileset import SourceFileSet
 from ..module.module import Module, ModuleArgs
@@ -114,26 +117,29 @@ class Action(object):
         logging.debug("End build complete file set")
         return all_manifested_files
 
+    def _is_parseable(self, file_aux):
+        """Check if the file can be parsed for the selected tool"""
+        if self.tool == None:
+            parseable_files = [VHDLFile, VerilogFile, SVFile]
+        else:
+            parseable_files = self.tool.get_parseable_files()
+        return any(isinstance(file_aux, file_type)
+                   for file_type in parseable_files)
+
     def build_file_set(self):
         """Initialize the parseable and privative fileset contents"""
         total_files = self.build_complete_file_set()
         for file_aux in total_files:
-            if self.tool == None:
-                if any(isinstance(file_aux, file_type)
-                       for file_type in [VHDLFile, VerilogFile, SVFile]):
-                    self.parseable_fileset.add(file_aux)
-                else:
-                    self.privative_fileset.add(file_aux)
+            if self._is_parseable(file_aux):
+                self.parseable_fileset.add(file_aux)
+            elif self.tool == None:
+                self.privative_fileset.add(file_aux)
+            elif any(isinstance(file_aux, file_type)
+                     for file_type in self.tool.get_privative_files()):
+                self.privative_fileset.add(file_aux)
             else:
-                if any(isinstance(file_aux, file_type)
-                       for file_type in self.tool.get_parseable_files()):
-                    self.parseable_fileset.add(file_aux)
-                elif any(isinstance(file_aux, file_type)
-                       for file_type in self.tool.get_privative_files()):
-                    self.privative_fileset.add(file_aux)
-                else:
-                    logging.debug("File not supported by the tool: %s",
-                                  file_aux.path)
+                logging.debug("File not supported by the tool: %s",
+                              file_aux.path)
         if len(self.privative_fileset) > 0:
             logging.info("Detected %d supported files that are not parseable",
                          len(self.privative_fileset))
@@ -142,16 +148,121 @@ class Action(object):
         if len(self.parseable_fileset) > 0:
             logging.info("Detected %d supported files that can be parsed",
                          len(self.parseable_fileset))
+        vlog_defines = self._get_vlog_defines()
+        for file_aux in self.parseable_fileset:
+            if isinstance(file_aux, VerilogFile):
+                file_aux.vlog_defines = vlog_defines
 
-    def solve_file_set(self):
-        """Build file set with only those files required by the top entity"""
+    def _get_vlog_defines(self):
+        """Get the Verilog macros defined when parsing the Verilog files:
+        the ones defined by the tool, overridden by the vlog_defines of the
+        top manifest"""
+        top_dict = self.top_manifest.manifest_dict
+        if self.tool is None:
+            vlog_defines = {}
+        else:
+            vlog_defines = self.tool.get_vlog_defines(top_dict)
+        for name, value in (top_dict.get("vlog_defines") or {}).items():
+            vlog_defines[name] = "" if value is None else str(value)
+        if vlog_defines:
+            logging.debug("Verilog defines: %s", vlog_defines)
+        return vlog_defines
+
+    def _build_library_index(self):
+        """Index the files of the library dirs of all the manifests, None if
+        there is no library dir"""
+        library = LibraryIndex()
+        vlog_defines = self._get_vlog_defines()
+
+        def make_create_file(manifest):
+            """Get the function creating the library files of the manifest"""
+            def create_file(path):
+                """Create the library file, None if it can't be parsed"""
+                file_aux = manifest.create_library_file(path)
+                if not self._is_parseable(file_aux):
+                    logging.debug("Library file not parseable by the "
+                                  "tool: %s", path)
+                    return None
+                if isinstance(file_aux, VerilogFile):
+                    file_aux.vlog_defines = vlog_defines
+                return file_aux
+            return create_file
+
+        for manifest in self.manifests:
+            if not manifest.library_dirs:
+                continue
+            create_file = make_create_file(manifest)
+            for library_dir in manifest.library_dirs:
+                library.add_dir(library_dir, manifest.library,
+                                manifest.library_exts, create_file)
+        if len(library) == 0:
+            return None
+        return library
+
+    def _load_symbol_indexes(self):
+        """Load the symbol index shipped by each one of the modules,
+        returning a dictionary mapping the modules to their index"""
+        indexes = {}
+        for manifest in self.manifests:
+            if not manifest.isfetched:
+                continue
+            index = SymbolIndex.load(manifest.path)
+            if index is not None:
+                indexes[manifest] = index
+        return indexes
+
+    def _get_lazy_tops(self, tops):
+        """Get the tops from which the lazy solve starts parsing, None if
+        all of the files must be parsed"""
+        if not self.options.lazy:
+            return None
+        if self.options.incremental:
+            logging.warning("--lazy is ignored by the incremental solve")
+            return None
+        if tops is None:
+            if self.options.all_files or self.top_entity is None:
+                return None
+            tops = [self.top_entity]
+        extra_modules = self.top_manifest.manifest_dict.get("extra_modules")
+        return list(tops) + list(extra_modules or [])
+
+    def solve_dependencies(self, tops=None):
+        """Parse the parseable fileset and solve the dependency graph, this
+        is only done once per run. The :param tops: are used by the lazy
+        solve, defaulting to the top entity"""
         if not self._deps_solved:
+            cache_dir = self.options.cache_dir
+            if cache_dir is None and self.options.incremental:
+                cache_dir = ".hdlmake_cache"
+            if cache_dir is None:
+                cache = None
+            else:
+                cache = ParseCache(cache_dir)
+            lazy_tops = self._get_lazy_tops(tops)
+            library = self._build_library_index()
+            indexes = self._load_symbol_indexes()
             if self.tool == None:
-                dep_solver.solve(self.parseable_fileset)
+                dep_solver.solve(self.parseable_fileset,
+                                 jobs=self.options.jobs,
+                                 cache=cache,
+                                 incremental=self.options.incremental,
+                                 tops=lazy_tops,
+                                 library=library,
+                                 indexes=indexes)
             else:
                 dep_solver.solve(self.parseable_fileset,
-                                 self.tool.get_standard_libs())
+                                 self.tool.get_standard_libs(),
+                                 jobs=self.options.jobs,
+                                 cache=cache,
+                                 incremental=self.options.incremental,
+                                 tops=lazy_tops,
+                                 library=library,
+                                 indexes=indexes)
             self._deps_solved = True
+
+    def solve_file_set(self):
+        """Build file set with only those files required by the top entity"""
+        self.solve_dependencies()
         if self.options.all_files:
             return
         solved_files = SourceFileSet()
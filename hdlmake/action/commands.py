@@ -34,6 +34,10 @@ from ..fetch.svn import Svn
 from ..fetch.git import Git, GitSM
 from ..fetch.local import Local
 from .action import Action
+from ..sourcefiles.sourcefileset import SourceFileSet
+from ..sourcefiles.srcfile import VerilogFile
+from ..sourcefiles.dep_file import DepFile, DepRelation
+from ..sourcefiles.symbol_index import SymbolIndex
 from ..util import shell
 
 
@@ -145,19 +149,21 @@ class Commands(Action):
             logging.info("There are no modules to be removed")
         logging.info("Modules cleaned.")
 
-    def list_files(self):
-        """List the files added to the design across the pool hierarchy"""
-        unfetched_modules = [mod_aux for mod_aux in self.manifests
-                             if not mod_aux.isfetched]
-        for mod_aux in unfetched_modules:
-            logging.warning(
-                "List incomplete, module %s has not been fetched!", mod_aux)
-        if self.options.top != None:
-            self.top_entity = self.options.top
-        self.build_file_set()
-        self.solve_file_set()
-        file_list = dep_solver.make_dependency_sorted_list(
-            self.parseable_fileset)
+    def _get_tops(self):
+        """Get the list of tops requested with --tops and --tops-file"""
+        tops = []
+        if self.options.tops is not None:
+            tops.extend(top.strip() for top in self.options.tops.split(","))
+        if self.options.tops_file is not None:
+            with open(self.options.tops_file, "r") as tops_file:
+                for line in tops_file:
+                    line = line.split("#")[0].strip()
+                    if line:
+                        tops.append(line)
+        return [top for top in tops if top]
+
+    def _format_file_list(self, file_list):
+        """Format the sorted :param file_list: as requested by the options"""
         if os.environ.get('HDLMAKE_LIST_FILES_FORMAT') is None:
             files_str = [file_aux.path for file_aux in file_list]
         else:
@@ -182,7 +188,65 @@ class Commands(Action):
             delimiter = "\n"
         else:
             delimiter = self.options.delimiter
-        print(delimiter.join(files_str))
+        return delimiter.join(files_str)
+
+    def list_files(self):
+        """List the files added to the design across the pool hierarchy"""
+        unfetched_modules = [mod_aux for mod_aux in self.manifests
+                             if not mod_aux.isfetched]
+        for mod_aux in unfetched_modules:
+            logging.warning(
+                "List incomplete, module %s has not been fetched!", mod_aux)
+        tops = self._get_tops()
+        if tops:
+            self._list_files_per_top(tops)
+            return
+        if self.options.top != None:
+            self.top_entity = self.options.top
+        self.build_file_set()
+        self.solve_file_set()
+        file_list = dep_solver.make_dependency_sorted_list(
+            self.parseable_fileset)
+        print(self._format_file_list(file_list))
+
+    def _list_files_per_top(self, tops):
+        """List the files required by each one of the :param tops:, all of
+        them being queried on the dependency graph solved once"""
+        self.build_file_set()
+        self.solve_dependencies(tops)
+        dep_sets = dep_solver.make_dependency_sets(
+            self.parseable_fileset, tops,
+            self.top_manifest.manifest_dict.get("extra_modules"))
+        for top, dep_file_set in dep_sets:
+            print("# %s" % top)
+            if dep_file_set is None:
+                continue
+            file_set = SourceFileSet()
+            file_set.add(dep_file_set)
+            file_list = dep_solver.make_dependency_sorted_list(file_set)
+            print(self._format_file_list(file_list))
+
+    def write_symbol_index(self):
+        """Parse the files of the top module and write their relations in
+        the symbol index shipped with it"""
+        # The files whose relations are declared in the manifest are left
+        # out: they are not parsed anyway.
+        file_list = [file_aux for file_aux in self.top_manifest.files.sort()
+                     if isinstance(file_aux, DepFile)
+                     and self._is_parseable(file_aux)
+                     and not file_aux.is_parsed]
+        vlog_defines = self._get_vlog_defines()
+        for file_aux in file_list:
+            if isinstance(file_aux, VerilogFile):
+                file_aux.vlog_defines = vlog_defines
+        dep_solver.parse_files(file_list, self.options.jobs)
+        index = SymbolIndex(self.top_manifest.path)
+        for file_aux in file_list:
+            index.store(file_aux)
+        DepRelation.clear_interned()
+        if index.save():
+            logging.info("Symbol index with %d files written to %s",
+                         len(file_list), index.filename)
 
     def _print_comment(self, message):
         """Private method that prints a message to stdout if not terse"""
@@ -92,6 +92,8 @@ def _action_runner(action):
         action.list_files()
     elif options.command == "tree":
         action.generate_tree()
+    elif options.command == "symbol-index":
+        action.write_symbol_index()
     else:
         raise AssertionError
 
@@ -158,6 +160,13 @@ def _get_parser():
     listfiles.add_argument(
         "--top", dest="top", default=None,
         help="print only those files required to build 'top'")
+    listfiles.add_argument(
+        "--tops", dest="tops", default=None,
+        help="comma separated list of tops: print, for each one of them, "
+             "the files required to build it, solving the design only once")
+    listfiles.add_argument(
+        "--tops-file", dest="tops_file", default=None,
+        help="same as --tops, reading the tops from a file (one per line)")
 
     tree = subparsers.add_parser(
         "tree",
@@ -170,6 +179,11 @@ def _get_parser():
         help="set the working mode for the tree generator: "
              "(mods, dfs, bfs)")
 
+    subparsers.add_parser(
+        "symbol-index",
+        help="write the symbol index of the files of the top module, so "
+             "that the designs using it as a module don't parse them")
+
     subparsers.add_parser(
         "manifest-help",
         help="print manifest file variables description")
@@ -181,6 +195,26 @@ def _get_parser():
     parser.add_argument(
         '-a', '--all', action='store_true', dest="all_files",
         help="use all the listed files, do not solve the fileset")
+    parser.add_argument(
+        "-j", "--jobs", dest="jobs", type=int, default=1,
+        help="number of processes used to parse the HDL files")
+    parser.add_argument(
+        "--cache-dir", dest="cache_dir", default=None,
+        help="reuse the parse results stored in CACHE_DIR for the "
+             "files that did not change since the previous run")
+    parser.add_argument(
+        "--cache", action='store_const', dest="cache_dir",
+        const=".hdlmake_cache",
+        help="same as '--cache-dir .hdlmake_cache'")
+    parser.add_argument(
+        "--incremental", default=False, action="store_true",
+        dest="incremental",
+        help="only solve again the dependencies affected by the files "
+             "that changed since the previous run (implies --cache)")
+    parser.add_argument(
+        "--lazy", default=False, action="store_true", dest="lazy",
+        help="only parse the files that can be reached from the top "
+             "entity, found by a quick scan of the files")
     parser.add_argument(
         "--log", dest="log", default="info",
         help="logging level: debug, info, warning, error, critical")
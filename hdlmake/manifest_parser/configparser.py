@@ -287,7 +287,8 @@ types:[<type 'int'>]
 
         # These HDLMake keys must not be inherited from parent module
         key_purge_list = ["modules", "files", "include_dirs",
-                          "inc_makefiles", "library"]
+                          "inc_makefiles", "library", "library_dirs",
+                          "library_exts", "noparse_files", "file_relations"]
         for key_to_be_deleted in key_purge_list:
             extra_context.pop(key_to_be_deleted, None)
         # Load the Manifest.py file content in a local variable
@@ -321,8 +322,9 @@ types:[<type 'int'>]
                     "Given option '%s' is of type %s: '%s', it doesn't match allowed types: (%s), file %s" %
                     (opt_name, str(type(val)), val, str(opt.types), self.config_file))
             ret[opt_name] = val
-            # This is only for the options of the dictionary class:
-            if isinstance(val, dict):
+            # This is only for the options of the dictionary class with
+            # a list of allowed keys:
+            if isinstance(val, dict) and self[opt_name].keys:
                 for key in val:
                     if key not in self[opt_name].keys:
                         raise RuntimeError(
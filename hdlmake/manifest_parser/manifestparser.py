@@ -49,6 +49,27 @@ class ManifestParser(ConfigParser):
              'default': None,
              'help': "Include dirs for Verilog sources",
              'type': []},
+            {'name': 'vlog_defines',
+             'default': {},
+             'help': "Verilog macros defined when parsing Verilog sources",
+             'type': {}},
+            {'name': 'noparse_files',
+             'default': None,
+             'help': "Files not parsed, providing nothing",
+             'type': []},
+            {'name': 'file_relations',
+             'default': {},
+             'help': "Files not parsed, providing and requiring the "
+                     "declared units",
+             'type': {}},
+            {'name': 'library_dirs',
+             'default': None,
+             'help': "Dirs of library files, only used when required",
+             'type': []},
+            {'name': 'library_exts',
+             'default': None,
+             'help': "Extensions of the files in the library dirs",
+             'type': []},
             {'name': 'action',
              'default': '',
              'help': "What is the action that should be taken if "
@@ -77,6 +98,9 @@ class ManifestParser(ConfigParser):
         self.add_option_list(general_options)
         self.add_delimiter()
         self.add_type('include_dirs', type_new="")
+        self.add_type('noparse_files', type_new="")
+        self.add_type('library_dirs', type_new="")
+        self.add_type('library_exts', type_new="")
         self.add_type('incl_makefiles', type_new='')
         self.add_type('files', type_new=[])
         self.add_allowed_key('modules', key="svn")
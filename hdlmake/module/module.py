@@ -39,6 +39,34 @@ from ..manifest_parser.manifestparser import ManifestParser
 import six
 
 
+# Extensions of the files looked for in the library dirs by default.
+LIBRARY_EXTS = (".v", ".sv", ".vhd", ".vhdl")
+
+
+def _parse_relation(spec, library):
+    """Get the DepRelation declared in a manifest by :param spec:, i.e.
+    '[type] [library.]name', the type defaulting to an entity or module and
+    the library to the :param library: of the module"""
+    from ..sourcefiles.dep_file import DepRelation
+    rel_types = {"entity": DepRelation.ENTITY,
+                 "module": DepRelation.MODULE,
+                 "package": DepRelation.PACKAGE,
+                 "architecture": DepRelation.ARCHITECTURE,
+                 "package body": DepRelation.PACKAGE_BODY,
+                 "package_body": DepRelation.PACKAGE_BODY,
+                 "context": DepRelation.CONTEXT,
+                 "configuration": DepRelation.CONFIGURATION}
+    words = str(spec).split()
+    if len(words) == 1:
+        rel_type = DepRelation.ENTITY
+    elif " ".join(words[:-1]).lower() in rel_types:
+        rel_type = rel_types[" ".join(words[:-1]).lower()]
+    else:
+        raise Exception("Unknown relation in manifest: {}".format(spec))
+    lib_name, _, obj_name = words[-1].rpartition(".")
+    return DepRelation(obj_name, lib_name or library, rel_type)
+
+
 class ModuleArgs(object):
     """This class is just a container for the main Module args"""
 
@@ -72,6 +100,9 @@ class Module(object):
         self.manifest_dict = {}
         # Manifest Files Properties
         self.files = None
+        self.library_dirs = []
+        self.library_exts = []
+        self._include_dirs = None
         # Manifest Modules Properties
         self.modules = {'local': [], 'git': [], 'gitsm': [], 'svn': []}
         self.incl_makefiles = []                # List of paths of makefile files to include.
@@ -134,6 +165,8 @@ class Module(object):
         logging.debug("Process manifest at: " + os.path.dirname(self.path))
         self._process_manifest_universal()
         self._process_manifest_files()
+        self._process_manifest_noparse()
+        self._process_manifest_library_dirs()
         self._process_manifest_modules()
         self._process_manifest_makefiles()
 
@@ -178,6 +211,18 @@ class Module(object):
                 paths.append(path_mod.rel2abs(filepath, self.path))
         return paths
 
+    def _get_include_dirs(self):
+        """Get the include dirs for the Verilog files of the module"""
+        if self._include_dirs is None:
+            # Check if this is the top module and grab the include_dirs
+            if self.parent is None:
+                include_dirs = self.manifest_dict.get('include_dirs', [])
+            else:
+                include_dirs = self.top_manifest.manifest_dict.get('include_dirs', [])
+                include_dirs.extend(self._make_list_of_paths(self.manifest_dict.get('include_dirs', [])))
+            self._include_dirs = include_dirs
+        return self._include_dirs
+
     def _create_file_list_from_paths(self, paths):
         """
         Build a Source File Set containing the files indicated by the
@@ -186,12 +231,7 @@ class Module(object):
         from ..sourcefiles.srcfile import create_source_file
         from ..sourcefiles.sourcefileset import SourceFileSet
         srcs = SourceFileSet()
-        # Check if this is the top module and grab the include_dirs
-        if self.parent is None:
-            include_dirs = self.manifest_dict.get('include_dirs', [])
-        else:
-            include_dirs = self.top_manifest.manifest_dict.get('include_dirs', [])
-            include_dirs.extend(self._make_list_of_paths(self.manifest_dict.get('include_dirs', [])))
+        include_dirs = self._get_include_dirs()
         for path_aux in paths:
             if os.path.isdir(path_aux):
                 # If a path is a dir, add all the files of that dir.
@@ -229,6 +269,75 @@ class Module(object):
             paths = self._make_list_of_paths(files)
             self.files = self._create_file_list_from_paths(paths=paths)
 
+    def _process_manifest_noparse(self):
+        """Process the files of the module that must not be parsed: the
+        ones in noparse_files, that provide nothing, and the ones whose
+        relations are declared in file_relations. They are never opened"""
+        from ..sourcefiles.dep_file import DepFile
+        declared = dict(
+            (filepath, {}) for filepath in
+            path_mod.flatten_list(self.manifest_dict.get('noparse_files')))
+        declared.update(self.manifest_dict.get('file_relations') or {})
+        if not declared:
+            return
+        files = dict((file_aux.path, file_aux) for file_aux in self.files)
+        for filepath, relations in sorted(declared.items()):
+            dep_file = files.get(path_mod.rel2abs(filepath, self.path))
+            if dep_file is None:
+                raise Exception(
+                    "File not parsed in manifest {} is not one of its "
+                    "files: {}".format(self.path, filepath))
+            unknown = set(relations) - set(["provides", "requires"])
+            if unknown:
+                raise Exception(
+                    "Unknown keys for {} in the file_relations of manifest "
+                    "{}: {}".format(filepath, self.path,
+                                    ", ".join(sorted(unknown))))
+            if not isinstance(dep_file, DepFile):
+                logging.warning("File %s is never parsed", filepath)
+                continue
+            for spec in path_mod.flatten_list(relations.get("provides")):
+                dep_file.add_provide(_parse_relation(spec, self.library))
+            for spec in path_mod.flatten_list(relations.get("requires")):
+                dep_file.add_require(_parse_relation(spec, self.library))
+            dep_file.is_parsed = True
+            logging.debug("File %s not parsed: %d provides, %d requires",
+                          dep_file.path, len(dep_file.provides),
+                          len(dep_file.requires))
+
+    def _process_manifest_library_dirs(self):
+        """Process the library dirs of the module, whose files are only
+        added when they provide a unit required by the other files"""
+        library_dirs = self.manifest_dict.get('library_dirs')
+        if not library_dirs:
+            return
+        self.library_dirs = []
+        for library_dir in path_mod.flatten_list(library_dirs):
+            library_dir = path_mod.rel2abs(library_dir, self.path)
+            if not os.path.isdir(library_dir):
+                raise Exception(
+                    "Library dir specified in manifest {} is not a "
+                    "directory: {}".format(self.path, library_dir))
+            self.library_dirs.append(library_dir)
+        library_exts = self.manifest_dict.get('library_exts')
+        if library_exts is None:
+            self.library_exts = list(LIBRARY_EXTS)
+        else:
+            self.library_exts = [
+                ext if ext.startswith(".") else "." + ext
+                for ext in path_mod.flatten_list(library_exts)]
+        logging.debug("Library dirs in %s: %s (extensions %s)", self.path,
+                      str(self.library_dirs), str(self.library_exts))
+
+    def create_library_file(self, path):
+        """Create the source file for the file at :param path: in one
+        of the library dirs"""
+        from ..sourcefiles.srcfile import create_source_file
+        return create_source_file(path=path,
+                                  module=self,
+                                  library=self.library,
+                                  include_dirs=self._get_include_dirs())
+
     def fetchto(self):
         """Get the fetchto folder for the module"""
         return os.path.dirname(self.path)
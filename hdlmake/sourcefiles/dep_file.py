@@ -27,29 +27,69 @@ import os
 import logging
 
 from ..util import path as path_mod
+from .dep_graph import strongly_connected_components
 import six
 
 
 class DepRelation(object):
 
-    """Class used to create instances representing HDL dependency relations"""
+    """Class used to create instances representing HDL dependency relations.
+    The relations are interned: creating a relation equal to an existing
+    one returns the existing instance, so the many files using the same
+    unit share it. They must not be modified"""
+
+    __slots__ = ("rel_type", "lib_name", "obj_name", "_hash")
 
     # rel_type
     # Architecture is never required.
     ENTITY = 1
     PACKAGE = 2
     ARCHITECTURE = 3
+    PACKAGE_BODY = 4
+    CONTEXT = 5
+    CONFIGURATION = 6
     MODULE = ENTITY
-
-    def __init__(self, obj_name, lib_name, rel_type):
-        assert rel_type in [
-            DepRelation.ENTITY,
-            DepRelation.PACKAGE,
-            DepRelation.ARCHITECTURE,
-            DepRelation.MODULE]
-        self.rel_type = rel_type
-        self.obj_name = obj_name.lower()
-        self.lib_name = None if lib_name is None else lib_name.lower()
+    # Type of the secondary units (never required either) for each type of
+    # primary unit. They must be analyzed after the primary unit, but the
+    # units using the primary unit don't depend on them.
+    SECONDARY_UNITS = {ENTITY: ARCHITECTURE, PACKAGE: PACKAGE_BODY}
+    # Relations created since the last solve, by (type, library, name)
+    # lowered.
+    _interned = {}
+
+    def __new__(cls, obj_name, lib_name, rel_type):
+        obj_name = obj_name.lower()
+        lib_name = None if lib_name is None else lib_name.lower()
+        key = (rel_type, lib_name, obj_name)
+        rel = cls._interned.get(key)
+        if rel is None:
+            assert rel_type in [
+                DepRelation.ENTITY,
+                DepRelation.PACKAGE,
+                DepRelation.ARCHITECTURE,
+                DepRelation.PACKAGE_BODY,
+                DepRelation.CONTEXT,
+                DepRelation.CONFIGURATION,
+                DepRelation.MODULE]
+            rel = object.__new__(cls)
+            rel.rel_type = rel_type
+            rel.obj_name = obj_name
+            rel.lib_name = lib_name
+            rel._hash = hash(key)
+            cls._interned[key] = rel
+        return rel
+
+    @classmethod
+    def clear_interned(cls):
+        """Forget the relations created so far, so that the process doesn't
+        keep them once their files are gone. The relations created
+        afterwards are still equal to them, but not shared with them"""
+        cls._interned = {}
+
+    def __reduce__(self):
+        # Unpickled relations, e.g. sent back by a parse worker, are
+        # interned again.
+        return (DepRelation, (self.obj_name, self.lib_name, self.rel_type))
 
     def satisfies(self, rel_b):
         """Check if the current dependency relation matches the provided one"""
@@ -62,17 +102,23 @@ class DepRelation(object):
             self.ENTITY: "entity",
             self.PACKAGE: "package",
             self.ARCHITECTURE: "architecture",
+            self.PACKAGE_BODY: "package body",
+            self.CONTEXT: "context",
+            self.CONFIGURATION: "configuration",
             self.MODULE: "module"}
         return "%s '%s.%s'" % (ostr[self.rel_type],
                                self.lib_name or '',
                                self.obj_name)
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return self._hash
 
     def __eq__(self, other):
-        return (isinstance(other, self.__class__)
-                and self.__dict__ == other.__dict__)
+        return self is other or (
+            isinstance(other, DepRelation)
+            and self.rel_type == other.rel_type
+            and self.obj_name == other.obj_name
+            and self.lib_name == other.lib_name)
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -82,6 +128,8 @@ class File(object):
 
     """This is the base class for all of the different files in HDLMake"""
 
+    __slots__ = ("path", "module")
+
     def __init__(self, path, module=None):
         self.path = path
         assert not isinstance(module, six.string_types)
@@ -119,6 +167,23 @@ class File(object):
     def __hash__(self):
         return hash(self.path)
 
+    def __getstate__(self):
+        # The module is not pickled, so that a file can be shipped to
+        # a parse worker without dragging the whole module hierarchy.
+        state = dict(getattr(self, "__dict__", {}))
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        state['module'] = None
+        if 'graph' in state:
+            state['graph'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def extension(self):
         """Method that gets the extension for the file instance"""
         tmp = self.path.rsplit('.')
@@ -132,16 +197,32 @@ class DepFile(File):
     parsed and solved (Verilog, SystemVerilog, VHDL).  Inherit from
     File but also provides dependencies"""
 
+    __slots__ = ("provides", "requires", "_depends_on", "graph", "graph_id",
+                 "included_files", "dep_level", "is_parsed")
+
     def __init__(self, path, module):
         assert isinstance(path, six.string_types)
         File.__init__(self, path=path, module=module)
         self.provides = set()
         self.requires = set()
-        self.depends_on = set()     # Set of files this file depends on.
+        self._depends_on = None
+        # DepGraph storing the solved dependencies, and id of the file in it.
+        self.graph = None
+        self.graph_id = None
         self.included_files = set()
         self.dep_level = None
         self.is_parsed = False
 
+    @property
+    def depends_on(self):
+        """Set of files this file depends on. Once the fileset has been
+        solved, this is a read-only view over the DepGraph arrays"""
+        if self.graph is not None:
+            return self.graph.view(self.graph_id)
+        if self._depends_on is None:
+            self._depends_on = set()
+        return self._depends_on
+
     def add_require(self, rel):
         """Add dependency :param rel:"""
         self.requires.add(rel)
@@ -161,20 +242,60 @@ class DepFile(File):
         """Get the dependency level for the file instance, so we can order
         later the full fileset"""
         if self.dep_level is None:
-            if len(self.depends_on) == 0:
-                self.dep_level = 0
-            else:
-                # set dep_level to a negative value so we can detect
-                # if the recusion below brings us back to
-                # this file in a circular reference, that would otherwise
-                # result in an infinite loop.
-                self.dep_level = -1
-                # recurse, to find the largest number of levels below.
-                self.dep_level = 1 + \
-                    max([dep.get_dep_level() for dep in self.depends_on])
-        elif self.dep_level < 0:
-            logging.warning("Probably run into a circular reference of file "
-                            "dependencies. It appears %s depends on itself, "
-                            "indirectly via atleast one other file.",
-                            self.path)
+            compute_dep_levels([self])
         return self.dep_level
+
+
+def _sorted_depends_on(dep_file):
+    """Get the files :param dep_file: depends on, sorted by path so that
+    the graph is always walked in the same order"""
+    return sorted(dep_file.depends_on, key=lambda x: x.path)
+
+
+def _set_component_level(component):
+    """Assign a common dependency level to all of the files in the strongly
+    connected :param component:, one level above the highest of the files
+    they depend on outside of the component"""
+    members = set(component)
+    level = 0
+    for member in component:
+        for dep_file in member.depends_on:
+            if dep_file not in members:
+                level = max(level, dep_file.dep_level + 1)
+    if len(component) > 1:
+        logging.warning("Found a circular reference between %d files, "
+                        "they will be given the same dependency level:\n %s",
+                        len(component),
+                        "\n ".join(sorted(member.path
+                                          for member in component)))
+    for member in component:
+        member.dep_level = level
+
+
+def compute_dep_levels(dep_files):
+    """Compute the dependency level of the :param dep_files: and of all of
+    the files they depend on, i.e. 0 for files without dependencies and one
+    more than the highest level of its dependencies for the others. Files
+    that already have a level are not visited again.
+
+    The strongly connected components are found in reverse topological
+    order, so the levels are assigned in O(V+E), and each circular reference
+    is reported once with all of the involved files. If the files have been
+    solved, the walk runs over the ids of the DepGraph"""
+    dep_files = list(dep_files)
+    graph = dep_files[0].graph if dep_files else None
+    if graph is not None and all(x.graph is graph for x in dep_files):
+        files = graph.files
+        components = strongly_connected_components(
+            sorted(x.graph_id for x in dep_files),
+            graph.successors,
+            lambda node: files[node].dep_level is not None)
+        for component in components:
+            _set_component_level([files[node] for node in component])
+    else:
+        components = strongly_connected_components(
+            sorted(dep_files, key=lambda x: x.path),
+            _sorted_depends_on,
+            lambda dep_file: dep_file.dep_level is not None)
+        for component in components:
+            _set_component_level(component)
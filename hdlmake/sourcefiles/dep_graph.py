@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the compact store for the solved dependency graph"""
+
+from __future__ import absolute_import
+from array import array
+from bisect import bisect_left
+
+try:
+    from collections.abc import Set
+except ImportError:
+    from collections import Set
+
+
+def strongly_connected_components(roots, successors, is_known):
+    """Generator walking the graph from the :param roots: with an iterative
+    version of Tarjan's algorithm, so that deep hierarchies can't exceed the
+    recursion limit. :param successors: is a function returning the nodes a
+    node depends on, and the nodes for which :param is_known: is True are
+    not visited. The strongly connected components are yielded as lists of
+    nodes in reverse topological order, i.e. a component is yielded after
+    all of the components it depends on"""
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    for root in roots:
+        if root in index or is_known(root):
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    if is_known(child):
+                        continue
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors(child))))
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    yield component
+
+
+class DepGraphView(Set):
+
+    """Read-only set of the files a file depends on, backed by the arrays
+    of a DepGraph"""
+
+    __slots__ = ("graph", "node")
+
+    def __init__(self, graph, node):
+        self.graph = graph
+        self.node = node
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def __contains__(self, dep_file):
+        if getattr(dep_file, "graph", None) is not self.graph:
+            return False
+        targets = self.graph.targets
+        begin = self.graph.offsets[self.node]
+        end = self.graph.offsets[self.node + 1]
+        pos = bisect_left(targets, dep_file.graph_id, begin, end)
+        return pos < end and targets[pos] == dep_file.graph_id
+
+    def __iter__(self):
+        files = self.graph.files
+        for node in self.graph.successors(self.node):
+            yield files[node]
+
+    def __len__(self):
+        return self.graph.offsets[self.node + 1] - self.graph.offsets[self.node]
+
+    def __repr__(self):
+        return "DepGraphView(%s)" % ", ".join(str(x) for x in self)
+
+
+class DepGraph(object):
+
+    """Class storing the dependency edges of a set of files in compact
+    arrays. Every file is given an integer id, following the order of
+    their paths, and the ids of the files each file depends on are stored,
+    sorted, as a row of a CSR (compressed sparse row) matrix: the row for
+    the file with id N is targets[offsets[N]:offsets[N + 1]]"""
+
+    def __init__(self, files):
+        self.files = sorted(files, key=lambda x: x.path)
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self._reverse = None
+        self._shared = None
+        # Reachable closure of the shared files walked by closure(), as
+        # bitsets. Each one takes up to N / 8 bytes for N files, so the memo
+        # grows as O(S * N / 8) with S shared files walked, e.g. ~40MB for
+        # 10k shared files out of 30k: it is only kept for the files depended
+        # on by several files, and clear_closures() drops it.
+        self._closures = {}
+        for node, dep_file in enumerate(self.files):
+            dep_file.graph = self
+            dep_file.graph_id = node
+
+    def __len__(self):
+        return len(self.files)
+
+    def add_row(self, nodes):
+        """Store the ids of the files the next file in id order depends
+        on. Rows must be added for all of the files, in id order"""
+        assert len(self.offsets) <= len(self.files)
+        self.targets.extend(sorted(set(nodes)))
+        self.offsets.append(len(self.targets))
+
+    def successors(self, node):
+        """Get the ids of the files the file :param node: depends on"""
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def view(self, node):
+        """Get the set-like view of the files :param node: depends on"""
+        return DepGraphView(self, node)
+
+    def _get_reverse(self):
+        """Get the CSR arrays of the reverse graph, i.e. the files
+        depending on each file"""
+        if self._reverse is None:
+            counts = array('l', [0]) * (len(self.files) + 1)
+            for target in self.targets:
+                counts[target + 1] += 1
+            for node in range(len(self.files)):
+                counts[node + 1] += counts[node]
+            sources = array('l', [0]) * len(self.targets)
+            fill = array('l', counts)
+            for node in range(len(self.files)):
+                for target in self.successors(node):
+                    sources[fill[target]] = node
+                    fill[target] += 1
+            self._reverse = (counts, sources)
+        return self._reverse
+
+    def _get_shared(self):
+        """Get the flags of the files depended on by more than one file"""
+        if self._shared is None:
+            counts = self._get_reverse()[0]
+            self._shared = bytearray(
+                counts[node + 1] - counts[node] > 1
+                for node in range(len(self.files)))
+        return self._shared
+
+    def reachable(self, roots, reverse=False):
+        """Get the ids of all the files reachable from the :param roots:,
+        including themselves. If :param reverse: is set, the edges are
+        followed backwards, i.e. the files depending on the roots are
+        returned"""
+        if reverse:
+            offsets, targets = self._get_reverse()
+        else:
+            offsets, targets = self.offsets, self.targets
+        visited = bytearray(len(self.files))
+        pending = []
+        for root in roots:
+            if not visited[root]:
+                visited[root] = 1
+                pending.append(root)
+        result = list(pending)
+        while pending:
+            node = pending.pop()
+            for target in targets[offsets[node]:offsets[node + 1]]:
+                if not visited[target]:
+                    visited[target] = 1
+                    pending.append(target)
+                    result.append(target)
+        return result
+
+    def closure(self, roots):
+        """Get the ids reachable from the :param roots:, including
+        themselves, as an integer bitset: the bit N is set for the file with
+        id N. The closure of the files depended on by several files is
+        memoized, so the parts of the hierarchy shared by several queries
+        are only walked once"""
+        closures = self._closures
+        shared = self._get_shared()
+        # Closures of the files with a single parent, only kept until the
+        # parent has read them.
+        pending = {}
+        kept = set(roots)
+        for component in strongly_connected_components(
+                roots, self.successors,
+                lambda node: node in closures or node in pending):
+            members = frozenset(component)
+            bits = 0
+            for node in component:
+                bits |= 1 << node
+            for node in component:
+                for target in self.successors(node):
+                    if target in members:
+                        continue
+                    # Targets outside the component are already known.
+                    if target in closures:
+                        bits |= closures[target]
+                    elif target in kept:
+                        bits |= pending[target]
+                    else:
+                        bits |= pending.pop(target)
+            for node in component:
+                if shared[node]:
+                    closures[node] = bits
+                else:
+                    pending[node] = bits
+        result = 0
+        for root in roots:
+            result |= closures[root] if root in closures else pending[root]
+        return result
+
+    def clear_closures(self):
+        """Drop the closures memoized by closure(), once the queries
+        sharing them have been answered"""
+        self._closures = {}
+
+    def bitset_files(self, bits):
+        """Get the files whose ids are set in the bitset :param bits:"""
+        digits = bin(bits)[:1:-1]
+        return [self.files[node] for node, digit in enumerate(digits)
+                if digit == "1"]
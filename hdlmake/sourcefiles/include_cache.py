@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the cache of the include files, shared by all of the
+preprocessors of a run, so that a header included by many files is only
+read and tokenized once"""
+
+from __future__ import absolute_import
+import os
+import logging
+
+from .source_reader import read_text
+
+# Tokens of every include file read, as (mtime, size, tokens) tuples
+# indexed by the absolute path of the file.
+_tokens = {}
+# Absolute path of the include files found, indexed by the parameters of
+# the search.
+_resolved = {}
+# Initial macro tables, indexed by the set of defines they were built from.
+_macros = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+def clear():
+    """Empty the cache, so that the files are read again by the next run"""
+    _tokens.clear()
+    _resolved.clear()
+    _macros.clear()
+    reset_stats()
+
+
+def reset_stats():
+    """Clear the counters of cache hits and misses, keeping the cache"""
+    _stats["hits"] = _stats["misses"] = 0
+
+
+def get_stats():
+    """Get a copy of the counters of cache hits and misses"""
+    return dict(_stats)
+
+
+def merge_stats(stats):
+    """Add the counters returned by get_stats() in another process"""
+    for name, count in stats.items():
+        _stats[name] += count
+
+
+def log_stats():
+    """Log the number of include files read and of reads saved"""
+    logging.debug("Include cache: %d hits, %d misses",
+                  _stats["hits"], _stats["misses"])
+
+
+def get_tokens(path, tokenize):
+    """Get the tokens of the include file at the absolute :param path:,
+    computed from the file contents by :param tokenize: unless the file
+    has not been modified since it was last tokenized"""
+    stat = os.stat(path)
+    entry = _tokens.get(path)
+    if (entry is not None and entry[0] == stat.st_mtime_ns
+            and entry[1] == stat.st_size):
+        _stats["hits"] += 1
+        return entry[2]
+    _stats["misses"] += 1
+    tokens = tuple(tokenize(read_text(path)))
+    _tokens[path] = (stat.st_mtime_ns, stat.st_size, tokens)
+    return tokens
+
+
+def resolve(key, search):
+    """Get the absolute path of an include file, calling :param search:
+    only the first time the search parameters in :param key: are seen"""
+    path = _resolved.get(key)
+    if path is None:
+        path = search()
+        _resolved[key] = path
+    return path
+
+
+def get_macros(defines, make_macro):
+    """Get the macro table the preprocessing starts from, mapping the name
+    of every macro in the :param defines: dictionary to the definition
+    built by :param make_macro: from its value. It is built once for every
+    set of defines and must not be modified"""
+    key = frozenset(defines.items())
+    macros = _macros.get(key)
+    if macros is None:
+        macros = dict((name, make_macro(value))
+                      for name, value in defines.items())
+        _macros[key] = macros
+    return macros
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the index of the library dirs, whose files are only
+added to the design when they provide a unit required by another file,
+like the files of the '-y' dirs of the Verilog simulators"""
+
+from __future__ import absolute_import
+import os
+import logging
+
+from .dep_file import DepRelation
+
+
+class LibraryIndex(object):
+
+    """Class indexing the files of the library dirs by library and by name
+    without extension, which must be the name of the unit they provide.
+    The files are neither read nor parsed until a unit is looked up"""
+
+    # Types of the relations that can be looked up: the primary units.
+    LOOKUP_TYPES = (DepRelation.ENTITY, DepRelation.PACKAGE,
+                    DepRelation.CONTEXT, DepRelation.CONFIGURATION)
+
+    def __init__(self):
+        # (library, name) -> (path, function creating the source file)
+        self._entries = {}
+        self._looked_up = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_dir(self, dir_path, library, exts, create_file):
+        """Index the files of :param dir_path: with one of the :param exts:
+        extensions, to be created in :param library: by calling
+        :param create_file: with their path. The dirs added first and the
+        extensions listed first take precedence"""
+        priorities = dict((ext.lower(), index)
+                          for index, ext in reversed(list(enumerate(exts))))
+        found = {}
+        for name in os.listdir(dir_path):
+            stem, ext = os.path.splitext(name)
+            priority = priorities.get(ext.lower())
+            if priority is None:
+                continue
+            key = (library.lower(), stem.lower())
+            if key not in found or priority < found[key][0]:
+                found[key] = (priority, os.path.join(dir_path, name))
+        for key, (_, path) in found.items():
+            self._entries.setdefault(key, (path, create_file))
+        logging.debug("Library dir %s: %d files indexed in library %s",
+                      dir_path, len(found), library)
+
+    def lookup(self, rel):
+        """Get the source file named after the unit required by
+        :param rel:. The file is created the first time its name is looked
+        up, None is returned if there is no such file or it was already
+        returned"""
+        if rel.rel_type not in self.LOOKUP_TYPES:
+            return None
+        key = (rel.lib_name, rel.obj_name)
+        entry = self._entries.get(key)
+        if entry is None or key in self._looked_up:
+            return None
+        self._looked_up.add(key)
+        path, create_file = entry
+        logging.debug("Library file %s provides %s", path, str(rel))
+        return create_file(path)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the fast path parsers for the post-synthesis netlists,
+that only look for the declared units and the cells they use"""
+
+from __future__ import absolute_import
+import logging
+import re
+
+from .new_dep_solver import DepParser
+from .dep_file import DepRelation
+from .vlog_parser import VerilogParser
+from .source_reader import map_file, decode
+
+
+# Verilog identifier, either simple or escaped (ended by a white space).
+_VLOG_NAME = br"(?:\\\S+(?=\s)|[A-Za-z_][\w$]*)"
+# Verilog attribute instance, matched without any ambiguity, so that a
+# line with many of them never makes the regex engine backtrack.
+_VLOG_ATTRIBUTE = br"\(\*[^*\n]*\*+(?:[^)*\n][^*\n]*\*+)*\)"
+# Beginning of a Verilog statement, preceded by any attribute instance.
+_VLOG_INDENT = br"[ \t]*(?:" + _VLOG_ATTRIBUTE + br"[ \t]*)*"
+# Declaration of a Verilog module.
+_VLOG_MODULE = br"(?:module|macromodule)\s+(?P<module>" + _VLOG_NAME + br")"
+# The statements looked for in Verilog netlists, i.e. the module
+# declarations and the cell instances.
+_VLOG_STATEMENT = (
+    _VLOG_INDENT + br"(?:" + _VLOG_MODULE +
+    br"|(?P<cell>" + _VLOG_NAME + br")\s+(?:#|" + _VLOG_NAME + br"\s*[(\[]))")
+# Declarations of the VHDL units, i.e. the entities and architectures.
+_VHDL_UNIT = (
+    br"entity\s+(?P<entity>\w+)\s+is\b"
+    br"|architecture\s+\w+\s+of\s+(?P<arch_entity>\w+)\s+is\b")
+# The statements looked for in VHDL netlists, i.e. the use clauses, the
+# units declared, the components declared and the direct instances.
+_VHDL_STATEMENT = (
+    br"[ \t]*(?:use\s+(?P<use_lib>\w+)\s*\.\s*(?P<use_pkg>\w+)"
+    br"|" + _VHDL_UNIT +
+    br"|component\s+(?P<component>\w+)"
+    br"|(?:\\[^\\\n]+\\|\w+)\s*:\s*entity\s+"
+    br"(?P<inst_lib>\w+)\s*\.\s*(?P<inst_entity>\w+))")
+
+
+def _compile(statement, flags=0):
+    """Compile the patterns matching :param statement: at the beginning of
+    the first line and of the following lines. The latter starts with the
+    newline ending the previous line, which lets the regex engine jump from
+    line to line"""
+    return (re.compile(statement, flags),
+            re.compile(br"\n" + statement, flags))
+
+
+_VLOG_PATTERNS = _compile(_VLOG_STATEMENT)
+_VHDL_PATTERNS = _compile(_VHDL_STATEMENT, re.IGNORECASE)
+# The declarations only, looked for by the scan of the lazy solve.
+_VLOG_PROVIDE_PATTERNS = _compile(_VLOG_INDENT + _VLOG_MODULE)
+_VHDL_PROVIDE_PATTERNS = _compile(br"[ \t]*(?:" + _VHDL_UNIT + br")",
+                                  re.IGNORECASE)
+
+
+def _iter_statements(path, patterns):
+    """Generator yielding the matches for the :param patterns: returned by
+    _compile() at the beginning of the lines of the file at :param path:"""
+    first_line, next_lines = patterns
+    with map_file(path) as buf:
+        match = first_line.match(buf)
+        if match is not None:
+            yield match
+        for match in next_lines.finditer(buf):
+            yield match
+
+
+class VerilogNetlistParser(DepParser):
+
+    """Class providing the parser for the Verilog netlists: the modules
+    declared are provided and the cells instantiated, but not declared, are
+    required. The file is neither preprocessed nor loaded in memory"""
+
+    def scan_provides(self, dep_file):
+        """Get the modules declared in the Verilog netlist, without looking
+        for the cells"""
+        modules = set(match.group("module") for match in _iter_statements(
+            dep_file.path, _VLOG_PROVIDE_PATTERNS))
+        return [DepRelation(decode(module_name), dep_file.library,
+                            DepRelation.MODULE)
+                for module_name in sorted(modules)]
+
+    def parse(self, dep_file):
+        """Parse the Verilog netlist :param dep_file:"""
+        assert not dep_file.is_parsed
+        logging.debug("Parsing netlist %s", dep_file.path)
+        # The same cells are instantiated over and over, so the names are
+        # only decoded once the duplicates are gone.
+        found = set(match.group("module", "cell") for match in
+                    _iter_statements(dep_file.path, _VLOG_PATTERNS))
+        modules = set(decode(module_name) for module_name, _ in found
+                      if module_name is not None)
+        cells = set(decode(cell_name) for _, cell_name in found
+                    if cell_name is not None)
+        cells.difference_update(modules)
+        cells.difference_update(VerilogParser.reserved_words)
+        logging.debug("found %d modules using %d cells in %s",
+                      len(modules), len(cells), dep_file.path)
+        for module_name in sorted(modules):
+            dep_file.add_provide(
+                DepRelation(module_name, dep_file.library,
+                            DepRelation.MODULE))
+        for cell_name in sorted(cells):
+            dep_file.add_require(
+                DepRelation(cell_name, dep_file.library, DepRelation.MODULE))
+        dep_file.is_parsed = True
+
+
+class VHDLNetlistParser(DepParser):
+
+    """Class providing the parser for the VHDL netlists: the entities and
+    architectures declared are provided, and the packages used, the entities
+    directly instantiated and the components declared are required. The
+    cells instantiated as components of the packages used are not
+    required, as the packages are. The file is not loaded in memory"""
+
+    def scan_provides(self, dep_file):
+        """Get the entities and architectures declared in the VHDL netlist,
+        without looking for the units it uses"""
+        provides = []
+        for match in _iter_statements(dep_file.path,
+                                      _VHDL_PROVIDE_PATTERNS):
+            if match.group("entity") is not None:
+                provides.append(
+                    DepRelation(decode(match.group("entity")),
+                                dep_file.library, DepRelation.ENTITY))
+            else:
+                provides.append(
+                    DepRelation(decode(match.group("arch_entity")),
+                                dep_file.library, DepRelation.ARCHITECTURE))
+        return provides
+
+    def parse(self, dep_file):
+        """Parse the VHDL netlist :param dep_file:"""
+        assert not dep_file.is_parsed
+        logging.debug("Parsing netlist %s", dep_file.path)
+        for match in _iter_statements(dep_file.path, _VHDL_PATTERNS):
+            if match.group("use_lib") is not None:
+                lib_name = decode(match.group("use_lib"))
+                if lib_name.lower() == "work":
+                    lib_name = dep_file.library
+                dep_file.add_require(
+                    DepRelation(decode(match.group("use_pkg")), lib_name,
+                                DepRelation.PACKAGE))
+            elif match.group("entity") is not None:
+                dep_file.add_provide(
+                    DepRelation(decode(match.group("entity")),
+                                dep_file.library, DepRelation.ENTITY))
+            elif match.group("arch_entity") is not None:
+                ent_name = decode(match.group("arch_entity"))
+                dep_file.add_provide(
+                    DepRelation(ent_name, dep_file.library,
+                                DepRelation.ARCHITECTURE))
+                dep_file.add_require(
+                    DepRelation(ent_name, dep_file.library,
+                                DepRelation.ENTITY))
+            elif match.group("component") is not None:
+                dep_file.add_require(
+                    DepRelation(decode(match.group("component")),
+                                dep_file.library, DepRelation.ENTITY))
+            else:
+                lib_name = decode(match.group("inst_lib"))
+                if lib_name.lower() == "work":
+                    lib_name = dep_file.library
+                dep_file.add_require(
+                    DepRelation(decode(match.group("inst_entity")), lib_name,
+                                DepRelation.ENTITY))
+        dep_file.is_parsed = True
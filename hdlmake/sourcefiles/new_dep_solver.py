@@ -26,54 +26,423 @@
 from __future__ import print_function
 from __future__ import absolute_import
 import logging
+import multiprocessing
 
-from ..sourcefiles.dep_file import DepFile
+from ..sourcefiles.dep_file import DepFile, compute_dep_levels
+from ..sourcefiles.dep_graph import DepGraph
+from ..sourcefiles import prefilter
+from ..sourcefiles import include_cache
 
 
 class DepParser(object):
 
-    """Base Class for the different HDL parsers (VHDL and Verilog)"""
+    """Base Class for the different HDL parsers (VHDL and Verilog). The
+    parsers hold no state, the results of a parse are stored in the parsed
+    file, so a single instance of each parser is shared by all of the files"""
 
-    def __init__(self, dep_file):
-        self.dep_file = dep_file
+    @classmethod
+    def get_shared(cls):
+        """Get the instance of the parser shared by all of the files"""
+        if "_shared" not in cls.__dict__:
+            cls._shared = cls()
+        return cls._shared
 
     def parse(self, dep_file):
         """Base dummy interface method for the HDL parse execution"""
         pass
 
+    def scan_provides(self, dep_file):
+        """Base interface method for the cheap scan used by the lazy solve:
+        return a superset of the relations provided by :param dep_file:
+        without fully parsing it, or None if the file must be parsed"""
+        return None
 
-def solve(fileset, standard_libs=None):
+
+def _relation_key(rel):
+    """Get the (type, library, name) tuple used to index the relation"""
+    return (rel.rel_type, rel.lib_name, rel.obj_name)
+
+
+def _top_keys(top_name):
+    """Get the keys of the relations providing the top :param top_name:,
+    either a module/entity or a VHDL configuration"""
+    from .dep_file import DepRelation
+    return [(DepRelation.MODULE, "work", top_name.lower()),
+            (DepRelation.CONFIGURATION, "work", top_name.lower())]
+
+
+def _secondary_keys(provides):
+    """Get the keys of the secondary units (architectures and package
+    bodies) of the primary units in the relations :param provides:"""
+    from .dep_file import DepRelation
+    return [(DepRelation.SECONDARY_UNITS[rel.rel_type], rel.lib_name,
+             rel.obj_name)
+            for rel in provides if rel.rel_type in DepRelation.SECONDARY_UNITS]
+
+
+def _add_secondary_files(dep_file_set, provider_index, closure):
+    """Add to :param dep_file_set: the files providing the secondary units
+    of the primary units it provides, as well as the files returned for
+    them by :param closure:, until no more secondary unit is missing. The
+    secondary units are not required by the files using the primary units,
+    so they are not reached by walking the dependency graph"""
+    pending = list(dep_file_set)
+    while pending:
+        missing = set()
+        for dep_file in pending:
+            for key in _secondary_keys(dep_file.provides):
+                missing.update(secondary_file for secondary_file
+                               in provider_index.get(key, [])
+                               if secondary_file not in dep_file_set)
+        pending = [dep_file for dep_file in closure(missing)
+                   if dep_file not in dep_file_set]
+        dep_file_set.update(pending)
+    return dep_file_set
+
+
+def _build_provider_index(fset):
+    """Build a dictionary mapping the key of every provided relation to
+    the list of files in the fileset that provide it"""
+    provider_index = {}
+    for dep_file in fset:
+        for rel in dep_file.provides:
+            provider_index.setdefault(_relation_key(rel), []).append(dep_file)
+    return provider_index
+
+
+def _parse_worker(dep_file):
+    """Parse a detached copy of :param dep_file: in a worker process and
+    return only the relations found and the prefilter and include cache
+    counters, so that they can be merged back"""
+    prefilter.reset_stats()
+    include_cache.reset_stats()
+    dep_file.parser.parse(dep_file)
+    return (dep_file.provides, dep_file.requires, dep_file.included_files,
+            prefilter.get_stats(), include_cache.get_stats())
+
+
+def _parse_parallel(file_list, jobs):
+    """Parse the files in :param file_list: using a pool of :param jobs:
+    processes. The results are merged back into the original files in the
+    same order as the list, so that the outcome does not depend on which
+    worker finished first"""
+    logging.debug("Parsing %d files using %d jobs", len(file_list), jobs)
+    pool = multiprocessing.Pool(processes=jobs)
+    try:
+        results = pool.map(_parse_worker, file_list)
+    finally:
+        pool.close()
+        pool.join()
+    for dep_file, (provides, requires, included_files, stats,
+                   include_stats) in zip(file_list, results):
+        dep_file.provides.update(provides)
+        dep_file.requires.update(requires)
+        dep_file.included_files.update(included_files)
+        dep_file.is_parsed = True
+        prefilter.merge_stats(stats)
+        include_cache.merge_stats(include_stats)
+
+
+def parse_files(file_list, jobs):
+    """Parse the files in :param file_list:, across :param jobs: processes"""
+    if jobs > 1 and len(file_list) > 1:
+        _parse_parallel(file_list, jobs)
+    else:
+        for investigated_file in file_list:
+            logging.debug("INVESTIGATED FILE: %s", investigated_file)
+            investigated_file.parser.parse(investigated_file)
+
+
+def _add_library_file(rel, library, fileset, fset, cache):
+    """Get the file of the :param library: index named after the unit
+    required by :param rel:, added to the :param fileset: and to the parsed
+    :param fset: and filled from the :param cache: if possible, or None if
+    there is no such file or it was already added"""
+    if library is None:
+        return None
+    lib_file = library.lookup(rel)
+    if lib_file is None or not isinstance(lib_file, DepFile):
+        return None
+    fileset.add(lib_file)
+    fset.add(lib_file)
+    if cache is not None:
+        cache.lookup(lib_file)
+    return lib_file
+
+
+def _parse_libraries(fileset, fset, library, cache, jobs):
+    """Add to the :param fileset: and to the parsed :param fset: the files
+    of the :param library: index providing the relations not provided by
+    any file, parsing them, and the ones they require in turn. Return the
+    list of files parsed"""
+    provided = set(_relation_key(rel) for dep_file in fset
+                   for rel in dep_file.provides)
+    parsed_files = []
+    pending = sorted(fset, key=lambda dep_file: dep_file.path)
+    while pending:
+        added = []
+        for dep_file in pending:
+            for rel in dep_file.requires:
+                if _relation_key(rel) in provided:
+                    continue
+                lib_file = _add_library_file(rel, library, fileset, fset,
+                                             cache)
+                if lib_file is not None:
+                    added.append(lib_file)
+        added.sort(key=lambda dep_file: dep_file.path)
+        to_parse = [dep_file for dep_file in added if not dep_file.is_parsed]
+        parse_files(to_parse, jobs)
+        parsed_files.extend(to_parse)
+        for dep_file in added:
+            provided.update(_relation_key(rel) for rel in dep_file.provides)
+        pending = added
+    if parsed_files:
+        logging.info("%d files added from the library dirs",
+                     len(parsed_files))
+    return parsed_files
+
+
+def _parse_lazy(fset, not_parsed, tops, jobs, add_library_file=None):
+    """Parse only the files of :param not_parsed: that can be reached from
+    the files providing the :param tops: modules. The relations provided by
+    every file are first found by the cheap scan of its parser, then the
+    files are parsed level by level, following the required relations from
+    the tops. The relations that no file provides are passed to the
+    :param add_library_file: function, which can add a file providing them
+    to the fset. Return the list of parsed files, or None if no file
+    provides any of the tops"""
+    from .dep_file import DepRelation
+    candidates = {}
+    pending = []
+    not_parsed_set = set(not_parsed)
+    for dep_file in sorted(fset, key=lambda dep_file: dep_file.path):
+        if dep_file in not_parsed_set and not dep_file.is_parsed:
+            provides = dep_file.parser.scan_provides(dep_file)
+            if provides is None:
+                pending.append(dep_file)
+                continue
+        else:
+            provides = dep_file.provides
+        for rel in provides:
+            candidates.setdefault(_relation_key(rel), []).append(dep_file)
+    # The files that can't be scanned are always parsed.
+    parse_files(pending, jobs)
+    for dep_file in pending:
+        for rel in dep_file.provides:
+            candidates.setdefault(_relation_key(rel), []).append(dep_file)
+    parsed_files = list(pending)
+    frontier = []
+    for top in tops:
+        for key in _top_keys(top):
+            frontier.extend(candidates.get(key, []))
+    if not frontier:
+        return None
+    reached = set(frontier)
+    while frontier:
+        to_parse = [dep_file for dep_file in frontier
+                    if not dep_file.is_parsed]
+        parse_files(to_parse, jobs)
+        parsed_files.extend(to_parse)
+        next_frontier = []
+        for dep_file in frontier:
+            keys = [_relation_key(rel) for rel in dep_file.requires]
+            keys.extend(_secondary_keys(dep_file.provides))
+            for key in keys:
+                if key not in candidates and add_library_file is not None:
+                    lib_file = add_library_file(
+                        DepRelation(key[2], key[1], key[0]))
+                    if lib_file is not None:
+                        candidates[key] = [lib_file]
+                for required_file in candidates.get(key, []):
+                    if required_file not in reached:
+                        reached.add(required_file)
+                        next_frontier.append(required_file)
+        frontier = next_frontier
+    logging.info("Lazy solve: %d of %d files reached from the tops",
+                 len(reached), len(fset))
+    return parsed_files
+
+
+def _get_dirty_files(fset, parsed_files, cache):
+    """Get the files of :param fset: whose dependencies must be solved
+    again, given the :param parsed_files: that were (re)parsed in this run
+    and the graph solved in the previous run and stored in the :param cache:
+    -- i.e. the changed or added files, and the files requiring a relation
+    whose providers have changed"""
+    if len(set(dep_file.path for dep_file in fset)) != len(fset):
+        # The graph is stored by path, so it can't describe a fileset
+        # in which the same file is used twice.
+        return set(fset)
+    dirty_files = set(parsed_files)
+    dirty_keys = set()
+    for dep_file in parsed_files:
+        old_keys = set(_relation_key(rel) for rel in
+                       cache.get_previous_provides(dep_file.path))
+        new_keys = set(_relation_key(rel) for rel in dep_file.provides)
+        dirty_keys.update(old_keys.symmetric_difference(new_keys))
+    current_paths = set(dep_file.path for dep_file in fset)
+    solved_paths = cache.get_solved_paths()
+    for removed_path in solved_paths - current_paths:
+        dirty_keys.update(_relation_key(rel) for rel in
+                          cache.get_previous_provides(removed_path))
+    for dep_file in fset:
+        # The files missing from the previous graph may be parse cache
+        # hits, whose provides were not compared above.
+        if dep_file.path not in solved_paths:
+            dirty_keys.update(_relation_key(rel) for rel in dep_file.provides)
+    for dep_file in fset:
+        if dep_file in dirty_files:
+            continue
+        if not cache.is_solved(dep_file.path):
+            dirty_files.add(dep_file)
+        elif not current_paths.issuperset(
+                cache.get_depends_on(dep_file.path)):
+            dirty_files.add(dep_file)
+        elif any(_relation_key(rel) in dirty_keys
+                 for rel in dep_file.requires):
+            dirty_files.add(dep_file)
+    logging.debug("Incremental solve: %d of %d files must be solved again",
+                  len(dirty_files), len(fset))
+    return dirty_files
+
+
+def _update_dep_levels(graph, dirty_files, cache):
+    """Restore the dependency level stored in the :param cache: for the
+    files of the :param graph: that don't depend, even indirectly, on any
+    of the :param dirty_files:, and compute the level of the remaining ones"""
+    affected = bytearray(len(graph))
+    dirty_ids = [dep_file.graph_id for dep_file in dirty_files]
+    for node in graph.reachable(dirty_ids, reverse=True):
+        affected[node] = 1
+    for dep_file in graph.files:
+        if not affected[dep_file.graph_id]:
+            dep_file.dep_level = cache.get_dep_level(dep_file.path)
+    compute_dep_levels(graph.files)
+
+
+def _lookup_indexes(not_parsed, indexes):
+    """Fill the files of :param not_parsed: from the SymbolIndex of their
+    module in the :param indexes: dictionary, if it still describes them"""
+    for dep_file in not_parsed:
+        index = indexes.get(dep_file.module)
+        if index is not None:
+            index.lookup(dep_file)
+    for index in indexes.values():
+        if index.hits or index.misses:
+            logging.info("Symbol index %s: %d files reused, %d parsed",
+                         index.filename, index.hits, index.misses)
+
+
+def solve(fileset, standard_libs=None, jobs=1, cache=None,
+          incremental=False, tops=None, library=None, indexes=None):
     """Function that Parses and Solves the provided HDL fileset. Note
-       that it doesn't return a new fileset, but modifies the original one"""
+       that it doesn't return a new fileset, but modifies the original one.
+       The parse stage is distributed across :param jobs: processes, and
+       files found in the optional ParseCache :param cache: are not parsed.
+       If :param incremental: is set, the graph solved in the previous run
+       is loaded from the cache and only the edges affected by the changed,
+       added or removed files are solved again. If the list of :param tops:
+       is provided, only the files reachable from them are parsed. The
+       files of the LibraryIndex :param library: are only added to the
+       fileset, and parsed, when they provide a unit that no other file
+       provides. The files of the modules in the :param indexes: dictionary
+       are not parsed if their SymbolIndex still describes them"""
     from .sourcefileset import SourceFileSet
     from .dep_file import DepRelation
     assert isinstance(fileset, SourceFileSet)
+    assert cache is not None or not incremental
+    assert tops is None or not incremental
     fset = fileset.filter(DepFile)
     # print(fileset)
     # print(fset)
     logging.debug("PARSE BEGIN: Here, we will parse all the files in the "
                   "fileset: no parsing should be done beyond this point")
-    for investigated_file in fset:
-        logging.debug("INVESTIGATED FILE: %s", investigated_file)
-        if not investigated_file.is_parsed:
-            logging.debug("Not parsed yet, let's go!")
-            investigated_file.parser.parse(investigated_file)
+    prefilter.reset_stats()
+    include_cache.clear()
+    not_parsed = sorted([dep_file for dep_file in fset
+                         if not dep_file.is_parsed],
+                        key=lambda dep_file: dep_file.path)
+    declared_changed = []
+    if cache is not None:
+        # The relations of the files parsed beforehand were declared in the
+        # manifests, so they are compared with the recorded ones instead of
+        # reading the files.
+        declared_changed = [
+            dep_file for dep_file in sorted(fset, key=lambda f: f.path)
+            if dep_file.is_parsed and cache.update_declared(dep_file)]
+        not_parsed = [dep_file for dep_file in not_parsed
+                      if not cache.lookup(dep_file)]
+    if indexes:
+        # The files filled from the indexes are stored in the cache as if
+        # they were parsed, so that the incremental solve sees them.
+        _lookup_indexes(not_parsed, indexes)
+    # The files parsed by the lazy solve, None if all of them are parsed.
+    lazy_parsed = None
+    if tops is not None:
+        if library is None:
+            add_library_file = None
+        else:
+            def add_library_file(rel):
+                """Add the library file providing :param rel:"""
+                return _add_library_file(rel, library, fileset, fset, cache)
+        lazy_parsed = _parse_lazy(fset, not_parsed, tops, jobs,
+                                  add_library_file)
+        if lazy_parsed is None:
+            logging.warning("None of the tops (%s) was found by the scan, "
+                            "parsing all of the files", ", ".join(tops))
+            parse_files([dep_file for dep_file in not_parsed
+                          if not dep_file.is_parsed], jobs)
+        else:
+            not_parsed = lazy_parsed
+    else:
+        parse_files([dep_file for dep_file in not_parsed
+                      if not dep_file.is_parsed], jobs)
+    if library is not None and lazy_parsed is None:
+        not_parsed = not_parsed + _parse_libraries(fileset, fset, library,
+                                                   cache, jobs)
+    if cache is not None:
+        for dep_file in not_parsed:
+            cache.store(dep_file)
+    prefilter.log_stats()
+    include_cache.log_stats()
     logging.debug("PARSE END: now the parsing is done")
 
     logging.debug("SOLVE BEGIN")
+    provider_index = _build_provider_index(fset)
+    graph = DepGraph(fset)
+    if incremental:
+        dirty_files = _get_dirty_files(fset, not_parsed + declared_changed,
+                                       cache)
+        path_index = dict((dep_file.path, dep_file) for dep_file in fset)
+    else:
+        dirty_files = fset
+    # Relations not satisfied by exactly one file, for each file.
+    reported = {}
     not_satisfied = 0
-    for investigated_file in fset:
+    # The rows of the graph are added following the file ids.
+    for investigated_file in graph.files:
         # logging.info("INVESTIGATED FILE: %s" % investigated_file)
-        for rel in investigated_file.requires:
+        depends_on = set()
+        if investigated_file in dirty_files:
+            relations = investigated_file.requires
+        else:
+            # The edges are still valid, but the warnings for the
+            # ambiguous or unsatisfied relations are issued again.
+            depends_on.update(
+                path_index[path].graph_id for path in
+                cache.get_depends_on(investigated_file.path))
+            relations = cache.get_reported(investigated_file.path)
+        reported[investigated_file] = []
+        for rel in relations:
             # logging.info("- relation: %s" % rel)
             # Only analyze USE relations, we are looking for dependencies
-            satisfied_by = set()
-            for dep_file in fset:
-                if dep_file.satisfies(rel):
-                    if dep_file is not investigated_file:
-                        # A file cannot depends on itself.
-                        investigated_file.depends_on.add(dep_file)
-                    satisfied_by.add(dep_file)
+            satisfied_by = provider_index.get(_relation_key(rel), [])
+            for dep_file in satisfied_by:
+                if dep_file is not investigated_file:
+                    # A file cannot depends on itself.
+                    depends_on.add(dep_file.graph_id)
+            if len(satisfied_by) != 1:
+                reported[investigated_file].append(rel)
             if len(satisfied_by) > 1:
                 logging.warning(
                     "Relation %s satisfied by multiple (%d) files:\n %s",
@@ -82,11 +451,12 @@ def solve(fileset, standard_libs=None):
                     '\n '.join([file_aux.path for
                                file_aux in list(satisfied_by)]))
             elif len(satisfied_by) == 0:
-                # if relation is a USE PACKAGE, check against
+                # if relation is a USE PACKAGE or CONTEXT, check against
                 # the standard libs provided by the tool HDL compiler
                 required_lib = rel.lib_name
                 if (standard_libs is not None
-                     and rel.rel_type is DepRelation.PACKAGE
+                     and rel.rel_type in (DepRelation.PACKAGE,
+                                          DepRelation.CONTEXT)
                      and required_lib in standard_libs):
                     logging.debug("Not satisfied relation %s in %s will "
                                   "be covered by the target compiler "
@@ -97,6 +467,14 @@ def solve(fileset, standard_libs=None):
                                     "any source file",
                                     str(rel), investigated_file.name)
                     not_satisfied += 1
+        graph.add_row(depends_on)
+    if incremental:
+        _update_dep_levels(graph, dirty_files, cache)
+        cache.store_graph(fset, reported)
+    if cache is not None:
+        cache.save(set(dep_file.path for dep_file in fset))
+    # The files keep their relations, which are no longer looked up.
+    DepRelation.clear_interned()
     logging.debug("SOLVE END")
     if not_satisfied != 0:
         logging.warning(
@@ -113,10 +491,10 @@ def make_dependency_sorted_list(fileset):
     All files that another depends on will be earlier in the list."""
     dependable = [f for f in fileset if isinstance(f, DepFile)]
     non_dependable = [f for f in fileset if not isinstance(f, DepFile)]
-    dependable.sort(key=lambda f: f.path.lower())
-    # Not necessary, but will tend to group files more nicely
-    # in the output.
-    dependable.sort(key=DepFile.get_dep_level)
+    compute_dep_levels(dependable)
+    # Sorting by path is not necessary, but will tend to group files
+    # more nicely in the output.
+    dependable.sort(key=lambda f: (f.dep_level, f.path.lower()))
     return non_dependable + dependable
 
 
@@ -124,7 +502,6 @@ def make_dependency_set(fileset, top_level_entity, extra_modules=None):
     """Create the set of all files required to build the named
      top_level_entity."""
     from ..sourcefiles.sourcefileset import SourceFileSet
-    from ..sourcefiles.dep_file import DepRelation
     assert isinstance(fileset, SourceFileSet)
     fset = fileset.filter(DepFile)
 
@@ -132,9 +509,9 @@ def make_dependency_set(fileset, top_level_entity, extra_modules=None):
         """ Check if :param test_file: provides the entity pointed by :param entity_name:"""
         if entity_name == None:
             return False
-        entity_rel = DepRelation(entity_name, "work", DepRelation.MODULE)
+        top_keys = _top_keys(entity_name)
         for rel in test_file.provides:
-            if rel == entity_rel:
+            if _relation_key(rel) in top_keys:
                 return True
         return False
 
@@ -160,15 +537,82 @@ def make_dependency_set(fileset, top_level_entity, extra_modules=None):
         return fileset
     # Collect only the files that the top level entity is dependant on, by
     # walking the dependancy tree.
-    dep_file_set = set()
-    file_set = set([top_file] + extra_files)
-    while len(file_set) > 0:
-        chk_file = file_set.pop()
-        dep_file_set.add(chk_file)
-        file_set.update(chk_file.depends_on - dep_file_set)
+    root_files = [top_file] + extra_files
+    graph = top_file.graph
+
+    def _closure(files):
+        """Get the files :param files: depend on, including themselves"""
+        if graph is not None and all(x.graph is graph for x in files):
+            return [graph.files[node] for node in
+                    graph.reachable([x.graph_id for x in files])]
+        dep_file_set = set()
+        file_set = set(files)
+        while len(file_set) > 0:
+            chk_file = file_set.pop()
+            dep_file_set.add(chk_file)
+            file_set.update(chk_file.depends_on - dep_file_set)
+        return dep_file_set
+
+    dep_file_set = _add_secondary_files(set(_closure(root_files)),
+                                        _build_provider_index(fset), _closure)
     hierarchy_drivers = [top_level_entity]
     if extra_modules is not None:
         hierarchy_drivers += extra_modules
     logging.info("Found %d files as dependancies of %s.",
                  len(dep_file_set), ", ".join(hierarchy_drivers))
     return dep_file_set
+
+
+def make_dependency_sets(fileset, top_level_entities, extra_modules=None):
+    """Create, for each one of the :param top_level_entities:, the set of
+    all files required to build it together with the :param extra_modules:.
+    All of the closures are taken from the graph built by a single solve and
+    the closures of the shared sub-hierarchies are memoized, so every query
+    only walks the files that no previous query reached; the memo is dropped
+    once all of the top level entities are answered. Return a list of
+    (top_level_entity, file set) pairs, the set being None if the top level
+    entity is not provided by any file"""
+    from ..sourcefiles.sourcefileset import SourceFileSet
+    assert isinstance(fileset, SourceFileSet)
+    fset = fileset.filter(DepFile)
+    graphs = set(dep_file.graph for dep_file in fset)
+    if len(graphs) != 1 or None in graphs:
+        # The files were not solved together, query them one by one.
+        result = []
+        for top_level_entity in top_level_entities:
+            dep_file_set = make_dependency_set(fileset, top_level_entity,
+                                               extra_modules)
+            if dep_file_set is fileset:
+                dep_file_set = None
+            result.append((top_level_entity, dep_file_set))
+        return result
+    graph = graphs.pop()
+    provider_index = _build_provider_index(fset)
+
+    def _get_providers(entity_name):
+        """Get the ids of the files providing :param entity_name:"""
+        return [dep_file.graph_id for key in _top_keys(entity_name)
+                for dep_file in provider_index.get(key, [])]
+
+    extra_ids = []
+    for entity_aux in extra_modules or []:
+        extra_ids.extend(_get_providers(entity_aux))
+    result = []
+    for top_level_entity in top_level_entities:
+        top_ids = _get_providers(top_level_entity)
+        if not top_ids:
+            logging.critical(
+                    'Could not find a top level file that provides the '
+                    'top_module="%s".', top_level_entity)
+            result.append((top_level_entity, None))
+            continue
+        dep_file_set = _add_secondary_files(
+            set(graph.bitset_files(graph.closure(top_ids + extra_ids))),
+            provider_index,
+            lambda files: graph.bitset_files(
+                graph.closure([x.graph_id for x in files])))
+        logging.debug("Found %d files as dependancies of %s.",
+                      len(dep_file_set), top_level_entity)
+        result.append((top_level_entity, dep_file_set))
+    graph.clear_closures()
+    return result
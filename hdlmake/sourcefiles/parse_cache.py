@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing a persistent cache for the results of the HDL parsers"""
+
+from __future__ import absolute_import
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+from .dep_file import DepRelation
+from .._version import __version__
+
+
+def _file_hash(path):
+    """Get the SHA1 digest for the contents of the file at :param path:"""
+    sha = hashlib.sha1()
+    with open(path, "rb") as hdl_file:
+        for chunk in iter(lambda: hdl_file.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _file_mtime(path):
+    """Get the modification time of :param path:, None if it is missing"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _rel_to_list(rel):
+    """Convert a DepRelation into a JSON serializable list"""
+    return [rel.obj_name, rel.lib_name, rel.rel_type]
+
+
+def _list_to_rel(rel_list):
+    """Convert back a list created by _rel_to_list into a DepRelation"""
+    return DepRelation(rel_list[0], rel_list[1], rel_list[2])
+
+
+class ParseCache(object):
+
+    """Class providing an on-disk cache of the provides, requires and
+    included files found by the parsers, so that files that did not change
+    since the previous run don't need to be parsed again. It can also store
+    the solved dependency graph, used by the incremental solve"""
+
+    VERSION = 5
+    FILENAME = "parse_cache.json"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.entries = {}
+        self.graph = {}
+        # Provides of the entries overwritten in this run.
+        self._replaced_provides = {}
+        self.hits = 0
+        self.misses = 0
+        self._modified = False
+        self._load()
+
+    @property
+    def filename(self):
+        """Path to the file storing the cache contents"""
+        return os.path.join(self.cache_dir, self.FILENAME)
+
+    def _load(self):
+        """Read the cache contents, discarding them if they were written
+        by a different version of HDLMake"""
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "r") as cache_file:
+                content = json.load(cache_file)
+        except (IOError, ValueError) as error:
+            logging.warning("Ignoring unreadable parse cache %s: %s",
+                            self.filename, error)
+            return
+        if (content.get("version") != self.VERSION
+                or content.get("hdlmake") != __version__):
+            logging.debug("Discarding parse cache %s from another version",
+                          self.filename)
+            return
+        self.entries = content.get("files", {})
+        self.graph = content.get("graph", {})
+
+    @staticmethod
+    def _get_key(dep_file):
+        """Get the parameters, other than the file contents, that
+        can change the outcome of parsing :param dep_file:"""
+        return {"library": dep_file.library,
+                "include_dirs": list(getattr(dep_file, "include_dirs", [])),
+                "vlog_defines": dict(getattr(dep_file, "vlog_defines", {}))}
+
+    def _is_valid(self, entry, dep_file):
+        """Check if the cache :param entry: still describes :param dep_file:"""
+        if entry.get("declared"):
+            # The file is parsed now, but its relations were declared.
+            return False
+        try:
+            stat = os.stat(dep_file.path)
+        except OSError:
+            return False
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["key"] != self._get_key(dep_file):
+            return False
+        for included_path, mtime in entry["included_files"].items():
+            if _file_mtime(included_path) != mtime:
+                return False
+        if entry["mtime"] != stat.st_mtime_ns:
+            # The file has been touched, check if the contents changed.
+            if entry["sha1"] != _file_hash(dep_file.path):
+                return False
+            entry["mtime"] = stat.st_mtime_ns
+            self._modified = True
+        return True
+
+    def lookup(self, dep_file):
+        """Fill :param dep_file: with the cached relations if they are still
+        valid. Return True on success, False if the file must be parsed"""
+        entry = self.entries.get(dep_file.path)
+        if entry is None or not self._is_valid(entry, dep_file):
+            self.misses += 1
+            return False
+        for rel in entry["provides"]:
+            dep_file.add_provide(_list_to_rel(rel))
+        for rel in entry["requires"]:
+            dep_file.add_require(_list_to_rel(rel))
+        dep_file.included_files.update(entry["included_files"])
+        dep_file.is_parsed = True
+        self.hits += 1
+        logging.debug("Parse cache hit: %s", dep_file.path)
+        return True
+
+    def store(self, dep_file):
+        """Record the relations of the freshly parsed :param dep_file:"""
+        assert dep_file.is_parsed
+        if dep_file.path in self.entries:
+            self._replaced_provides.setdefault(
+                dep_file.path, self.entries[dep_file.path]["provides"])
+        stat = os.stat(dep_file.path)
+        self.entries[dep_file.path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha1": _file_hash(dep_file.path),
+            "key": self._get_key(dep_file),
+            "included_files": dict(
+                (included_path, _file_mtime(included_path))
+                for included_path in dep_file.included_files),
+            "provides": [_rel_to_list(rel) for rel in dep_file.provides],
+            "requires": [_rel_to_list(rel) for rel in dep_file.requires]}
+        self._modified = True
+
+    def update_declared(self, dep_file):
+        """Record the relations of :param dep_file:, declared in a manifest
+        instead of being found by a parser, so the file is never read.
+        Return True if they differ from the relations recorded before"""
+        entry = {"declared": True,
+                 "provides": sorted((_rel_to_list(rel)
+                                     for rel in dep_file.provides), key=str),
+                 "requires": sorted((_rel_to_list(rel)
+                                     for rel in dep_file.requires), key=str)}
+        previous = self.entries.get(dep_file.path)
+        if previous == entry:
+            return False
+        if previous is not None:
+            self._replaced_provides.setdefault(dep_file.path,
+                                               previous["provides"])
+        self.entries[dep_file.path] = entry
+        self._modified = True
+        return True
+
+    def get_previous_provides(self, path):
+        """Get the relations the file at :param path: provided when
+        it was parsed in a previous run"""
+        if path in self._replaced_provides:
+            provides = self._replaced_provides[path]
+        elif path in self.entries:
+            provides = self.entries[path]["provides"]
+        else:
+            provides = []
+        return [_list_to_rel(rel) for rel in provides]
+
+    def get_solved_paths(self):
+        """Get the paths of the files in the graph stored by the previous
+        run"""
+        return set(self.graph.get("files", {}))
+
+    def is_solved(self, path):
+        """Check if the stored graph contains the file at :param path:"""
+        return path in self.graph.get("files", {})
+
+    def get_depends_on(self, path):
+        """Get the paths of the files the file at :param path: depended on
+        in the stored graph"""
+        return self.graph["files"][path]["depends_on"]
+
+    def get_reported(self, path):
+        """Get the relations of the file at :param path: that were not
+        satisfied by exactly one file in the stored graph"""
+        return [_list_to_rel(rel)
+                for rel in self.graph["files"][path]["reported"]]
+
+    def get_dep_level(self, path):
+        """Get the dependency level of the file at :param path: in
+        the stored graph"""
+        return self.graph["files"][path]["dep_level"]
+
+    def store_graph(self, fset, reported):
+        """Replace the stored graph by the one solved for :param fset:,
+        :param reported: being a dictionary with the relations of each file
+        that were not satisfied by exactly one file"""
+        self.graph = {"files": dict(
+            (dep_file.path,
+             {"depends_on": sorted(required_file.path for required_file
+                                   in dep_file.depends_on),
+              "reported": [_rel_to_list(rel)
+                           for rel in reported[dep_file]],
+              "dep_level": dep_file.dep_level})
+            for dep_file in fset)}
+        self._modified = True
+
+    def save(self, paths=None):
+        """Write the cache to disk if it has been modified. If the
+        :param paths: of the files in use are given, the entries of the
+        other files are dropped, so that the cache doesn't keep growing"""
+        logging.debug("Parse cache: %d hits, %d misses",
+                      self.hits, self.misses)
+        if paths is not None:
+            unused = [path for path in self.entries if path not in paths]
+            for path in unused:
+                del self.entries[path]
+            if unused:
+                logging.debug("Parse cache: %d unused entries dropped",
+                              len(unused))
+                self._modified = True
+        if not self._modified:
+            return
+        # Each run writes its own temporary file, so that the runs sharing
+        # the cache dir don't mix their writes: the last one replacing the
+        # cache wins.
+        tmp_filename = None
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_fd, tmp_filename = tempfile.mkstemp(
+                prefix=self.FILENAME + ".", suffix=".tmp", dir=self.cache_dir)
+            with os.fdopen(tmp_fd, "w") as cache_file:
+                json.dump({"version": self.VERSION,
+                           "hdlmake": __version__,
+                           "files": self.entries,
+                           "graph": self.graph}, cache_file)
+            os.replace(tmp_filename, self.filename)
+        except OSError as error:
+            logging.warning("Unable to save the parse cache %s: %s",
+                            self.filename, error)
+            if tmp_filename is not None and os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return
+        self._modified = False
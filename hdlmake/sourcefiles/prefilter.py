@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the keyword prefilter used by the HDL parsers to skip
+the regex passes that can't match anything in a file"""
+
+from __future__ import absolute_import
+import logging
+
+# Number of files and bytes skipped by every pass in this process.
+_skipped = {}
+# Size of the parts of the text lowered at a time when the case is ignored.
+_WINDOW_SIZE = 1 << 20
+
+
+def record_skip(pass_name, size):
+    """Count a file of :param size: characters skipped by :param pass_name:"""
+    files, total = _skipped.get(pass_name, (0, 0))
+    _skipped[pass_name] = (files + 1, total + size)
+
+
+def get_stats():
+    """Get a copy of the skip counters, as a dictionary mapping the name of
+    every pass to a (files, bytes) tuple"""
+    return dict(_skipped)
+
+
+def reset_stats():
+    """Clear the skip counters"""
+    _skipped.clear()
+
+
+def merge_stats(stats):
+    """Add the counters returned by get_stats() in another process"""
+    for pass_name, (files, total) in stats.items():
+        old_files, old_total = _skipped.get(pass_name, (0, 0))
+        _skipped[pass_name] = (old_files + files, old_total + total)
+
+
+def log_stats():
+    """Log the skip counters"""
+    for pass_name in sorted(_skipped):
+        files, total = _skipped[pass_name]
+        logging.debug("Prefilter: pass '%s' skipped %d files (%d bytes)",
+                      pass_name, files, total)
+
+
+def _as_type(keyword, text):
+    """Get :param keyword: as bytes unless :param text: is text"""
+    if isinstance(text, str):
+        return keyword
+    return keyword.encode("ascii")
+
+
+def _find_any_case(text, keyword):
+    """Check if the lower case :param keyword: appears in any case in
+    :param text:. The text is lowered one window at a time, so that it is
+    never copied as a whole"""
+    overlap = len(keyword) - 1
+    for begin in range(0, len(text), _WINDOW_SIZE):
+        window = text[begin:begin + _WINDOW_SIZE + overlap]
+        if window.lower().find(keyword) >= 0:
+            return True
+    return False
+
+
+def strip_protected(text):
+    """Remove from :param text: (text or bytes) the encrypted regions
+    enclosed by the 'protect begin_protected' and 'protect end_protected'
+    directives"""
+    begin_tag = _as_type("begin_protected", text)
+    end_tag = _as_type("end_protected", text)
+    begin = text.find(begin_tag)
+    if begin < 0:
+        return text
+    chunks = []
+    start = 0
+    while begin >= 0:
+        chunks.append(text[start:begin])
+        end = text.find(end_tag, begin)
+        if end < 0:
+            start = len(text)
+            break
+        start = end + len(end_tag)
+        begin = text.find(begin_tag, start)
+    chunks.append(text[start:])
+    return text[:0].join(chunks)
+
+
+class Prefilter(object):
+
+    """Class deciding, with plain substring searches, which keywords may
+    appear in a file, so that the parser passes that require any missing
+    keyword can be skipped. The text can be bytes or a mapped file too"""
+
+    def __init__(self, text, ignore_case=False):
+        self.size = len(text)
+        self.text = text
+        self.ignore_case = ignore_case
+        self._found = {}
+
+    def _has(self, keyword):
+        """Check if the lower case :param keyword: appears in the text. When
+        the case is ignored, it is only looked for in any case if it is not
+        found as is"""
+        found = self._found.get(keyword)
+        if found is None:
+            pattern = _as_type(keyword, self.text)
+            found = self.text.find(pattern) >= 0
+            if not found and self.ignore_case:
+                found = _find_any_case(self.text, pattern)
+            self._found[keyword] = found
+        return found
+
+    def has_any(self, keywords):
+        """Check if any of the :param keywords: appears in the text"""
+        return any(self._has(keyword) for keyword in keywords)
+
+    def run_pass(self, pass_name, keywords):
+        """Check if the pass :param pass_name:, that can only match text
+        containing one of the :param keywords:, must be run"""
+        if self.has_any(keywords):
+            return True
+        record_skip(pass_name, self.size)
+        return False
+
+    def is_protected(self, pass_name, keywords):
+        """Check if the text is an encrypted file with none of the
+        :param keywords: outside of the protected regions, i.e. a file
+        in which the parser can't find anything"""
+        if not self._has("begin_protected"):
+            return False
+        text = self.text[:].lower() if self.ignore_case else self.text
+        if Prefilter(strip_protected(text)).has_any(keywords):
+            return False
+        record_skip(pass_name, self.size)
+        return True
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the source reading layer shared by the HDL parsers.
+The files are memory-mapped and scanned as bytes, and only the matched
+identifiers are decoded. Latin-1 is used whenever some text is decoded:
+it maps every byte to one character, so no file can fail to decode and
+the ASCII identifiers are read the same whatever the actual encoding"""
+
+from __future__ import absolute_import
+import contextlib
+import mmap
+
+
+ENCODING = "latin-1"
+
+
+@contextlib.contextmanager
+def map_file(path):
+    """Context manager mapping the file at :param path: in memory, so that
+    it can be scanned without being read as a whole. The map is only valid
+    in the context"""
+    with open(path, "rb") as source_file:
+        try:
+            buf = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped.
+            yield b""
+            return
+        try:
+            yield buf
+        finally:
+            buf.close()
+
+
+def normalize_newlines(buf):
+    """Get :param buf: (text, bytes or a mapped file) with the CRLF and CR
+    line endings converted to LF, as done when reading a file in text mode.
+    The buffer is returned as is if it has no CR"""
+    if isinstance(buf, str):
+        if "\r" not in buf:
+            return buf
+        return buf.replace("\r\n", "\n").replace("\r", "\n")
+    if buf.find(b"\r") < 0:
+        return buf
+    return bytes(buf).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+def read_text(path):
+    """Read the file at :param path: as text, with normalized line endings"""
+    with map_file(path) as buf:
+        text = str(buf, ENCODING)
+    return normalize_newlines(text)
+
+
+def decode(name):
+    """Decode the identifier :param name: matched in a mapped file, or
+    return None if the group did not match"""
+    if name is None:
+        return None
+    return name.decode(ENCODING)
@@ -38,7 +38,9 @@ class SourceFile(DepFile):
     """This is a class acting as a base for the different
     HDL sources files, i.e. those that can be parsed"""
 
-    def __init__(self, path, module, library):
+    __slots__ = ("library",)
+
+    def __init__(self, path, module, library=None):
         assert isinstance(path, six.string_types)
         self.library = library or "work"
         DepFile.__init__(self, path=path, module=module)
@@ -53,27 +55,66 @@ class VHDLFile(SourceFile):
 
     """This is the class providing the generic VHDL file"""
 
-    def __init__(self, path, module, library=None):
-        SourceFile.__init__(self, path=path, module=module, library=library)
+    __slots__ = ()
+
+    @property
+    def parser(self):
+        """Parser of the file, shared by all of the VHDL files"""
         from .vhdl_parser import VHDLParser
-        self.parser = VHDLParser(self)
+        return VHDLParser.get_shared()
 
 
 class VerilogFile(SourceFile):
 
     """This is the class providing the generic Verilog file"""
 
+    __slots__ = ("include_dirs", "vlog_defines")
+
     def __init__(self, path, module, library=None, include_dirs=None):
         SourceFile.__init__(self, path=path, module=module, library=library)
-        from .vlog_parser import VerilogParser
         self.include_dirs = include_dirs[:] if include_dirs else []
         self.include_dirs.append(path_mod.relpath(self.dirname))
-        self.parser = VerilogParser(self)
+        # Macros defined before preprocessing the file
+        self.vlog_defines = {}
+
+    @property
+    def parser(self):
+        """Parser of the file, shared by all of the Verilog files"""
+        from .vlog_parser import VerilogParser
+        return VerilogParser.get_shared()
 
 
 class SVFile(VerilogFile):
     """This is the class providing the generic SystemVerilog file"""
-    pass
+    __slots__ = ()
+
+
+class VHDLNetlistFile(VHDLFile):
+
+    """This is the class providing the post-synthesis VHDL netlist, parsed
+    by the netlist fast path"""
+
+    __slots__ = ()
+
+    @property
+    def parser(self):
+        """Parser of the file, shared by all of the VHDL netlists"""
+        from .netlist_parser import VHDLNetlistParser
+        return VHDLNetlistParser.get_shared()
+
+
+class VerilogNetlistFile(VerilogFile):
+
+    """This is the class providing the post-synthesis Verilog netlist, parsed
+    by the netlist fast path"""
+
+    __slots__ = ()
+
+    @property
+    def parser(self):
+        """Parser of the file, shared by all of the Verilog netlists"""
+        from .netlist_parser import VerilogNetlistParser
+        return VerilogNetlistParser.get_shared()
 
 
 # TCL COMMAND FILE
@@ -174,10 +215,13 @@ class VEOFile(File):
 class XCIFile(SourceFile):
     """Xilinx Core IP File"""
 
-    def __init__(self, path, module, library=None):
-        SourceFile.__init__(self, path=path, module=module, library=library)
+    __slots__ = ()
+
+    @property
+    def parser(self):
+        """Parser of the file, shared by all of the XCI files"""
         from .xci_parser import XCIParser
-        self.parser = XCIParser(self)
+        return XCIParser.get_shared()
 
 XILINX_FILE_DICT = {
     'xise': XISEFile,
@@ -328,11 +372,20 @@ def create_source_file(path, module, library=None, include_dirs=None):
     logging.debug(f" library: {library}")
     logging.debug(f" include: {include_dirs}")
 
-    if extension in ['vhd', 'vhdl', 'vho']:
+    if extension in ['vhd', 'vhdl']:
         new_file = VHDLFile(path=path,
                             module=module,
                             library=library)
-    elif extension in ['v', 'vh', 'vo', 'vm', 'vp']:
+    elif extension == 'vho':
+        new_file = VHDLNetlistFile(path=path,
+                                   module=module,
+                                   library=library)
+    elif extension in ['vo', 'vm']:
+        new_file = VerilogNetlistFile(path=path,
+                                      module=module,
+                                      library=library,
+                                      include_dirs=include_dirs)
+    elif extension in ['v', 'vh', 'vp']:
         new_file = VerilogFile(path=path,
                                module=module,
                                library=library,
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Module providing the symbol index shipped by a module next to its
+Manifest.py, so that the projects using the module don't need to parse
+its files"""
+
+from __future__ import absolute_import
+import os
+import re
+import json
+import logging
+import tempfile
+
+from .parse_cache import _file_hash, _rel_to_list, _list_to_rel
+from .source_reader import map_file
+
+
+# Verilog directives whose outcome does not depend on the macros defined.
+_MACRO_USE = re.compile(
+    br"`(?!(?:include|timescale|default_nettype|resetall|celldefine|"
+    br"endcelldefine|unconnected_drive|nounconnected_drive)\b)")
+
+
+def _uses_macros(paths):
+    """Check if any of the Verilog files at :param paths: contains a
+    directive or a macro whose outcome depends on the macros defined"""
+    for path in paths:
+        with map_file(path) as buf:
+            if _MACRO_USE.search(buf):
+                return True
+    return False
+
+
+class SymbolIndex(object):
+
+    """Class providing the index of the provides, requires and included
+    files found by the parsers for the files of a module, written by the
+    'symbol-index' command in the module dir. Each entry holds the hash of
+    the file contents, and of its included files, and it is only used when
+    they still match"""
+
+    VERSION = 1
+    FILENAME = "hdlmake_index.json"
+
+    def __init__(self, module_dir):
+        self.module_dir = os.path.abspath(module_dir)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def filename(self):
+        """Path to the file storing the index"""
+        return os.path.join(self.module_dir, self.FILENAME)
+
+    @classmethod
+    def load(cls, module_dir):
+        """Read the index of the module at :param module_dir:, None if the
+        module has no index or it can't be used"""
+        index = cls(module_dir)
+        if not os.path.exists(index.filename):
+            return None
+        try:
+            with open(index.filename, "r") as index_file:
+                content = json.load(index_file)
+        except (IOError, ValueError) as error:
+            logging.warning("Ignoring unreadable symbol index %s: %s",
+                            index.filename, error)
+            return None
+        if content.get("version") != cls.VERSION:
+            logging.warning("Ignoring symbol index %s from another version",
+                            index.filename)
+            return None
+        index.entries = content.get("files", {})
+        logging.debug("Symbol index %s: %d files", index.filename,
+                      len(index.entries))
+        return index
+
+    def _relpath(self, path):
+        """Get :param path: relative to the module dir, as stored"""
+        return os.path.relpath(os.path.abspath(path),
+                               self.module_dir).replace(os.sep, "/")
+
+    def _abspath(self, relpath):
+        """Get back the absolute path of the stored :param relpath:"""
+        return os.path.normpath(os.path.join(self.module_dir, relpath))
+
+    def _is_valid(self, entry, dep_file):
+        """Check if the index :param entry: still describes :param dep_file:"""
+        if entry["library"] != dep_file.library:
+            return False
+        vlog_defines = entry["vlog_defines"]
+        if (vlog_defines is not None and vlog_defines !=
+                dict(getattr(dep_file, "vlog_defines", {}))):
+            return False
+        try:
+            if entry["sha1"] != _file_hash(dep_file.path):
+                return False
+            for relpath, sha1 in entry["included_files"].items():
+                if _file_hash(self._abspath(relpath)) != sha1:
+                    return False
+        except (IOError, OSError):
+            return False
+        return True
+
+    def lookup(self, dep_file):
+        """Fill :param dep_file: with the indexed relations if the hashes
+        still match. Return True on success, False if the file must be
+        parsed"""
+        entry = self.entries.get(self._relpath(dep_file.path))
+        if entry is None or not self._is_valid(entry, dep_file):
+            self.misses += 1
+            return False
+        for rel in entry["provides"]:
+            dep_file.add_provide(_list_to_rel(rel))
+        for rel in entry["requires"]:
+            dep_file.add_require(_list_to_rel(rel))
+        dep_file.included_files.update(
+            self._abspath(relpath) for relpath in entry["included_files"])
+        dep_file.is_parsed = True
+        self.hits += 1
+        logging.debug("Symbol index hit: %s", dep_file.path)
+        return True
+
+    def store(self, dep_file):
+        """Record the relations of the parsed :param dep_file:. The macros
+        defined are only recorded for the Verilog files using them"""
+        assert dep_file.is_parsed
+        vlog_defines = getattr(dep_file, "vlog_defines", None)
+        if vlog_defines is not None and _uses_macros(
+                [dep_file.path] + sorted(dep_file.included_files)):
+            vlog_defines = dict(vlog_defines)
+        else:
+            vlog_defines = None
+        self.entries[self._relpath(dep_file.path)] = {
+            "sha1": _file_hash(dep_file.path),
+            "library": dep_file.library,
+            "vlog_defines": vlog_defines,
+            "included_files": dict(
+                (self._relpath(included_path), _file_hash(included_path))
+                for included_path in dep_file.included_files),
+            "provides": sorted(_rel_to_list(rel) for rel in dep_file.provides),
+            "requires": sorted(_rel_to_list(rel) for rel in dep_file.requires)}
+
+    def save(self):
+        """Write the index in the module dir. Return False if it can't be
+        written"""
+        # Each run writes its own temporary file, so that the runs writing
+        # the same index don't mix their writes.
+        tmp_filename = None
+        try:
+            tmp_fd, tmp_filename = tempfile.mkstemp(
+                prefix=self.FILENAME + ".", suffix=".tmp", dir=self.module_dir)
+            with os.fdopen(tmp_fd, "w") as index_file:
+                json.dump({"version": self.VERSION,
+                           "files": self.entries},
+                          index_file, indent=1, sort_keys=True)
+            # The index is shipped with the module, unlike the private
+            # temporary file.
+            os.chmod(tmp_filename, 0o644)
+            os.replace(tmp_filename, self.filename)
+        except OSError as error:
+            logging.warning("Unable to save the symbol index %s: %s",
+                            self.filename, error)
+            if tmp_filename is not None and os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return False
+        return True
@@ -24,235 +24,379 @@
 """Module providing the VHDL parser capabilities"""
 
 from __future__ import absolute_import
+import contextlib
+import itertools
 import logging
 import re
 
 from .new_dep_solver import DepParser
+from .prefilter import Prefilter
+from .source_reader import map_file, normalize_newlines, decode
+
+
+# The files are scanned as bytes, and only the names matched are decoded.
+_COMMENT_PATTERN = re.compile(b'--.*?$|".?"', re.DOTALL | re.MULTILINE)
+
+
+def _span(opening):
+    """Get the pattern matching the shortest text up to the end of a
+    construct, that can extend over several lines but never over a line
+    starting with the :param opening: of another construct of the same
+    kind. The failed matches for a construct can thus never overlap, and
+    the time spent in them is bounded by the size of the file. The end is
+    looked for in the first line before trying the more costly pattern
+    matching the following lines"""
+    return r"(?:[^\n]*?|[^\n]*(?:\n(?![^\S\n]*%s)[^\n]*?)+?)" % opening
+
+
+def _atomic(name, pattern):
+    """Get :param pattern: matched atomically as the group :param name:,
+    so that the regex engine never backtracks into it"""
+    return r"(?=(?P<%s>%s))(?P=%s)" % (name, pattern, name)
+
+
+# The constructs found by the scanner, as (name, keywords, pattern) tuples.
+# A construct can only be found in a text containing one of its keywords,
+# and its pattern is matched from the beginning of a line. The declarations
+# that don't add any relation are looked for too, so that no instance is
+# found inside of them. When the matches for two constructs overlap, the
+# one listed first takes precedence.
+_RULES = [
+    ("use", ("use",),
+     r"use\s+(?P<use_lib>\w+)\s*\.\s*(?P<use_pkg>\w+)"),
+    ("binding", ("use",),
+     r"(?:for\s+\w+(?:\s*,\s*\w+)*\s*:\s*\w+\s+)?"
+     r"use\s+(?P<bind_kind>entity|configuration)\s+"
+     r"(?P<bind_lib>\w+)\s*\.\s*(?P<bind_name>\w+)"),
+    ("context_ref", ("context",),
+     r"context\s+(?P<context_refs>\w+\s*\.\s*\w+"
+     r"(?:\s*,\s*\w+\s*\.\s*\w+)*)\s*;"),
+    ("context", ("context",),
+     r"context\s+(?P<context_name>\w+)\s+is"),
+    ("entity", ("entity",),
+     r"entity\s+(?P<entity_name>\w+)\s+is\s+(?:port|generic|end)"
+     + _span(r"entity\s+\w+\s+is\b")
+     + r"(?:(?P=entity_name)|entity)\s*;"),
+    ("architecture", ("architecture",),
+     r"architecture\s+(?P<arch_name>\w+)\s+of\s+(?P<arch_entity>\w+)\s+is"),
+    ("package_instance", ("package",),
+     r"package\s+(?P<pkg_inst_name>\w+)\s+is\s+new\s+"
+     r"(?:(?P<generic_lib>\w+)\s*\.\s*)?(?P<generic_pkg>\w+)"),
+    ("package", ("package",),
+     r"package\s+(?P<package_name>\w+)\s+is"),
+    ("package_body", ("package",),
+     r"package\s+body\s+(?P<body_name>\w+)\s+is"),
+    ("configuration", ("configuration",),
+     r"configuration\s+(?P<conf_name>\w+)\s+of\s+(?P<conf_entity>\w+)"
+     r"\s+is"),
+    ("component", ("component",),
+     _atomic("component_end",
+             r"component\s+\w+" + _span(r"component\s+\w+")
+             + r"end\s+component")
+     + _span(r"component\s+\w+") + r";"),
+    ("signal", ("signal",),
+     r"signal\s+\w+" + _span(r"signal\b") + r";"),
+    ("constant", ("constant",),
+     r"constant\s+\w+" + _span(r"constant\b") + r";"),
+    ("record", ("record",),
+     _atomic("record_end",
+             r"type\s+\w+\s+is\s+record" + _span(r"type\b")
+             + r"end\s+record")
+     + _span(r"type\b") + r";"),
+    ("function", ("function",),
+     _atomic("function_return",
+             r"function\s+\w+" + _span(r"function\s+\w+")
+             + r"return\s+\w+")
+     + r"(?:" + _atomic("function_end",
+                       r"\s+is" + _span(r"function\s+\w+")
+                       + r"end\s+function")
+     + _span(r"function\s+\w+") + r")?\s*;"),
+    ("instance", ("map",),
+     r"(?=(?P<inst_label>\w+))(?P=inst_label)\s*:"
+     r"\s*(?:(?P<inst_kind>entity|configuration)\s+(?P<inst_lib>\w+)\.)?"
+     r"(?P<inst_entity>\w+)"
+     r"\s*(?:\(\s*(?P<inst_arch>\w+)\s*\)\s*)?"
+     r"(?:port\s+map|generic\s+map)")]
+# Constructs adding relations to the file.
+_RELATION_RULES = ("use", "binding", "context_ref", "context", "entity",
+                   "architecture", "package_instance", "package",
+                   "package_body", "configuration", "instance")
+# Constructs found by the scan of the provided relations.
+_PROVIDE_RULES = ("context", "entity", "architecture", "package_instance",
+                  "package", "package_body", "configuration")
+# Keywords required by any of the constructs adding relations.
+_KEYWORDS = ("use", "context", "entity", "architecture", "package",
+             "configuration", "map")
+
+_KEYWORDS_BY_RULE = dict(
+    (name, tuple(keyword.encode("ascii") for keyword in keywords))
+    for name, keywords, _ in _RULES)
+# Constructs adding relations that take precedence over each construct.
+_RULES_BEFORE = dict(
+    (name, tuple(previous for previous, _, _ in _RULES[:index]
+                 if previous in _RELATION_RULES))
+    for index, (name, _, _) in enumerate(_RULES))
+
+_scanners = {}
+_inner_names = {}
+
+
+def _get_scanner(names):
+    """Get the compiled patterns matching any of the constructs in the
+    tuple :param names:, tried in the order of the rules, at the beginning
+    of the first line and of the following lines. The latter starts with
+    the newline ending the previous line, which lets the regex engine jump
+    from line to line. The indentation is matched atomically, so it is
+    never backtracked into"""
+    scanner = _scanners.get(names)
+    if scanner is None:
+        construct = (r"(?=(?P<indent>[^\S\n]*))(?P=indent)(?:%s)" % "|".join(
+            "(?P<%s>%s)" % (name, pattern)
+            for name, _, pattern in _RULES if name in names)).encode("ascii")
+        scanner = (re.compile(construct, re.DOTALL | re.IGNORECASE),
+                   re.compile(b"\n" + construct, re.DOTALL | re.IGNORECASE))
+        _scanners[names] = scanner
+    return scanner
+
+
+def _get_inner_names(names, kind):
+    """Get the constructs in the tuple :param names: that take precedence
+    over the construct :param kind:"""
+    inner_names = _inner_names.get((names, kind))
+    if inner_names is None:
+        inner_names = tuple(name for name in names
+                            if name in _RULES_BEFORE[kind])
+        _inner_names[(names, kind)] = inner_names
+    return inner_names
+
+
+@contextlib.contextmanager
+def _map_code(path):
+    """Context manager getting the VHDL file at :param path: as bytes,
+    without the comments and strings. The file is scanned in place when it
+    has none of them"""
+    with map_file(path) as buf:
+        buf = normalize_newlines(buf)
+        if buf.find(b"--") >= 0 or buf.find(b'"') >= 0:
+            buf = _COMMENT_PATTERN.sub(b"", buf)
+        yield buf
+
+
+def _group(match, name):
+    """Get the decoded text matched by the group :param name:, or None"""
+    return decode(match.group(name))
 
 
 class VHDLParser(DepParser):
 
     """Class providing the container for VHDL parser instances"""
 
-    def __init__(self, dep_file):
-        DepParser.__init__(self, dep_file)
-        # self.preprocessor = VHDLPreprocessor()
+    def scan_provides(self, dep_file):
+        """Get the relations provided by the VHDL file without parsing it:
+        only the declarations of the design units are looked for"""
+        from .dep_file import DepRelation
+        # Group holding the name of the unit and type of relation provided,
+        # for each construct.
+        unit_groups = {
+            "context": ("context_name", DepRelation.CONTEXT),
+            "entity": ("entity_name", DepRelation.ENTITY),
+            "architecture": ("arch_entity", DepRelation.ARCHITECTURE),
+            "package_instance": ("pkg_inst_name", DepRelation.PACKAGE),
+            "package": ("package_name", DepRelation.PACKAGE),
+            "package_body": ("body_name", DepRelation.PACKAGE_BODY),
+            "configuration": ("conf_name", DepRelation.CONFIGURATION)}
+        first_line, next_lines = _get_scanner(_PROVIDE_RULES)
+        provides = []
+        with _map_code(dep_file.path) as buf:
+            match = first_line.match(buf)
+            matches = next_lines.finditer(buf)
+            if match is not None:
+                matches = itertools.chain([match], matches)
+            for match in matches:
+                group, rel_type = unit_groups[match.lastgroup]
+                provides.append(DepRelation(_group(match, group),
+                                            dep_file.library, rel_type))
+        return provides
 
     def parse(self, dep_file):
-        """Parse the provided VHDL file and add the detected relations to it"""
-        from .dep_file import DepRelation
+        """Parse the provided VHDL file and add the detected relations to it.
+        All of the constructs are found in a single walk over the text"""
         assert not dep_file.is_parsed
 
         logging.debug("Parsing %s", dep_file.path)
 
-        def _preprocess(vhdl_file):
-            """Preprocess the supplied VHDL file instance"""
-            buf = open(vhdl_file.path, "r").read()
-            logging.debug(
-                "preprocess file %s (of length %d) in library %s",
-                vhdl_file.path, len(buf), vhdl_file.library)
-            # Remove the comments and strings from the VHDL code
-            pattern = re.compile('--.*?$|".?"', re.DOTALL | re.MULTILINE)
-            return re.sub(pattern, "", buf)
-
-        buf = _preprocess(dep_file)
-        # use packages
-        use_pattern = re.compile(
-            r"^\s*use\s+(\w+)\s*\.\s*(\w+)",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_use(text):
-            """Function to be applied by re.sub to every match of the
-            use_pattern in the VHDL code -- group() returns positive matches
-            as indexed plain strings. It adds the found USE relations to the
-            file"""
-            lib_name = text.group(1).lower()
-            pkg_name = text.group(2).lower()
-            if lib_name == "work":
-                # Work is an alias for the current library
-                lib_name = dep_file.library
-            logging.debug("use package %s.%s", lib_name, pkg_name)
-            dep_file.add_require(
-                DepRelation(pkg_name, lib_name, DepRelation.PACKAGE))
-            return "<hdlmake use_pattern %s.%s>" % (lib_name, pkg_name)
-        buf = re.sub(use_pattern, do_use, buf)
-        
-        # new entity
-        entity_pattern = re.compile(
-            r"^\s*entity\s+(?P<name>\w+)\s+is\s+(?:port|generic|end)"
-            r".*?((?P=name)|entity)\s*;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-        def do_entity(text):
-            """Function to be applied by re.sub to every match of the
-            entity_pattern in the VHDL code -- group() returns positive matches
-            as indexed plain strings. It adds the found PROVIDE relations
-            to the file"""
-            ent_name = text.group(1)
-            logging.debug("found entity %s.%s", dep_file.library, ent_name)
-            dep_file.add_provide(
-                DepRelation(ent_name, dep_file.library, DepRelation.ENTITY))
-            return "<hdlmake entity_pattern %s.%s>" % (dep_file.library, ent_name)
-
-        buf = re.sub(entity_pattern, do_entity, buf)
-
-        # new architecture
-        architecture_split_pattern = re.compile(
-            r"^\s*architecture\s+(?P<name>\w+)\s+of\s+(\w+)\s+is",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_architecture(text):
-            """Function to be applied by re.sub to every match of the
-            architecture_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It adds the found PROVIDE
-            relations to the file"""
-            arch_name = text.group(1)
-            ent_name = text.group(2)
-            logging.debug("found architecture %s of entity %s.%s",
-                          arch_name, dep_file.library, ent_name)
-            dep_file.add_provide(
-                DepRelation(ent_name, dep_file.library, DepRelation.ARCHITECTURE))
-            dep_file.add_require(
-                DepRelation(ent_name, dep_file.library, DepRelation.ENTITY))
-
-            return "<hdlmake architecture %s.%s>" % (dep_file.library,
-                                                     text.group(2))
-        buf = re.sub(architecture_split_pattern, do_architecture, buf)
-
-        # new package
-        package_pattern = re.compile(
-            r"^\s*package\s+(\w+)\s+is",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_package(text):
-            """Function to be applied by re.sub to every match of the
-            package_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It adds the found PROVIDE
-            relations to the file"""
-            pkg_name = text.group(1)
-            logging.debug("found package %s.%s", dep_file.library, pkg_name)
-            dep_file.add_provide(
-                DepRelation(pkg_name, dep_file.library, DepRelation.PACKAGE))
-            return "<hdlmake package %s.%s>" % (dep_file.library, pkg_name)
-        buf = re.sub(package_pattern, do_package, buf)
-
-        # component declaration
-        component_pattern = re.compile(
-            r"^\s*component\s+(\w+).*?end\s+component.*?;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_component(text):
-            """Function to be applied by re.sub to every match of the
-            component_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It doesn't add any relation
-            to the file"""
-            logging.debug("found component declaration %s", text.group(1))
-            return "<hdlmake component %s>" % text.group(1)
-
-        buf = re.sub(component_pattern, do_component, buf)
-
-        # Signal declaration
-        signal_pattern = re.compile(
-            r"^\s*signal\s+(\w+).*?;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_signal(text):
-            """Function to be applied by re.sub to every match of the
-            signal_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It doesn't add any relation
-            to the file"""
-            logging.debug("found signal declaration %s", text.group(1))
-            return "<hdlmake signal %s>" % text.group(1)
-
-        buf = re.sub(signal_pattern, do_signal, buf)
-
-        # Constant declaration
-        constant_pattern = re.compile(
-            r"^\s*constant\s+(\w+).*?;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_constant(text):
-            """Function to be applied by re.sub to every match of the
-            constant_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It doesn't add any relation
-            to the file"""
-            logging.debug("found constant declaration %s", text.group(1))
-            return "<hdlmake constant %s>" % text.group(1)
-
-        buf = re.sub(constant_pattern, do_constant, buf)
-
-
-        # record declaration
-        record_pattern = re.compile(
-            r"^\s*type\s+(\w+)\s+is\s+record.*?end\s+record.*?;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_record(text):
-            """Function to be applied by re.sub to every match of the
-            record_pattern in the VHDL code -- group() returns positive matches
-            as indexed plain strings. It doesn't add any relation to the
-            file"""
-            logging.debug("found record declaration %s", text.group(1))
-            return "<hdlmake record %s>" % text.group(1)
-
-        buf = re.sub(record_pattern, do_record, buf)
-
-        # function declaration
-        function_pattern = re.compile(
-            r"^\s*function\s+(?P<name>\w+)"
-            r".*?" # gobble arguments if any.
-            r"return\s+\w+"
-            r"(\s+is.*?end\s+function.*?)?" # gobble body if any.
-            r"\s*;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_function(text):
-            """Function to be applied by re.sub to every match of the
-            funtion_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It doesn't add the relations
-            to the file"""
-            logging.debug("found function declaration %s", text.group(1))
-            return "<hdlmake function %s>" % text.group(1)
-
-        buf = re.sub(function_pattern, do_function, buf)
-
-        # instantiations
-        libraries = set([dep_file.library])
-        instance_pattern = re.compile(
-            r"^\s*(?P<LABEL>\w+)\s*:"
-            r"\s*(?:entity\s+(?P<LIB>\w+)\.)?(?P<ENTITY>\w+)"
-            r"\s*(?:\(\s*(?P<ARCH>\w+)\s*\)\s*)?"
-            r"(?:port\s+map.*?|generic\s+map.*?)",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
-
-        def do_instance(text):
-            """Function to be applied by re.sub to every match of the
-            instance_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It adds the found USE
-            relations to the file"""
-            logging.debug("-> instantiates %s.%s(%s) as %s",
-                          text.group("LIB"), text.group("ENTITY"), text.group("ARCH"), text.group("LABEL"))
-            lib_name = text.group("LIB")
-            if not lib_name or lib_name == "work":
-                lib_name = dep_file.library
-            ent_name = text.group("ENTITY")
-            dep_file.add_require(DepRelation(ent_name, lib_name, DepRelation.ENTITY))
-            return "<hdlmake instance %s|%s|%s>" % (text.group("LABEL"), lib_name, ent_name)
-        buf = re.sub(instance_pattern, do_instance, buf)
+        # The comments and strings are removed from the VHDL code
+        with _map_code(dep_file.path) as buf:
+            logging.debug("preprocessed file %s (of length %d) in library %s",
+                          dep_file.path, len(buf), dep_file.library)
+            prefilter = Prefilter(buf, ignore_case=True)
+            if prefilter.is_protected("vhdl protected", _KEYWORDS):
+                logging.debug("%s is encrypted, nothing to parse",
+                              dep_file.path)
+                dep_file.is_parsed = True
+                return
+            names = tuple(name for name, keywords, _ in _RULES
+                          if prefilter.run_pass("vhdl " + name, keywords))
+            if any(name in _RELATION_RULES for name in names):
+                self._scan(dep_file, buf, names, 0)
+        dep_file.is_parsed = True
 
-        # libraries
-        library_pattern = re.compile(
-            r"^\s*library\s*(\w+)\s*;",
-            re.DOTALL | re.MULTILINE | re.IGNORECASE)
+    def _scan(self, dep_file, buf, names, begin, end=None):
+        """Add to :param dep_file: the relations for the constructs in
+        :param names: starting in buf[begin:end], and return the position
+        at which the last match ended"""
+        from .dep_file import DepRelation
+        first_line, scanner = _get_scanner(names)
+        pos = begin
+        # The nested scans start within a match, never at the first line.
+        match = first_line.match(buf) if end is None and begin == 0 else None
+        while True:
+            if end is None:
+                if match is None:
+                    match = scanner.search(buf, pos)
+            else:
+                # Only the matches starting before the end are wanted, but
+                # they can extend beyond it: try the lines one by one.
+                match = None
+                newline = buf.find(b"\n", pos, end)
+                while newline >= 0:
+                    match = scanner.match(buf, newline)
+                    if match is not None:
+                        break
+                    newline = buf.find(b"\n", newline + 1, end)
+            if match is None:
+                break
+            kind = match.lastgroup
+            if end is not None and match.start(kind) >= end:
+                break
+            pos = match.end()
+            if kind == "use":
+                lib_name = _group(match, "use_lib")
+                pkg_name = _group(match, "use_pkg")
+                if lib_name.lower() == "work":
+                    # Work is an alias for the current library
+                    lib_name = dep_file.library
+                logging.debug("use package %s.%s", lib_name, pkg_name)
+                dep_file.add_require(
+                    DepRelation(pkg_name, lib_name, DepRelation.PACKAGE))
+            elif kind == "binding":
+                lib_name = _group(match, "bind_lib")
+                unit_name = _group(match, "bind_name")
+                logging.debug("bound to %s %s.%s", _group(match, "bind_kind"),
+                              lib_name, unit_name)
+                if lib_name.lower() == "work":
+                    lib_name = dep_file.library
+                if _group(match, "bind_kind").lower() == "entity":
+                    rel_type = DepRelation.ENTITY
+                else:
+                    rel_type = DepRelation.CONFIGURATION
+                dep_file.add_require(
+                    DepRelation(unit_name, lib_name, rel_type))
+            elif kind == "context_ref":
+                for context_ref in _group(match, "context_refs").split(","):
+                    lib_name, ctx_name = [
+                        name.strip() for name in context_ref.split(".")]
+                    if lib_name.lower() == "work":
+                        lib_name = dep_file.library
+                    logging.debug("use context %s.%s", lib_name, ctx_name)
+                    dep_file.add_require(
+                        DepRelation(ctx_name, lib_name, DepRelation.CONTEXT))
+            elif kind == "context":
+                ctx_name = _group(match, "context_name")
+                logging.debug("found context %s.%s",
+                              dep_file.library, ctx_name)
+                dep_file.add_provide(
+                    DepRelation(ctx_name, dep_file.library,
+                                DepRelation.CONTEXT))
+            elif kind == "entity":
+                ent_name = _group(match, "entity_name")
+                logging.debug("found entity %s.%s",
+                              dep_file.library, ent_name)
+                dep_file.add_provide(
+                    DepRelation(ent_name, dep_file.library,
+                                DepRelation.ENTITY))
+            elif kind == "architecture":
+                ent_name = _group(match, "arch_entity")
+                logging.debug("found architecture %s of entity %s.%s",
+                              _group(match, "arch_name"), dep_file.library,
+                              ent_name)
+                dep_file.add_provide(
+                    DepRelation(ent_name, dep_file.library,
+                                DepRelation.ARCHITECTURE))
+                dep_file.add_require(
+                    DepRelation(ent_name, dep_file.library,
+                                DepRelation.ENTITY))
+            elif kind == "package_instance":
+                pkg_name = _group(match, "pkg_inst_name")
+                lib_name = _group(match, "generic_lib")
+                generic_name = _group(match, "generic_pkg")
+                logging.debug("found package %s.%s, instance of %s.%s",
+                              dep_file.library, pkg_name, lib_name,
+                              generic_name)
+                if not lib_name or lib_name.lower() == "work":
+                    lib_name = dep_file.library
+                dep_file.add_provide(
+                    DepRelation(pkg_name, dep_file.library,
+                                DepRelation.PACKAGE))
+                dep_file.add_require(
+                    DepRelation(generic_name, lib_name, DepRelation.PACKAGE))
+            elif kind == "package":
+                pkg_name = _group(match, "package_name")
+                logging.debug("found package %s.%s",
+                              dep_file.library, pkg_name)
+                dep_file.add_provide(
+                    DepRelation(pkg_name, dep_file.library,
+                                DepRelation.PACKAGE))
+            elif kind == "package_body":
+                pkg_name = _group(match, "body_name")
+                logging.debug("found package body %s.%s",
+                              dep_file.library, pkg_name)
+                dep_file.add_provide(
+                    DepRelation(pkg_name, dep_file.library,
+                                DepRelation.PACKAGE_BODY))
+                dep_file.add_require(
+                    DepRelation(pkg_name, dep_file.library,
+                                DepRelation.PACKAGE))
+            elif kind == "configuration":
+                conf_name = _group(match, "conf_name")
+                ent_name = _group(match, "conf_entity")
+                logging.debug("found configuration %s.%s of entity %s",
+                              dep_file.library, conf_name, ent_name)
+                dep_file.add_provide(
+                    DepRelation(conf_name, dep_file.library,
+                                DepRelation.CONFIGURATION))
+                dep_file.add_require(
+                    DepRelation(ent_name, dep_file.library,
+                                DepRelation.ENTITY))
+            elif kind == "instance":
+                lib_name = _group(match, "inst_lib")
+                ent_name = _group(match, "inst_entity")
+                logging.debug("-> instantiates %s.%s(%s) as %s",
+                              lib_name, ent_name, _group(match, "inst_arch"),
+                              _group(match, "inst_label"))
+                if not lib_name or lib_name.lower() == "work":
+                    lib_name = dep_file.library
+                inst_kind = _group(match, "inst_kind") or "entity"
+                if inst_kind.lower() == "configuration":
+                    rel_type = DepRelation.CONFIGURATION
+                else:
+                    rel_type = DepRelation.ENTITY
+                dep_file.add_require(
+                    DepRelation(ent_name, lib_name, rel_type))
+            else:
+                logging.debug("found %s declaration", kind)
+            inner_names = _get_inner_names(names, kind)
+            if inner_names and b"\n" in match.group(kind):
+                # The constructs taking precedence are still looked for
+                # in the lines of a multi-line match, and they can extend
+                # beyond its end.
+                text = match.group(kind).lower()
+                if any(keyword in text for name in inner_names
+                       for keyword in _KEYWORDS_BY_RULE[name]):
+                    pos = max(pos, self._scan(dep_file, buf, inner_names,
+                                              match.start(kind),
+                                              match.end(kind)))
+            match = None
+        return pos
 
-        def do_library(text):
-            """Function to be applied by re.sub to every match of the
-            library_pattern in the VHDL code -- group() returns positive
-            matches as indexed plain strings. It adds the used libraries
-            to the file's 'library' property"""
-            logging.debug("use library %s", text.group(1))
-            libraries.add(text.group(1))
-            return "<hdlmake library %s>" % text.group(1)
-        buf = re.sub(library_pattern, do_library, buf)
-        # logging.debug("\n" + buf) # print modified buffer.
 
-        dep_file.is_parsed = True
@@ -29,16 +29,504 @@ from __future__ import print_function
 from __future__ import absolute_import
 import os
 import re
+import itertools
 import sys
 import logging
 
 from .new_dep_solver import DepParser
+from .source_reader import map_file, read_text, decode
 from .dep_file import DepRelation
+from .prefilter import Prefilter
+from . import include_cache
 from .srcfile import create_source_file
 from collections import namedtuple
 import six
 
 
+# Pattern matching the comments and the strings, which may contain '//'.
+# An unterminated block comment extends to the end of the text, so that
+# it is not looked for again from every following '/*'.
+_COMMENT_PATTERN = re.compile(
+    r'//.*?$|/\*.*?(?:\*/|\Z)|"(?:\\.|[^\\"])*"', re.DOTALL | re.MULTILINE)
+# Pattern used by the provides-only scan, which doesn't preprocess the file
+# and runs over its bytes. The comments and strings are matched so that
+# they are skipped, and the include directives so that the scan can give
+# up. The keyword must start a word that is not part of a hierarchical or scoped
+# name, so that e.g. the 'module' of 'endmodule' is not matched.
+_SCAN_BLANK = br"(?:\s|//[^\n]*|/\*.*?\*/)+"
+_SCAN_PROVIDE_PATTERN = re.compile(
+    br'//[^\n]*|/\*.*?(?:\*/|\Z)|"(?:\\.|[^\\"])*"|(?P<include>`include\b)'
+    br"|(?<![\w$.:`])(?P<keyword>macromodule|module|interface|package)"
+    + _SCAN_BLANK + br"(?:(?:static|automatic)" + _SCAN_BLANK + br")?"
+    br"(?P<name>`?\w+)", re.DOTALL)
+# Keywords that must appear out of the encrypted regions of a file for the
+# parser to find any relation in it.
+_KEYWORDS = ("module", "interface", "package", "::", "`include")
+
+# Patterns used by the preprocessor.
+_PROTECT_PATTERN = re.compile(
+    r'`pragma\s+protect\s+(begin|end)_protected\b')
+_VPP_TOKEN_PATTERN = re.compile(
+    r'(?:`(ifn?def|elsif|else|endif|define|include)('
+    r'(?<=ifdef\b)\s+(?:\w+)|(?<=ifndef\b)\s+(?:\w+)|(?<=elsif\b)\s+(?:\w+)|'
+    r'(?:(?<=define\b)\s+(\w+)(?:\(([\w\s,]*)\))?[ \t]*((?:\\\n|[^\n\r])*)$)|'
+    r'(?<=include\b)\s+"(.+?)")?)|(?:`(\w+)(?:\(([\w\s,]*)\))?)',
+    re.MULTILINE)
+_BLANK_LINE_PATTERN = re.compile(r'^\s*\n', re.MULTILINE)
+
+_VppMatch = namedtuple('_VppMatch', ['mtext', 'pptype', 'ppident',
+                                     'macroident', 'ppargs', 'ppdefn',
+                                     'incfile', 'substid'])
+_VppMacroDefn = namedtuple('_VppMacroDefn', ['params', 'expansion'])
+
+
+def _remove_comment(text):
+    """Remove the comments from the Verilog code, keeping the strings"""
+    def replacer(match):
+        """Funtion that replace the matching comments"""
+        text = match.group(0)
+        if text.startswith('/'):
+            return ""
+        else:
+            return text
+    return _COMMENT_PATTERN.sub(replacer, text)
+
+
+def _remove_protected_regions(text):
+    """Remove the encrypted regions of the Verilog code, each one going
+    from a 'begin_protected' directive to the following 'end_protected'
+    one. The directives are found in a single pass over the text"""
+    chunks = []
+    start = 0
+    begin = None
+    for match in _PROTECT_PATTERN.finditer(text):
+        if match.group(1) == "begin":
+            if begin is None:
+                begin = match.start()
+        elif begin is not None:
+            chunks.append(text[start:begin])
+            start = match.end()
+            begin = None
+    chunks.append(text[start:])
+    return "".join(chunks)
+
+
+def _tokenize(text):
+    """Generator splitting the Verilog code into the chunks of text and
+    the preprocessor directives or macro uses separating them"""
+    pos = 0
+    for match in _VPP_TOKEN_PATTERN.finditer(text):
+        yield text[pos:match.start()]
+        ppident, ppdefn = match.group(2, 5)
+        yield _VppMatch(match.group(0), match.group(1),
+                        ppident.strip() if ppident else None,
+                        match.group(3), match.group(4),
+                        ppdefn.replace('\\\n', '') if ppdefn else '',
+                        match.group(6), match.group(7))
+        pos = match.end()
+    yield text[pos:]
+
+
+def _tokenize_include(text):
+    """Remove the comments from the included Verilog code and split it"""
+    return _tokenize(_remove_comment(text))
+
+
+# Tokens of the preprocessed Verilog code seen by the module scanner.
+_TOKEN_PATTERN = re.compile(r'"(?:\\.|[^\\"])*"|[\w$]+|::|\S')
+_MODULE_KEYWORDS = frozenset(["module", "macromodule", "interface"])
+# Lifetimes that can be given to a module or interface before its name.
+_LIFETIMES = frozenset(["static", "automatic"])
+_ENDMODULE_KEYWORDS = frozenset(["endmodule", "endinterface"])
+# Keywords after which a new statement, maybe an instantiation, starts.
+_STATEMENT_KEYWORDS = frozenset(["begin", "end", "fork", "join", "join_any",
+                                 "join_none", "generate", "endgenerate",
+                                 "endcase", "else"])
+# Keywords introducing a statement after a parenthesized expression.
+_CONDITION_KEYWORDS = frozenset(["if", "for", "foreach", "while", "repeat",
+                                 "case", "casex", "casez"])
+_ALWAYS_KEYWORDS = frozenset(["always", "always_ff", "always_latch",
+                              "always_comb"])
+_SUBROUTINE_ENDS = {"function": "endfunction", "task": "endtask"}
+_GROUP_ENDS = {"(": ")", "[": "]", "{": "}"}
+_GROUP_TOKENS = frozenset(_GROUP_ENDS) | frozenset(_GROUP_ENDS.values())
+_DIRECTION_KEYWORDS = frozenset(["input", "output", "inout", "ref"])
+# Scopes that are not packages.
+_SCOPE_KEYWORDS = frozenset(["this", "super", "local", "std"])
+
+
+class _Tokens(list):
+
+    """List of the tokens of the preprocessed Verilog code, that matches
+    all of the groups at once when needed and remembers the tokens missing
+    after some position, so that the scanners never walk over the same
+    tokens again and again, whatever the code"""
+
+    def __init__(self, text):
+        list.__init__(self, _TOKEN_PATTERN.findall(text))
+        self.group_ends = None
+        self._missing_from = {}
+
+    def get_group_end(self, pos):
+        """Get the position following the parenthesis, bracket or brace
+        closing the one at :param pos:, or the number of tokens if it is
+        not closed. The groups are all matched in a single pass"""
+        if self.group_ends is None:
+            self.group_ends = {}
+            openings = dict((opening, []) for opening in _GROUP_ENDS)
+            closings = dict((closing, openings[opening])
+                            for opening, closing in _GROUP_ENDS.items())
+            for index in itertools.compress(
+                    itertools.count(),
+                    map(_GROUP_TOKENS.__contains__, self)):
+                token = self[index]
+                if token in openings:
+                    openings[token].append(index)
+                elif closings[token]:
+                    self.group_ends[closings[token].pop()] = index + 1
+        return self.group_ends.get(pos, len(self))
+
+    def find(self, token, pos):
+        """Get the position of the first :param token: at or after
+        :param pos:, or -1 if there is none"""
+        if pos >= self._missing_from.get(token, len(self)):
+            return -1
+        try:
+            return self.index(token, pos)
+        except ValueError:
+            self._missing_from[token] = pos
+            return -1
+
+
+# Number of tokens searched for the end of a group before all of the
+# groups of the code are matched.
+_GROUP_WINDOW = 4096
+
+
+def _skip_group(tokens, pos):
+    """Get the position following the parenthesis, bracket or brace closing
+    the one at :param pos: in :param tokens:. Most groups are short, so
+    their end is looked for nearby before matching all of the groups, which
+    would be costly to do for every file, but keeps the time taken linear
+    when many groups are long or not closed"""
+    if tokens.group_ends is not None:
+        return tokens.get_group_end(pos)
+    begin = pos
+    opening = tokens[pos]
+    closing = _GROUP_ENDS[opening]
+    limit = pos + _GROUP_WINDOW
+    depth = 1
+    pos += 1
+    while True:
+        try:
+            end = tokens.index(closing, pos, limit)
+        except ValueError:
+            return tokens.get_group_end(begin)
+        depth += tokens[pos:end].count(opening) - 1
+        pos = end + 1
+        if depth == 0:
+            return pos
+
+
+def _match_header(tokens, pos):
+    """Match the header of a module, i.e. the optional package imports,
+    parameter and port lists followed by a semicolon, starting at
+    :param pos: in :param tokens:. Return the position of the port list,
+    None if there is none, and the position following the header, or None
+    if there is no match"""
+    size = len(tokens)
+    ports = None
+    while pos < size and tokens[pos] == "import":
+        # import pkg::item, pkg::*;
+        pos += 1
+        while (pos + 2 < size and tokens[pos].isidentifier()
+               and tokens[pos + 1] == "::"):
+            pos += 3
+            if pos >= size or tokens[pos] != ",":
+                break
+            pos += 1
+        if pos >= size or tokens[pos] != ";":
+            return None
+        pos += 1
+    if pos < size and tokens[pos] == "#":
+        if pos + 1 >= size or tokens[pos + 1] != "(":
+            return None
+        pos = _skip_group(tokens, pos + 1)
+    if pos < size and tokens[pos] == "(":
+        ports = pos
+        pos = _skip_group(tokens, pos)
+    if pos < size and tokens[pos] == ";":
+        return ports, pos + 1
+    return None
+
+
+def _scan_interface_ports(tokens, pos, reserved_words, local_types):
+    """Get the interfaces used by the port list starting at :param pos:
+    in :param tokens:, i.e. the types of the 'bus_if.modport name' ports
+    and of the 'bus_if name' ports declared before any port direction,
+    as interface ports have none"""
+    end = _skip_group(tokens, pos) - 1
+    interfaces = []
+    direction_seen = False
+    port_start = True
+    pos += 1
+    while pos < end:
+        token = tokens[pos]
+        if token in _GROUP_ENDS:
+            pos = _skip_group(tokens, pos)
+            port_start = False
+            continue
+        if token == ",":
+            port_start = True
+        elif port_start:
+            port_start = False
+            if token in _DIRECTION_KEYWORDS:
+                direction_seen = True
+            elif (token.isidentifier() and token not in reserved_words
+                  and token not in local_types and pos + 3 < end):
+                if tokens[pos + 1] == ".":
+                    # Modport
+                    if (tokens[pos + 2].isidentifier()
+                            and tokens[pos + 3].isidentifier()):
+                        interfaces.append(token)
+                elif not direction_seen and tokens[pos + 1].isidentifier():
+                    interfaces.append(token)
+        pos += 1
+    return interfaces
+
+
+def _match_instantiation(tokens, pos):
+    """Match the instantiation 'type #(...) name [...] (...)' starting at
+    :param pos: in :param tokens:. Return the position following it and
+    the name of the instance, or None"""
+    size = len(tokens)
+    pos += 1
+    if pos < size and tokens[pos] == "#":
+        if pos + 1 >= size or tokens[pos + 1] != "(":
+            return None
+        pos = _skip_group(tokens, pos + 1)
+    if pos >= size or not tokens[pos].isidentifier():
+        return None
+    name = tokens[pos]
+    pos += 1
+    if pos < size and tokens[pos] == "[":
+        pos = _skip_group(tokens, pos)
+    if pos >= size or tokens[pos] != "(":
+        return None
+    pos = _skip_group(tokens, pos)
+    if pos < size and tokens[pos] not in (";", ","):
+        return None
+    return pos, name
+
+
+def _scan_module_body(tokens, pos, reserved_words):
+    """Scan the body of a module starting at :param pos: in :param tokens:
+    in one pass, keeping track of the statement boundaries so that the
+    instantiations are only looked for at the beginning of statements.
+    Return the position following the module and the list of the
+    (module type, instance name) tuples found, or None if the module is
+    not terminated"""
+    size = len(tokens)
+    instances = []
+    statement_start = True
+    while pos < size:
+        token = tokens[pos]
+        if token in _ENDMODULE_KEYWORDS:
+            return pos + 1, instances
+        elif token == ";" or token in _STATEMENT_KEYWORDS:
+            pos += 1
+            # Skip the label of a block.
+            if pos + 1 < size and tokens[pos] == ":":
+                pos += 2
+            statement_start = True
+        elif token in _SUBROUTINE_ENDS and not (
+                tokens[pos - 1] == "extern" or tokens[pos - 1][0] == '"'):
+            # Skip the body, unless this is an extern or DPI prototype.
+            end = tokens.find(_SUBROUTINE_ENDS[token], pos)
+            pos = pos + 1 if end < 0 else end + 1
+            statement_start = True
+        elif token in _CONDITION_KEYWORDS or token in _ALWAYS_KEYWORDS:
+            pos += 1
+            if pos < size and tokens[pos] == "@":
+                pos += 1
+            if pos < size and tokens[pos] == "(":
+                pos = _skip_group(tokens, pos)
+            elif pos < size and tokens[pos] == "*":
+                pos += 1
+            statement_start = True
+        elif token in _GROUP_ENDS:
+            # An attribute instance '(* ... *)' is part of the statement
+            # it precedes, which may still be an instantiation.
+            is_attribute = (token == "(" and pos + 2 < size
+                            and tokens[pos + 1] == "*"
+                            and tokens[pos + 2] != ")")
+            pos = _skip_group(tokens, pos)
+            statement_start = statement_start and is_attribute
+        elif (statement_start and token.isidentifier()
+              and token not in reserved_words):
+            match = _match_instantiation(tokens, pos)
+            if match is None:
+                pos += 1
+            else:
+                pos, name = match
+                instances.append((token, name))
+            statement_start = False
+        else:
+            pos += 1
+            statement_start = False
+    return None
+
+
+def _scan_modules(tokens, reserved_words, local_types=frozenset()):
+    """Generator finding the modules and interfaces declared in the
+    preprocessed Verilog code split in :param tokens:. It yields the name
+    of every module, the list of the (module type, instance name) tuples
+    for the instantiations in its body and the list of the interfaces used
+    by its ports"""
+    size = len(tokens)
+    pos = 0
+    while pos < size:
+        token = tokens[pos]
+        pos += 1
+        if token not in _MODULE_KEYWORDS or pos >= size:
+            continue
+        if tokens[pos] in _LIFETIMES and pos + 1 < size:
+            pos += 1
+        if not tokens[pos].isidentifier():
+            continue
+        header = _match_header(tokens, pos + 1)
+        if header is None:
+            continue
+        ports, body = header
+        match = _scan_module_body(tokens, body, reserved_words)
+        if match is None:
+            # The following modules would be unterminated too, only the
+            # end of the tokens would be scanned again for each of them.
+            return
+        if ports is None:
+            interfaces = []
+        else:
+            interfaces = _scan_interface_ports(tokens, ports,
+                                               reserved_words, local_types)
+        yield tokens[pos], match[1], interfaces
+        pos = match[0]
+
+
+def _find_all(tokens, token):
+    """Generator yielding the positions of :param token: in :param tokens:"""
+    pos = -1
+    while True:
+        try:
+            pos = tokens.index(token, pos + 1)
+        except ValueError:
+            return
+        yield pos
+
+
+def _skip_hierarchical_name(tokens, pos):
+    """Get the position following the possibly hierarchical and indexed
+    name, like 'top.u_core[0].u_alu', starting at :param pos: in
+    :param tokens:"""
+    size = len(tokens)
+    if pos < size and tokens[pos].isidentifier():
+        pos += 1
+        while pos < size:
+            if tokens[pos] == "[":
+                pos = _skip_group(tokens, pos)
+            elif (tokens[pos] == "." and pos + 1 < size
+                  and tokens[pos + 1].isidentifier()):
+                pos += 2
+            else:
+                break
+    return pos
+
+
+def _scan_local_types(tokens):
+    """Get the names of the classes and types declared in the code split in
+    :param tokens:, which can be used as scopes like packages"""
+    local_types = set()
+    size = len(tokens)
+    for pos in _find_all(tokens, "class"):
+        if pos + 1 < size and tokens[pos + 1].isidentifier():
+            local_types.add(tokens[pos + 1])
+    end = 0
+    for pos in _find_all(tokens, "typedef"):
+        if pos < end:
+            # Inside of the previous typedef, which is not terminated.
+            continue
+        # The type name is the last identifier out of any brackets.
+        name = None
+        pos += 1
+        while pos < size and tokens[pos] not in (";", "typedef"):
+            if tokens[pos] in _GROUP_ENDS:
+                pos = _skip_group(tokens, pos)
+                continue
+            if tokens[pos].isidentifier():
+                name = tokens[pos]
+            pos += 1
+        end = pos
+        if name is not None:
+            local_types.add(name)
+    return local_types
+
+
+def _scan_packages_used(tokens, local_types):
+    """Generator yielding the names used as scope, like 'pkg' in 'pkg::*'
+    or 'pkg::item', other than the classes and types in :param local_types:
+    and the 'this', 'super', 'local' and 'std' keywords"""
+    for pos in _find_all(tokens, "::"):
+        if pos == 0 or (pos > 1 and tokens[pos - 2] == "::"):
+            # Nested scope, as 'cls' in 'pkg::cls::item'
+            continue
+        name = tokens[pos - 1]
+        if (name.isidentifier() and name not in _SCOPE_KEYWORDS
+                and name not in local_types):
+            yield name
+
+
+def _scan_packages(tokens):
+    """Generator yielding the names of the packages declared, i.e. the
+    names following the 'package' keywords terminated by an 'endpackage'"""
+    size = len(tokens)
+    end = 0
+    for pos in _find_all(tokens, "package"):
+        if pos < end or pos + 1 >= size or not tokens[pos + 1].isidentifier():
+            continue
+        end = tokens.find("endpackage", pos)
+        if end < 0:
+            return
+        yield tokens[pos + 1]
+
+
+def _scan_virtual_interfaces(tokens, reserved_words):
+    """Generator yielding the interfaces used by the 'virtual bus_if' and
+    'virtual interface bus_if' declarations"""
+    size = len(tokens)
+    for pos in _find_all(tokens, "virtual"):
+        pos += 1
+        if pos < size and tokens[pos] == "interface":
+            pos += 1
+        if (pos < size and tokens[pos].isidentifier()
+                and tokens[pos] not in reserved_words):
+            yield tokens[pos]
+
+
+def _scan_binds(tokens, reserved_words):
+    """Generator yielding the modules instantiated by the 'bind target
+    module_type name (...)' statements, the target being an instance or
+    a module followed by a list of its instances"""
+    size = len(tokens)
+    for pos in _find_all(tokens, "bind"):
+        pos = _skip_hierarchical_name(tokens, pos + 1)
+        if pos < size and tokens[pos] == ":":
+            pos = _skip_hierarchical_name(tokens, pos + 1)
+            while pos < size and tokens[pos] == ",":
+                pos = _skip_hierarchical_name(tokens, pos + 1)
+        if (pos < size and tokens[pos].isidentifier()
+                and tokens[pos] not in reserved_words):
+            yield tokens[pos]
+
+
 class VerilogPreprocessor(object):
 
     """This class provides the Verilog Preprocessor"""
@@ -67,172 +555,135 @@ class VerilogPreprocessor(object):
         """Look for the 'filename' Verilog include file in the
         provided 'parent_dir'. If the directory is not provided, the method
         will search for the Verilog include in every defined Verilog
-        preprocessor search directory"""
-        if parent_dir is not None:
-            possible_file = os.path.join(parent_dir, filename)
-            if os.path.isfile(possible_file):
-                return os.path.abspath(possible_file)
-        for searchdir in self.vlog_file.include_dirs:
-            probable_file = os.path.join(searchdir, filename)
-            if os.path.isfile(probable_file):
-                return os.path.abspath(probable_file)
-        raise Exception("Can't find {} for {} in any of the include "
-                        "directories: {}".format(filename, self.vlog_file.path,
-                        ', '.join(self.vlog_file.include_dirs)))
+        preprocessor search directory. The result is shared with the other
+        preprocessors looking for the same file from the same places"""
+        def _search():
+            """Look for the file in the filesystem"""
+            if parent_dir is not None:
+                possible_file = os.path.join(parent_dir, filename)
+                if os.path.isfile(possible_file):
+                    return os.path.abspath(possible_file)
+            for searchdir in self.vlog_file.include_dirs:
+                probable_file = os.path.join(searchdir, filename)
+                if os.path.isfile(probable_file):
+                    return os.path.abspath(probable_file)
+            raise Exception("Can't find {} for {} in any of the include "
+                            "directories: {}".format(
+                                filename, self.vlog_file.path,
+                                ', '.join(self.vlog_file.include_dirs)))
+        # The include directories may be relative to the current directory.
+        key = (filename, parent_dir, os.getcwd(),
+               tuple(self.vlog_file.include_dirs))
+        return include_cache.resolve(key, _search)
 
-    def _preprocess_file(self, file_content, file_name, library):
-        """Preprocess the content of the Verilog file"""
-        def _remove_comment(text):
-            """Function that removes the comments from the Verilog code"""
-            def replacer(match):
-                """Funtion that replace the matching comments"""
-                text = match.group(0)
-                if text.startswith('/'):
-                    return ""
+    def _handle_macros(self, text, file_name, library):
+        """Process the Verilog code in 'text' to implement the
+        ifdef/ifndef/elsif/else/endif, define and include logic, starting
+        with the macros defined for the Verilog file. The tokens
+        are pulled from a stack of iterators, one for the file and one for
+        each include or macro expansion being processed, and the enabled
+        text is appended to a list, so the processing time is linear in
+        the size of the code"""
+        output = []
+        macros = dict(include_cache.get_macros(
+            self.vlog_file.vlog_defines,
+            lambda value: _VppMacroDefn(None, value)))
+        # Stack of (token iterator, is a macro expansion) tuples.
+        stack = [(_tokenize(text), False)]
+        # Stack of (parent region enabled, branch already taken) tuples,
+        # one for each `ifdef/`ifndef being processed.
+        conditions = []
+        enabled = True
+        self.macro_depth = 0
+        while stack:
+            token = next(stack[-1][0], None)
+            if token is None:
+                if stack.pop()[1]:
+                    self.macro_depth -= 1
+            elif isinstance(token, str):
+                if enabled:
+                    output.append(token)
+            elif token.pptype in ('ifdef', 'ifndef'):
+                taken = token.ppident in macros
+                if token.pptype == 'ifndef':
+                    taken = not taken
+                conditions.append((enabled, taken))
+                enabled = enabled and taken
+            elif token.pptype in ('elsif', 'else', 'endif'):
+                if not conditions:
+                    logging.debug("verilog preprocessor: ignoring `%s "
+                                  "without `ifdef in %s",
+                                  token.pptype, file_name)
+                    continue
+                parent_enabled, handled = conditions[-1]
+                if token.pptype == 'endif':
+                    conditions.pop()
+                    enabled = parent_enabled
+                    continue
+                if handled:
+                    # If a clause was already selected, skip this one.
+                    taken = False
+                elif token.pptype == 'elsif':
+                    taken = token.ppident in macros
                 else:
-                    return text
-            pattern = re.compile(
-                r'//.*?$|/\*.*?\*/|"(?:\\.|[^\\"])*"',
-                re.DOTALL | re.MULTILINE)
-            return re.sub(pattern, replacer, text)
-
-        def _filter_protected_regions(text):
-            '''Remove regions demarked by `pragma protect being_protected/end_protected'''
-            return re.sub(r'\s*`pragma\s+protect\s+begin_protected.*`pragma\s+protect\s+end_protected\b', '', text, flags=re.DOTALL)
-
-        def _handle_macros(text):
-            '''Process text to implement ifdef/ifndef/elsif/else/endif & define logic'''
-            vpp_match = namedtuple('vpp_match', ['mtext','pptype','ppident', 'macroident','ppargs','ppdefn','incfile','substid'])
-            vpp_macrodefn = namedtuple('vpp_macrodefn', ['params', 'expansion'])
-
-            def _munge_list(flist):
-                '''Take the split list & normalize into a list of string literals & seperator matches'''
-                assert flist
-                is_match = False # if nothing was present, split inserts an empty element
-                rlist = []
-                while flist:
-                    if is_match:
-                        assert len(flist) >= 9, "_munge_list: insufficient arguments for match object"
-                        rlist.append(vpp_match(flist[0],flist[1],None if not flist[2] else flist[2].strip(),
-                                               flist[3],flist[4],'' if not flist[5] else flist[5].replace('\\\n',''),flist[6],flist[7]))
-                        flist = flist[9:]
-                    else:
-                        rlist.append(flist.pop(0))
-                    is_match = not is_match
-                return rlist
-
-            def _tok_string(text):
-                toks = re.split(r'((?:`(ifn?def|elsif|else|endif|define|include)((?<=ifdef\b)\s+(?:\w+)|(?<=ifndef\b)\s+(?:\w+)|(?<=elsif\b)\s+(?:\w+)|(?:(?<=define\b)\s+(\w+)(?:\(([\w\s,]*)\))?[ \t]*((?:\\\n|[^\n\r])*)$)|(?<=include\b)\s+"(.+?)")?)|(?:`(\w+)(?:\(([\w\s,]*)\))?))', text, flags=re.MULTILINE)
-                return _munge_list(toks)
-
-            parts = _tok_string(text)
-
-            # PP tokens
-            vpp_macros = {}
-
-            def _proc_macros_layer(parts, gmacros):
-                '''Process a level of macros'''
-                lbuf    = ""
-                front   = parts.pop(0)
-                enabled = True
-                handled = False # we've handled an if condition
-                lmacros = dict(gmacros)
-
-                # we should only arrive here because either the start of a string was seen
-                # or an ifdef was detected
-                if isinstance(front, str):
-                    lbuf = front
-                elif front.pptype in ('ifdef','ifndef'):
-                    enabled = front.ppident in lmacros
-                    if front.pptype == 'ifndef':
-                        enabled = not enabled
-                    handled = enabled
+                    taken = True
+                conditions[-1] = (parent_enabled, handled or taken)
+                enabled = parent_enabled and taken
+            elif not enabled:
+                continue
+            elif token.pptype == 'define':
+                if token.macroident in self.vpp_keywords:
+                    raise Exception(
+                        "Attempt to `define a reserved preprocessor keyword")
+                macros[token.macroident] = _VppMacroDefn(token.ppargs,
+                                                         token.ppdefn)
+                output.append(token.mtext.replace('\\\n', ''))
+            elif token.pptype == 'include':
+                included_file_path = self._search_include(
+                    token.incfile, os.path.dirname(file_name))
+                logging.debug("File being parsed %s (library %s) "
+                              "includes %s",
+                              file_name, library, included_file_path)
+                # add include file to the dependancies
+                self.included_files.add(included_file_path)
+                tokens = include_cache.get_tokens(included_file_path,
+                                                  _tokenize_include)
+                stack.append((iter(tokens), False))
+            elif token.substid is not None:
+                if token.substid in macros:
+                    stack.append(
+                        (_tokenize(macros[token.substid].expansion), True))
+                    self.macro_depth += 1
+                    if self.macro_depth > 30:
+                        raise Exception(
+                            "Recursion level exceeded. Nested `includes?")
                 else:
-                    raise Exception("verilog preprocessor: unexpected token '%s'" % front[1])
-
-                while parts:
-                    # handle further ifdefs recusively
-                    front = parts.pop(0)
-                    if isinstance(front, str):
-                        if enabled:
-                            lbuf += front
-                    elif front.pptype in ('ifdef', 'ifndef'):
-                        # ifdef requires a new level, reinsert element & parse next level
-                        parts.insert(0, front)
-                        ctext, parts, cmacros = _proc_macros_layer(parts, lmacros)
-                        if enabled:
-                            lbuf    += ctext
-                            lmacros  = cmacros
-                    elif front.pptype == 'elsif':
-                        if not handled:
-                            enabled = front.ppident in lmacros
-                            handled = enabled
-                        else: # if a clause was already selected, skip this one
-                            enabled = False
-                    elif front.pptype == 'else':
-                        if not handled:
-                            enabled = True
-                            handled = True
-                        else:
-                            enabled = False
-                    elif front.pptype == 'endif':
-                        return lbuf, parts, lmacros
-                    elif front.pptype == 'define':
-                        if enabled:
-                            if front.macroident in self.vpp_keywords:
-                                raise Exception("Attempt to `define a reserved preprocessor keyword")
-                            lmacros[front.macroident] = vpp_macrodefn(front.ppargs, front.ppdefn)
-                            lbuf += front.mtext.replace('\\\n','')
-                    elif front.pptype == "include":
-                        if enabled:
-                            # maybe add a check for recusion here?
-                            included_file_path = self._search_include(front.incfile, os.path.dirname(file_name))
-                            logging.debug("File being parsed %s (library %s) "
-                                          "includes %s",
-                                          file_name, library, included_file_path)
-                            # add include file to the dependancies
-                            self.included_files.add(included_file_path)
-                            # tokenize the file & prepend to the current stack
-                            decomment = _remove_comment(open(included_file_path).read())
-                            tokens = _tok_string(decomment)
-                            parts = tokens + parts
-                    elif front.pptype == 'pop_macro':
-                        self.macro_depth -= 1
-                        assert self.macro_depth >= 0
-                    elif front.substid is not None:
-                        if enabled:
-                            # if not front.substid in lmacros:
-                            #     raise Exception("substitute unknown identifier! (%s)" % str(front))
-                            if front.substid in lmacros:
-                                tokens = _tok_string(lmacros[front.substid].expansion)
-                                tokens.append(vpp_match(None, 'pop_macro', front.substid, None, None, None, None, None))
-                                parts = tokens + parts
-                                self.macro_depth += 1
-                                if self.macro_depth > 30:
-                                    raise Exception("Recursion level exceeded. Nested `includes?")
-                            else:
-                                lbuf += front.mtext
-                    else:
-                        raise Exception("verilog preprocessor: unexpected token '%s' from %s" % (front[1], str(front)))
-
-                return lbuf, parts, lmacros
-
-            return re.sub(r'^\s*\n','', _proc_macros_layer(parts, vpp_macros)[0], flags=re.MULTILINE)
+                    output.append(token.mtext)
+            else:
+                raise Exception(
+                    "verilog preprocessor: unexpected token '%s' from %s" %
+                    (token.pptype, str(token)))
+        return _BLANK_LINE_PATTERN.sub('', ''.join(output))
 
+    def _preprocess_file(self, file_content, file_name, library):
+        """Preprocess the content of the Verilog file"""
         # init dependencies
         logging.debug("preprocess file %s (of length %d) in library %s",
                       file_name, len(file_content), library)
-        buf = _filter_protected_regions(_remove_comment(file_content))
-
-        return _handle_macros(buf)
+        buf = _remove_comment(file_content)
+        if "begin_protected" in buf:
+            buf = _remove_protected_regions(buf)
+        return self._handle_macros(buf, file_name, library)
 
-    def preprocess(self, vlog_file):
+    def preprocess(self, vlog_file, buf=None):
         """Assign the provided 'vlog_file' to the associated class property
-        and then preprocess and return the Verilog code"""
+        and then preprocess and return the Verilog code, read from the file
+        unless its content is provided in 'buf'"""
         # assert isinstance(vlog_file, VerilogFile)
         # assert isinstance(vlog_file, DepFile)
         self.vlog_file = vlog_file
-        buf = open(vlog_file.path, "r").read()
+        if buf is None:
+            buf = read_text(vlog_file.path)
         return self._preprocess_file(file_content=buf,
                                      file_name=vlog_file.path,
                                      library=vlog_file.library)
@@ -242,250 +693,268 @@ class VerilogParser(DepParser):
 
     """Class providing the Verilog Parser functionality"""
 
-    reserved_words = ["accept_on",
-                      "alias",
-                      "always",
-                      "always_comb",
-                      "always_ff",
-                      "always_latch",
-                      "assert",
-                      "assign",
-                      "assume",
-                      "automatic",
-                      "before",
-                      "begin",
-                      "bind",
-                      "bins",
-                      "binsof",
-                      "bit",
-                      "break",
-                      "buf",
-                      "bufif0",
-                      "bufif1",
-                      "byte",
-                      "case",
-                      "casex",
-                      "casez",
-                      "cell",
-                      "chandle",
-                      "checker",
-                      "class",
-                      "clocking",
-                      "cmos",
-                      "config",
-                      "const",
-                      "constraint",
-                      "context",
-                      "continue",
-                      "cover",
-                      "covergroup",
-                      "coverpoint",
-                      "cross",
-                      "deassign",
-                      "default",
-                      "defparam",
-                      "disable",
-                      "dist",
-                      "do",
-                      "edge",
-                      "else",
-                      "end",
-                      "endcase",
-                      "endchecker",
-                      "endclass",
-                      "endclocking",
-                      "endconfig",
-                      "endfunction",
-                      "endgenerate",
-                      "endgroup",
-                      "endinterface",
-                      "endmodule",
-                      "endpackage",
-                      "endprimitive",
-                      "endprogram",
-                      "endproperty",
-                      "endsequence",
-                      "endspecify",
-                      "endtable",
-                      "endtask",
-                      "enum",
-                      "event",
-                      "eventually",
-                      "expect",
-                      "export",
-                      "extends",
-                      "extern",
-                      "final",
-                      "first_match",
-                      "for",
-                      "force",
-                      "foreach",
-                      "forever",
-                      "fork",
-                      "forkjoin",
-                      "function",
-                      "generate",
-                      "genvar",
-                      "global",
-                      "highz0",
-                      "highz1",
-                      "if",
-                      "iff",
-                      "ifnone",
-                      "ignore_bins",
-                      "illegal_bins",
-                      "implies",
-                      "import",
-                      "incdir",
-                      "include",
-                      "initial",
-                      "inout",
-                      "input",
-                      "inside",
-                      "instance",
-                      "int",
-                      "integer",
-                      "interface",
-                      "intersect",
-                      "join",
-                      "join_any",
-                      "join_none",
-                      "large",
-                      "let",
-                      "liblist",
-                      "library",
-                      "local",
-                      "localparam",
-                      "logic",
-                      "longint",
-                      "macromodule",
-                      "matches",
-                      "medium",
-                      "modport",
-                      "module",
-                      "nand",
-                      "negedge",
-                      "new",
-                      "nexttime",
-                      "nmos",
-                      "nor",
-                      "noshowcancelled",
-                      "not",
-                      "notif0",
-                      "notif1",
-                      "null",
-                      "or",
-                      "output",
-                      "package",
-                      "packed",
-                      "parameter",
-                      "pmos",
-                      "posedge",
-                      "primitive",
-                      "priority",
-                      "program",
-                      "property",
-                      "protected",
-                      "pull0",
-                      "pull1",
-                      "pulldown",
-                      "pullup",
-                      "pulsestyle_ondetect",
-                      "pulsestyle_onevent",
-                      "pure",
-                      "rand",
-                      "randc",
-                      "randcase",
-                      "randsequence",
-                      "rcmos",
-                      "real",
-                      "realtime",
-                      "ref",
-                      "reg",
-                      "reject_on",
-                      "release",
-                      "repeat",
-                      "restrict",
-                      "return",
-                      "rnmos",
-                      "rpmos",
-                      "rtran",
-                      "rtranif0",
-                      "rtranif1",
-                      "s_always",
-                      "scalared",
-                      "sequence",
-                      "s_eventually",
-                      "shortint",
-                      "shortreal",
-                      "showcancelled",
-                      "signed",
-                      "small",
-                      "s_nexttime",
-                      "solve",
-                      "specify",
-                      "specparam",
-                      "static",
-                      "string",
-                      "strong",
-                      "strong0",
-                      "strong1",
-                      "struct",
-                      "s_until",
-                      "super",
-                      "supply0",
-                      "supply1",
-                      "sync_accept_on",
-                      "sync_reject_on",
-                      "table",
-                      "tagged",
-                      "task",
-                      "this",
-                      "throughout",
-                      "time",
-                      "timeprecision",
-                      "timeunit",
-                      "tran",
-                      "tranif0",
-                      "tranif1",
-                      "tri",
-                      "tri0",
-                      "tri1",
-                      "triand",
-                      "trior",
-                      "trireg",
-                      "type",
-                      "typedef",
-                      "union",
-                      "unique",
-                      "unique0",
-                      "unsigned",
-                      "until",
-                      "until_with",
-                      "untypted",
-                      "use",
-                      "var",
-                      "vectored",
-                      "virtual",
-                      "void",
-                      "wait",
-                      "wait_order",
-                      "wand",
-                      "weak",
-                      "weak0",
-                      "weak1",
-                      "while",
-                      "wildcard",
-                      "wire",
-                      "with",
-                      "within",
-                      "wor",
-                      "xnor",
-                      "xor"]
-
-    def __init__(self, dep_file):
-        DepParser.__init__(self, dep_file)
-        self.preprocessor = VerilogPreprocessor()
+    reserved_words = frozenset(["accept_on",
+                                "alias",
+                                "always",
+                                "always_comb",
+                                "always_ff",
+                                "always_latch",
+                                "assert",
+                                "assign",
+                                "assume",
+                                "automatic",
+                                "before",
+                                "begin",
+                                "bind",
+                                "bins",
+                                "binsof",
+                                "bit",
+                                "break",
+                                "buf",
+                                "bufif0",
+                                "bufif1",
+                                "byte",
+                                "case",
+                                "casex",
+                                "casez",
+                                "cell",
+                                "chandle",
+                                "checker",
+                                "class",
+                                "clocking",
+                                "cmos",
+                                "config",
+                                "const",
+                                "constraint",
+                                "context",
+                                "continue",
+                                "cover",
+                                "covergroup",
+                                "coverpoint",
+                                "cross",
+                                "deassign",
+                                "default",
+                                "defparam",
+                                "disable",
+                                "dist",
+                                "do",
+                                "edge",
+                                "else",
+                                "end",
+                                "endcase",
+                                "endchecker",
+                                "endclass",
+                                "endclocking",
+                                "endconfig",
+                                "endfunction",
+                                "endgenerate",
+                                "endgroup",
+                                "endinterface",
+                                "endmodule",
+                                "endpackage",
+                                "endprimitive",
+                                "endprogram",
+                                "endproperty",
+                                "endsequence",
+                                "endspecify",
+                                "endtable",
+                                "endtask",
+                                "enum",
+                                "event",
+                                "eventually",
+                                "expect",
+                                "export",
+                                "extends",
+                                "extern",
+                                "final",
+                                "first_match",
+                                "for",
+                                "force",
+                                "foreach",
+                                "forever",
+                                "fork",
+                                "forkjoin",
+                                "function",
+                                "generate",
+                                "genvar",
+                                "global",
+                                "highz0",
+                                "highz1",
+                                "if",
+                                "iff",
+                                "ifnone",
+                                "ignore_bins",
+                                "illegal_bins",
+                                "implies",
+                                "import",
+                                "incdir",
+                                "include",
+                                "initial",
+                                "inout",
+                                "input",
+                                "inside",
+                                "instance",
+                                "int",
+                                "integer",
+                                "interface",
+                                "intersect",
+                                "join",
+                                "join_any",
+                                "join_none",
+                                "large",
+                                "let",
+                                "liblist",
+                                "library",
+                                "local",
+                                "localparam",
+                                "logic",
+                                "longint",
+                                "macromodule",
+                                "matches",
+                                "medium",
+                                "modport",
+                                "module",
+                                "nand",
+                                "negedge",
+                                "new",
+                                "nexttime",
+                                "nmos",
+                                "nor",
+                                "noshowcancelled",
+                                "not",
+                                "notif0",
+                                "notif1",
+                                "null",
+                                "or",
+                                "output",
+                                "package",
+                                "packed",
+                                "parameter",
+                                "pmos",
+                                "posedge",
+                                "primitive",
+                                "priority",
+                                "program",
+                                "property",
+                                "protected",
+                                "pull0",
+                                "pull1",
+                                "pulldown",
+                                "pullup",
+                                "pulsestyle_ondetect",
+                                "pulsestyle_onevent",
+                                "pure",
+                                "rand",
+                                "randc",
+                                "randcase",
+                                "randsequence",
+                                "rcmos",
+                                "real",
+                                "realtime",
+                                "ref",
+                                "reg",
+                                "reject_on",
+                                "release",
+                                "repeat",
+                                "restrict",
+                                "return",
+                                "rnmos",
+                                "rpmos",
+                                "rtran",
+                                "rtranif0",
+                                "rtranif1",
+                                "s_always",
+                                "scalared",
+                                "sequence",
+                                "s_eventually",
+                                "shortint",
+                                "shortreal",
+                                "showcancelled",
+                                "signed",
+                                "small",
+                                "s_nexttime",
+                                "solve",
+                                "specify",
+                                "specparam",
+                                "static",
+                                "string",
+                                "strong",
+                                "strong0",
+                                "strong1",
+                                "struct",
+                                "s_until",
+                                "super",
+                                "supply0",
+                                "supply1",
+                                "sync_accept_on",
+                                "sync_reject_on",
+                                "table",
+                                "tagged",
+                                "task",
+                                "this",
+                                "throughout",
+                                "time",
+                                "timeprecision",
+                                "timeunit",
+                                "tran",
+                                "tranif0",
+                                "tranif1",
+                                "tri",
+                                "tri0",
+                                "tri1",
+                                "triand",
+                                "trior",
+                                "trireg",
+                                "type",
+                                "typedef",
+                                "union",
+                                "unique",
+                                "unique0",
+                                "unsigned",
+                                "until",
+                                "until_with",
+                                "untypted",
+                                "use",
+                                "var",
+                                "vectored",
+                                "virtual",
+                                "void",
+                                "wait",
+                                "wait_order",
+                                "wand",
+                                "weak",
+                                "weak0",
+                                "weak1",
+                                "while",
+                                "wildcard",
+                                "wire",
+                                "with",
+                                "within",
+                                "wor",
+                                "xnor",
+                                "xor"])
+
+    def scan_provides(self, dep_file):
+        """Get the modules, interfaces and packages declared in the Verilog
+        file without preprocessing it. Return None if the file includes
+        other files or declares names built by macros, as only the full
+        parse can tell what such a file provides"""
+        provides = []
+        with map_file(dep_file.path) as buf:
+            for match in _SCAN_PROVIDE_PATTERN.finditer(buf):
+                if match.group("include") is not None:
+                    return None
+                name = match.group("name")
+                if name is None:
+                    continue
+                if name.startswith(b"`"):
+                    return None
+                rel_type = (DepRelation.PACKAGE
+                            if match.group("keyword") == b"package"
+                            else DepRelation.MODULE)
+                provides.append(
+                    DepRelation(decode(name), dep_file.library, rel_type))
+        return provides
 
     def parse(self, dep_file):
         """Parse the provided Verilog file and add to its properties
@@ -496,88 +965,78 @@ class VerilogParser(DepParser):
         # str(type(dep_file)))
 
         # Preprocess the file and add included files as dependencies
-        buf = self.preprocessor.preprocess(dep_file)
-        dep_file.included_files = self.preprocessor.included_files
+        file_content = read_text(dep_file.path)
+        if Prefilter(file_content).is_protected("verilog protected",
+                                                _KEYWORDS):
+            logging.debug("%s is encrypted, nothing to parse", dep_file.path)
+            dep_file.is_parsed = True
+            return
+        # The preprocessor holds the macros defined while preprocessing the
+        # file, so there is one per parse.
+        preprocessor = VerilogPreprocessor()
+        buf = preprocessor.preprocess(dep_file, file_content)
+        prefilter = Prefilter(buf)
+        dep_file.included_files = preprocessor.included_files
         logging.debug("%s has %d includes.", str(dep_file), len(dep_file.included_files))
 
-        # look for packages used inside in file
-        # it may generate false dependencies as package in SV can be used by:
+        tokens = _Tokens(buf)
+        # Classes and types, which can be used as scopes like packages:
+        #    my_class::my_function();
+        local_types = _scan_local_types(tokens)
+
+        # look for packages used inside in file, either imported:
         #    import my_package::*;
         # or directly
         #    logic var = my_package::MY_CONST;
-        # The same way constants and others can be imported directly from
-        # other modules:
-        #    logic var = my_other_module::MY_CONST;
-        # and HdlMake will anyway create dependency marking my_other_module as
-        # requested package
-        import_pattern = re.compile(r"(\w+) *::(\w+|\\*)")
-
-        def do_imports(text):
-            """Function to be applied by re.subn to every match of the
-            import_pattern in the Verilog code -- group() returns positive
-            matches as indexed plain strings. It adds the found USE
-            relations to the file"""
-            pkg_name = text.group(1)
-            logging.debug("file %s imports/uses %s.%s package",
-                          dep_file.path, dep_file.library, pkg_name)
-            dep_file.add_require(
-                DepRelation(pkg_name, dep_file.library, DepRelation.PACKAGE))
-        import_pattern.subn(do_imports, buf)
+        if prefilter.run_pass("verilog import", ("::",)):
+            for pkg_name in _scan_packages_used(tokens, local_types):
+                logging.debug("file %s imports/uses %s.%s package",
+                              dep_file.path, dep_file.library, pkg_name)
+                dep_file.add_require(DepRelation(
+                    pkg_name, dep_file.library, DepRelation.PACKAGE))
         # packages
-        m_inside_package = re.compile(
-            r"package\s+(\w+)\s*(?:\(.*?\))?\s*(.+?)endpackage",
-            re.DOTALL | re.MULTILINE)
-
-        def do_package(text):
-            """Function to be applied by re.subn to every match of the
-            m_inside_pattern in the Verilog code -- group() returns positive
-            matches as indexed plain strings. It adds the found PROVIDE
-            relations to the file"""
-            pkg_name = text.group(1)
-            logging.debug("found pacakge %s.%s", dep_file.library, pkg_name)
-            dep_file.add_provide(
-                DepRelation(pkg_name, dep_file.library, DepRelation.PACKAGE))
-        m_inside_package.subn(do_package, buf)
-
-        # modules and instantiations
-        m_inside_module = re.compile(
-            r"(?:module|interface)\s+(\w+)\s*(?:#\s*\(.*?\)\s*)?(?:\(.*?\))?\s*;\s*(.+?)"
-            r"(?:endmodule|endinterface)",
-            re.DOTALL | re.MULTILINE)
-        m_instantiation = re.compile(
-            r"\s*\b(\w+)\s+(?:#\s*\(.*?\)\s*)?(\w+)\s*(?:\[.*?\]\s*)?\(.*?\)$",
-            re.DOTALL | re.MULTILINE)
-
-        m_stmt = re.compile(r'''(?:\s*(?:(?:\b(?:function|task)\b.*?\bend(?:function|task)\b)|(?:\bbegin(?:\s*:\s*\w+)?)|(?:\bend\b(?:\s*:\s*\w+)?)|(?:end(?:generate|case)\b)|(?:\b(?:case|if|for)\s*\(.*?\))|(?:\b(?:else|generate)\b)|\b(?:assign|localparam|wire|logic|reg)\b[^;]*?(?:=.*?)?;|\balways(?:_ff|_latch|_comb)?\b\s*(?:@\s*(?:\*|(?:\(.*?\))))?|;)\s*)+''',
-                            re.MULTILINE | re.DOTALL)
-
-        def do_module(text):
-            """Function to be applied by re.sub to every match of the
-            m_inside_module in the Verilog code -- group() returns
-            positive  matches as indexed plain strings. It adds the found
-            PROVIDE relations to the file"""
-            module_name = text.group(1)
-            logging.debug("found module %s.%s", dep_file.library, module_name)
-            dep_file.add_provide(
-                DepRelation(module_name, dep_file.library, DepRelation.MODULE))
-
-            def do_inst(text):
-                """Function to be applied by re.sub to every match of the
-                m_instantiation in the Verilog code -- group() returns positive
-                matches as indexed plain strings. It adds the found USE
-                relations to the file"""
-                mod_name = text.group(1)
-                if mod_name in self.reserved_words:
-                    # A gate (and, or, ...)
-                    return
-                logging.debug("-> instantiates %s.%s as %s",
-                              dep_file.library, mod_name, text.group(2))
-                dep_file.add_require(
-                    DepRelation(mod_name, dep_file.library, DepRelation.MODULE))
-            for stmt in [x for x in m_stmt.split(text.group(2)) if x and x[-1] == ")"]:
-                match = m_instantiation.match(stmt)
-                if match:
-                    do_inst(match)
-        m_inside_module.subn(do_module, buf)
+        if prefilter.run_pass("verilog package", ("endpackage",)):
+            for pkg_name in _scan_packages(tokens):
+                logging.debug("found package %s.%s",
+                              dep_file.library, pkg_name)
+                dep_file.add_provide(DepRelation(
+                    pkg_name, dep_file.library, DepRelation.PACKAGE))
+
+        # modules, instantiations and interface ports
+        if prefilter.run_pass("verilog module",
+                              ("endmodule", "endinterface")):
+            for module_name, instances, interfaces in _scan_modules(
+                    tokens, self.reserved_words, local_types):
+                logging.debug("found module %s.%s",
+                              dep_file.library, module_name)
+                dep_file.add_provide(DepRelation(
+                    module_name, dep_file.library, DepRelation.MODULE))
+                for mod_name, inst_name in instances:
+                    logging.debug("-> instantiates %s.%s as %s",
+                                  dep_file.library, mod_name, inst_name)
+                    dep_file.add_require(DepRelation(
+                        mod_name, dep_file.library, DepRelation.MODULE))
+                for if_name in interfaces:
+                    logging.debug("-> uses interface %s.%s",
+                                  dep_file.library, if_name)
+                    dep_file.add_require(DepRelation(
+                        if_name, dep_file.library, DepRelation.MODULE))
+
+        # virtual interfaces, used by classes
+        if prefilter.run_pass("verilog virtual interface", ("virtual",)):
+            for if_name in _scan_virtual_interfaces(tokens,
+                                                    self.reserved_words):
+                logging.debug("file %s uses virtual interface %s.%s",
+                              dep_file.path, dep_file.library, if_name)
+                dep_file.add_require(DepRelation(
+                    if_name, dep_file.library, DepRelation.MODULE))
+
+        # modules instantiated by bind statements
+        if prefilter.run_pass("verilog bind", ("bind",)):
+            for mod_name in _scan_binds(tokens, self.reserved_words):
+                logging.debug("file %s binds %s.%s",
+                              dep_file.path, dep_file.library, mod_name)
+                dep_file.add_require(DepRelation(
+                    mod_name, dep_file.library, DepRelation.MODULE))
 
         dep_file.is_parsed = True
@@ -22,36 +22,71 @@
 
 from __future__ import absolute_import
 import re
+import json
 import logging
 
 from xml.etree import ElementTree as ET
 
 from .new_dep_solver import DepParser
 from .dep_file import DepRelation
+from .source_reader import map_file
 from ..sourcefiles.srcfile import create_source_file
 
+# Path of the instance name below the root element of an XML XCI file,
+# ignoring the namespaces.
+_XML_NAME_PATH = ["componentInstances", "componentInstance", "instanceName"]
+# Beginning of a JSON XCI file, as written by recent Vivado releases.
+_JSON_HEAD_PATTERN = re.compile(br"(?:\xef\xbb\xbf)?\s*\{")
+# Instance name in a JSON XCI file.
+_JSON_NAME_PATTERN = re.compile(br'"xci_name"\s*:\s*"((?:\\.|[^"\\])*)"')
+
+
+def _get_xml_instance_name(xci_file):
+    """Get the instance name from the XML file object :param xci_file:,
+    parsing it only up to the name"""
+    path = []
+    for event, elem in ET.iterparse(xci_file, events=("start", "end")):
+        if event == "start":
+            path.append(elem.tag.rsplit("}", 1)[-1])
+            continue
+        if path[1:] == _XML_NAME_PATH:
+            return elem.text
+        path.pop()
+        # Don't keep the elements already walked, like the IP parameters.
+        elem.clear()
+    return None
+
+
+def _get_json_instance_name(buf):
+    """Get the instance name from the mapped JSON file :param buf:, only
+    scanned up to the name"""
+    match = _JSON_NAME_PATTERN.search(buf)
+    if match is None:
+        return None
+    return json.loads(b'"' + match.group(1) + b'"')
+
+
 class XCIParser(DepParser):
     """Class providing the Xilinx XCI parser"""
 
-    def __init__(self, dep_file):
-        DepParser.__init__(self, dep_file)
-
     def parse(self, dep_file):
-        """Parse a Xilinx XCI IP description file to determine the provided module(s)"""
+        """Parse a Xilinx XCI IP description file to determine the provided
+        module(s). Both the XML and the JSON formats are supported, and the
+        file is only read up to the component instance name"""
         assert not dep_file.is_parsed
         logging.debug("Parsing %s", dep_file.path)
 
-        with open(dep_file.path) as f:
-            # extract namespaces with a regex -- not really ideal, but without pulling in
-            # an external xml lib I can't think of a better way.
-            xmlnsre = re.compile(r'''\bxmlns:(\w+)\s*=\s*"(\w+://[^"]*)"''', re.MULTILINE)
-            xml = f.read()
-            nsmap = dict(xmlnsre.findall(xml))
-            value = ET.fromstring(xml).find('spirit:componentInstances/spirit:componentInstance/spirit:instanceName', nsmap)
-            if not value is None:
-                module_name = value.text
-                logging.debug("found module %s.%s", dep_file.library, module_name)
-                dep_file.add_provide(
-                    DepRelation(module_name, dep_file.library, DepRelation.MODULE))
+        with map_file(dep_file.path) as buf:
+            if _JSON_HEAD_PATTERN.match(buf):
+                module_name = _get_json_instance_name(buf)
+            elif buf:
+                # The mapped file is read like a file object by iterparse.
+                module_name = _get_xml_instance_name(buf)
+            else:
+                module_name = None
+        if module_name is not None:
+            logging.debug("found module %s.%s", dep_file.library, module_name)
+            dep_file.add_provide(
+                DepRelation(module_name, dep_file.library, DepRelation.MODULE))
 
         dep_file.is_parsed = True
@@ -46,6 +46,8 @@ class ToolIcestorm(MakefileSyn):
 
     HDL_FILES = {VerilogFile: 'read_verilog $(sourcefile)'}
 
+    VLOG_DEFINES = {'SYNTHESIS': '1', 'YOSYS': '1'}
+
     CLEAN_TARGETS = {'clean': ["$(PROJECT).asc", "$(PROJECT).blif"],
                      'mrproper': ["$(PROJECT).bin"]}
 
@@ -44,6 +44,10 @@ class ToolIVerilog(MakefileSim):
 
     HDL_FILES = {VerilogFile: '', VHDLFile: '', SVFile: ''}
 
+    VLOG_DEFINES = {'__ICARUS__': '1'}
+
+    VLOG_OPT = 'iverilog_opt'
+
     CLEAN_TARGETS = {'clean': ["run.command", "ivl_vhdl_work", "work"],
                      'mrproper': ["*.vcd", "*.vvp"]}
 
@@ -25,6 +25,7 @@
 
 from __future__ import absolute_import
 import os
+import re
 import logging
 import six
 
@@ -32,6 +33,26 @@ from ..util import shell
 from ..util import path as path_mod
 
 
+_PLUS_DEFINE_PATTERN = re.compile(r"\+define((?:\+[^+\s]+)+)")
+_DASH_DEFINE_PATTERN = re.compile(r"(?:^|\s)-D\s*(\w+)(?:=(\S*))?")
+
+
+def parse_vlog_defines(flags):
+    """Get the Verilog macros defined by the '+define+NAME=VALUE' and
+    '-DNAME=VALUE' options in the :param flags: string, as a dictionary
+    mapping their names to their values"""
+    defines = {}
+    for match in _PLUS_DEFINE_PATTERN.finditer(flags):
+        for define in match.group(1)[1:].split("+"):
+            name, _, value = define.partition("=")
+            defines[name] = value
+    for match in _DASH_DEFINE_PATTERN.finditer(flags):
+        # Compilers define the macros given without value as 1
+        value = match.group(2)
+        defines[match.group(1)] = "1" if value is None else value
+    return defines
+
+
 class ToolMakefile(object):
 
     """Class that provides the Makefile writing methods and status"""
@@ -41,6 +62,10 @@ class ToolMakefile(object):
     STANDARD_LIBS = []
     CLEAN_TARGETS = {}
     SUPPORTED_FILES = {}
+    # Verilog macros predefined by the tool
+    VLOG_DEFINES = {}
+    # Manifest option holding the flags of the tool's Verilog compiler
+    VLOG_OPT = None
 
     def __init__(self):
         super(ToolMakefile, self).__init__()
@@ -58,6 +83,16 @@ class ToolMakefile(object):
         """Get the standard libs supported by the tool"""
         return self.STANDARD_LIBS
 
+    def get_vlog_defines(self, manifest_dict):
+        """Get the Verilog macros defined when the tool compiles the sources,
+        i.e. the predefined ones and the ones in its options in the
+        :param manifest_dict:"""
+        defines = dict(self.VLOG_DEFINES)
+        if self.VLOG_OPT is not None:
+            defines.update(parse_vlog_defines(
+                manifest_dict.get(self.VLOG_OPT) or ""))
+        return defines
+
     def get_parseable_files(self):
         """Get the parseable HDL file types supported by the tool"""
         return self.HDL_FILES
@@ -45,6 +45,8 @@ class MakefileVsim(MakefileSim):
 
     HDL_FILES = {VerilogFile: '', VHDLFile: '', SVFile: ''}
 
+    VLOG_OPT = "vlog_opt"
+
     def __init__(self):
         super(MakefileVsim, self).__init__()
         # These are variables that will be set in the makefile
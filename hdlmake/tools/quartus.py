@@ -49,6 +49,8 @@ class ToolQuartus(MakefileSyn):
 
     STANDARD_LIBS = ['altera', 'altera_mf', 'lpm', 'ieee', 'std']
 
+    VLOG_DEFINES = {'ALTERA_RESERVED_QIS': '1'}
+
     _QUARTUS_SOURCE = 'set_global_assignment -name {0} $(sourcefile)'
 
     SUPPORTED_FILES = {
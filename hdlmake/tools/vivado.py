@@ -46,6 +46,8 @@ class ToolVivado(ToolXilinx):
 
     STANDARD_LIBS = ['ieee', 'std']
 
+    VLOG_DEFINES = {'SYNTHESIS': '1'}
+
     SUPPORTED_FILES = {
          XDCFile: ToolXilinx._XILINX_SOURCE,
          XCFFile: ToolXilinx._XILINX_SOURCE,
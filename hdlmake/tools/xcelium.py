@@ -50,6 +50,8 @@ class ToolXceliumSim(MakefileSim):
 
     HDL_FILES = {VerilogFile: '', VHDLFile: '', SVFile: ''}
 
+    VLOG_OPT = 'vlog_opt'
+
     CLEAN_TARGETS = {'clean': ['cds.lib', 'xm*.log','hdl.var', '.simvision', 'xmsim.key'],
                      'mrproper': []}
 
@@ -0,0 +1,7 @@
+action = "simulation"
+
+sim_tool="modelsim"
+
+top_module = "top"
+
+files = [ "top.vhd", "enc_ip.vhd", "consts.vhd" ]
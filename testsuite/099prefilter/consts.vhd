@@ -0,0 +1,3 @@
+package consts is
+  constant WIDTH : natural := 8;
+end consts;
@@ -0,0 +1,10 @@
+`protect begin_protected
+`protect version = 1
+`protect encrypt_agent = "Example"
+`protect data_method = "aes128-cbc"
+`protect encoding = (enctype = "base64", line_length = 64, bytes = 96)
+`protect data_block
+use work.missing_pkg.all;
+ZW50aXR5IGVuY19pcCBpcwogIHBvcnQgKGNsayA6IGluIHN0ZF9sb2dpYyk7CmVu
+inner: entity work.missing_entity port map (clk => clk);
+`protect end_protected
@@ -0,0 +1,13 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use work.consts.all;
+
+entity top is
+  port (clk : in std_logic);
+end top;
+
+architecture rtl of top is
+begin
+  inst: entity work.enc_ip
+    port map (clk => clk);
+end rtl;
@@ -0,0 +1,8 @@
+action = "simulation"
+
+sim_tool="iverilog"
+
+top_module = "top"
+
+include_dirs = ['inc']
+files = [ "top.v", "sub.v"]
@@ -0,0 +1,3 @@
+// Shared by all of the files
+`define WIDTH 8
+`define SUB sub
@@ -0,0 +1,5 @@
+`include "defs.vh"
+
+module sub;
+  wire [`WIDTH-1:0] data;
+endmodule
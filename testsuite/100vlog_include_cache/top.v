@@ -0,0 +1,5 @@
+`include "defs.vh"
+
+module top;
+  `SUB u_sub ();
+endmodule
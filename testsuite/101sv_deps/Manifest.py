@@ -0,0 +1,7 @@
+action = "simulation"
+
+sim_tool="modelsim"
+
+top_module = "tb"
+
+files = [ "pkg.sv", "bus_if.sv", "dut.sv", "chk.sv", "binds.sv", "tb.sv" ]
@@ -0,0 +1 @@
+bind dut chk u_chk (.clk(bus.clk));
@@ -0,0 +1,5 @@
+interface bus_if (input logic clk);
+  logic [7:0] data;
+  modport master (output data);
+  modport slave (input data);
+endinterface
@@ -0,0 +1,2 @@
+module chk (input logic clk);
+endmodule
@@ -0,0 +1,5 @@
+module dut import pkg::*; (bus_if.slave bus, input logic rst);
+  typedef struct packed { logic [3:0] a; logic [3:0] b; } pair_t;
+  pkg::state_t state;
+  initial $display("not::a_package");
+endmodule
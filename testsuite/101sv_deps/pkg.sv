@@ -0,0 +1,9 @@
+package pkg;
+  typedef enum logic [1:0] {IDLE, BUSY} state_t;
+  class item;
+    static function item create();
+      item it = new();
+      return it;
+    endfunction
+  endclass
+endpackage
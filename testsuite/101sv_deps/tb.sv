@@ -0,0 +1,13 @@
+module tb;
+  class driver;
+    virtual bus_if vif;
+    function void run();
+      pkg::item it = pkg::item::create();
+      void'(std::randomize(it));
+      this.vif = null;
+    endfunction
+  endclass
+  logic clk;
+  bus_if u_bus (.clk(clk));
+  dut u_dut (.bus(u_bus.slave), .rst(1'b0));
+endmodule
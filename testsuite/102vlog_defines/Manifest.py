@@ -0,0 +1,11 @@
+action = "simulation"
+
+sim_tool = "iverilog"
+
+top_module = "top"
+
+vlog_defines = {"USE_FAST": None}
+
+iverilog_opt = "-DWITH_MONITOR -g2012"
+
+files = [ "top.v", "cells.v", "monitor.v", "icarus_model.v" ]
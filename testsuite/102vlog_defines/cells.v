@@ -0,0 +1,5 @@
+module fast_cell;
+endmodule
+
+module slow_cell;
+endmodule
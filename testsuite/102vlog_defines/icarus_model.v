@@ -0,0 +1,2 @@
+module icarus_model;
+endmodule
@@ -0,0 +1,2 @@
+module monitor;
+endmodule
@@ -0,0 +1,15 @@
+module top;
+`ifdef USE_FAST
+  fast_cell u_cell ();
+`else
+  slow_cell u_cell ();
+`endif
+`ifdef WITH_MONITOR
+  monitor u_monitor ();
+`endif
+`ifdef __ICARUS__
+  icarus_model u_model ();
+`else
+  vendor_model u_model ();
+`endif
+endmodule
@@ -0,0 +1,8 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "top"
+
+files = [ "pkg.vhd", "pkg_body.vhd", "counter.vhd", "counter_rtl.vhd",
+          "top.vhd" ]
@@ -0,0 +1,9 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+use work.pkg.all;
+
+entity counter is
+  port (clk : in std_logic;
+        value : out natural range 0 to 2**WIDTH - 1);
+end counter;
@@ -0,0 +1,13 @@
+use work.pkg.all;
+
+architecture rtl of counter is
+  signal count : natural := 0;
+begin
+  process (clk)
+  begin
+    if rising_edge(clk) then
+      count <= next_value(count);
+    end if;
+  end process;
+  value <= count;
+end rtl;
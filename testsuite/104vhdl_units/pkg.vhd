@@ -0,0 +1,4 @@
+package pkg is
+  constant WIDTH : natural := 8;
+  function next_value (value : natural) return natural;
+end pkg;
@@ -0,0 +1,6 @@
+package body pkg is
+  function next_value (value : natural) return natural is
+  begin
+    return (value + 1) mod 2**WIDTH;
+  end function;
+end pkg;
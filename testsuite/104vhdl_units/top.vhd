@@ -0,0 +1,16 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+use work.pkg.all;
+
+entity top is
+end top;
+
+architecture sim of top is
+  signal clk : std_logic := '0';
+  signal value : natural;
+begin
+  clk <= not clk after 5 ns;
+  u_counter : entity work.counter
+    port map (clk => clk, value => value);
+end sim;
@@ -0,0 +1,8 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "tb_cfg"
+
+files = [ "proj_ctx.vhd", "types_pkg.vhd", "gen_fifo_pkg.vhd", "fifo_pkg.vhd",
+          "counter.vhd", "monitor.vhd", "tb.vhd", "tb_cfg.vhd", "unused.vhd" ]
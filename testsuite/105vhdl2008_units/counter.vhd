@@ -0,0 +1,13 @@
+context work.proj_ctx;
+use work.fifo_pkg.all;
+
+entity counter is
+  port (clk : in std_logic;
+        value : out count_t);
+end entity counter;
+
+architecture rtl of counter is
+  signal history : fifo_t;
+begin
+  value <= 0;
+end architecture rtl;
@@ -0,0 +1,2 @@
+package fifo_pkg is new work.gen_fifo_pkg
+  generic map (DEPTH => 16);
@@ -0,0 +1,4 @@
+package gen_fifo_pkg is
+  generic (DEPTH : natural);
+  type fifo_t is array (0 to DEPTH - 1) of natural;
+end package gen_fifo_pkg;
@@ -0,0 +1,14 @@
+context work.proj_ctx;
+
+entity monitor is
+  port (value : in count_t);
+end entity monitor;
+
+architecture sim of monitor is
+begin
+end architecture sim;
+
+configuration monitor_cfg of monitor is
+  for sim
+  end for;
+end configuration monitor_cfg;
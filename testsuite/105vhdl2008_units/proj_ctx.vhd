@@ -0,0 +1,5 @@
+context proj_ctx is
+  library ieee;
+  context ieee.ieee_std_context;
+  use work.types_pkg.all;
+end context proj_ctx;
@@ -0,0 +1,19 @@
+context work.proj_ctx;
+
+entity tb is
+end entity tb;
+
+architecture sim of tb is
+  component counter is
+    port (clk : in std_logic;
+          value : out count_t);
+  end component counter;
+  signal clk : std_logic := '0';
+  signal value : count_t;
+begin
+  clk <= not clk after 5 ns;
+  u_dut : counter
+    port map (clk => clk, value => value);
+  u_mon : configuration work.monitor_cfg
+    port map (value => value);
+end architecture sim;
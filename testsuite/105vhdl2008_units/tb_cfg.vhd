@@ -0,0 +1,7 @@
+configuration tb_cfg of tb is
+  for sim
+    for u_dut : counter
+      use entity work.counter(rtl);
+    end for;
+  end for;
+end configuration tb_cfg;
@@ -0,0 +1,3 @@
+package types_pkg is
+  subtype count_t is natural range 0 to 255;
+end package types_pkg;
@@ -0,0 +1,2 @@
+entity unused is
+end entity unused;
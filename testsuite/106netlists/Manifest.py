@@ -0,0 +1,7 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "tb"
+
+files = [ "tb.v", "counter.vo", "filter.vho", "unused.vm" ]
@@ -0,0 +1,7 @@
+module tb;
+  reg clk = 0;
+  wire [1:0] q;
+  always #5 clk = ~clk;
+  counter u_counter (.clk(clk), .q(q));
+  filter u_filter (.clk(clk));
+endmodule
@@ -0,0 +1,9 @@
+// Modle crit sous Windows
+`define USE_FAST
+module top (input a);
+`ifdef USE_FAST
+  fast_cell u_cell (.a(a));
+`else
+  slow_cell u_cell (.a(a));
+`endif
+endmodule
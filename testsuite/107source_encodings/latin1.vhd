@@ -0,0 +1,7 @@
+-- Compteur crit  la main,  2009
+library ieee;
+use ieee.std_logic_1164.all;
+
+entity compteur is
+  port (clk : in std_logic); -- entre
+end compteur;
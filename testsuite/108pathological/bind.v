@@ -0,0 +1,2 @@
+module top; endmodule
+bind a.b.c.d[
@@ -0,0 +1,9 @@
+use ieee.std_logic_1164.all;
+
+
+
+
+
+
+
+
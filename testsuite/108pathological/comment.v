@@ -0,0 +1,2 @@
+module top; endmodule
+/* unterminated
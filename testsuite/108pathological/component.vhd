@@ -0,0 +1,2 @@
+use ieee.std_logic_1164.all;
+  component c is port (a : in bit);
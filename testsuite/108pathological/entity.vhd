@@ -0,0 +1,2 @@
+use ieee.std_logic_1164.all;
+entity e is port (a : in bit)
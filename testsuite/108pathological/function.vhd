@@ -0,0 +1,2 @@
+use ieee.std_logic_1164.all;
+  function f return bit is begin end function
@@ -0,0 +1,3 @@
+module m (
+module m;
+  function f;
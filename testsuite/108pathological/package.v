@@ -0,0 +1,2 @@
+endpackage
+package p;
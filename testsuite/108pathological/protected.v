@@ -0,0 +1,2 @@
+module top; endmodule
+`pragma protect begin_protected
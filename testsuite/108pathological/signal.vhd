@@ -0,0 +1,3 @@
+use ieee.std_logic_1164.all;
+  signal s : bit
+  constant c : bit
@@ -0,0 +1,2 @@
+module top; endmodule
+typedef struct { logic a;
@@ -0,0 +1,9 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "tb"
+
+files = [ "tb.v", "top.vhd" ]
+
+library_dirs = [ "cells" ]
@@ -0,0 +1,13 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+-- Shadowed by and_cell.v, whose extension is listed first
+entity and_cell is
+  port (a, b : in std_logic;
+        y    : out std_logic);
+end and_cell;
+
+architecture rtl of and_cell is
+begin
+  y <= a and b;
+end rtl;
@@ -0,0 +1,9 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+package cell_pkg is
+  component and_cell
+    port (a, b : in std_logic;
+          y    : out std_logic);
+  end component;
+end cell_pkg;
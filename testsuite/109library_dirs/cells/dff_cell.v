@@ -0,0 +1,3 @@
+module dff_cell (input clk, input d, output reg q);
+   always @(posedge clk) q <= d;
+endmodule
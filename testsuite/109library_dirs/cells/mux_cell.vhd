@@ -0,0 +1,12 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+entity mux_cell is
+  port (a, b : in std_logic;
+        y    : out std_logic);
+end mux_cell;
+
+architecture rtl of mux_cell is
+begin
+  y <= a or b;
+end rtl;
@@ -0,0 +1,6 @@
+module reg_cell (input clk, input d, output q);
+   wire d_sync;
+
+   sync_cell s0 (.clk(clk), .d(d), .q(d_sync));
+   dff_cell f0 (.clk(clk), .d(d_sync), .q(q));
+endmodule
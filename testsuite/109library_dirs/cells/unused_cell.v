@@ -0,0 +1,4 @@
+module unused_cell (input a, output y);
+   // Never required, so never parsed
+   missing_cell m0 (.a(a), .y(y));
+endmodule
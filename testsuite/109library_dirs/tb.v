@@ -0,0 +1,7 @@
+module tb;
+   reg clk, a, b;
+   wire q, y;
+
+   top dut (.a(a), .b(b), .y(y));
+   reg_cell r0 (.clk(clk), .d(y), .q(q));
+endmodule
@@ -0,0 +1,15 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use work.cell_pkg.all;
+
+entity top is
+  port (a, b : in std_logic;
+        y    : out std_logic);
+end top;
+
+architecture rtl of top is
+  signal n : std_logic;
+begin
+  u0 : entity work.mux_cell port map (a => a, b => b, y => n);
+  u1 : and_cell port map (a => n, b => b, y => y);
+end rtl;
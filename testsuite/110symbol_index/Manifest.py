@@ -0,0 +1,9 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "tb"
+
+files = [ "tb.v" ]
+
+modules = { "local" : [ "ip" ] }
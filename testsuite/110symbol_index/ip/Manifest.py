@@ -0,0 +1 @@
+files = [ "ip_top.vhd", "ip_core.v", "ip_defs.vh" ]
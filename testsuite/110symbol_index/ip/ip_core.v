@@ -0,0 +1,5 @@
+`include "ip_defs.vh"
+
+module ip_core (input clk, output reg [`IP_WIDTH-1:0] q);
+   always @(posedge clk) q <= q + 1;
+endmodule
@@ -0,0 +1 @@
+`define IP_WIDTH 8
@@ -0,0 +1,16 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+entity ip_top is
+  port (clk : in std_logic;
+        q   : out std_logic_vector(7 downto 0));
+end ip_top;
+
+architecture rtl of ip_top is
+  component ip_core
+    port (clk : in std_logic;
+          q   : out std_logic_vector(7 downto 0));
+  end component;
+begin
+  u0 : ip_core port map (clk => clk, q => q);
+end rtl;
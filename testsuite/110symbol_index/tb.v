@@ -0,0 +1,6 @@
+module tb;
+   reg clk;
+   wire [7:0] q;
+
+   ip_top dut (.clk(clk), .q(q));
+endmodule
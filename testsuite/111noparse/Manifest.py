@@ -0,0 +1,18 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "top"
+
+files = [ "top.vhd", "rom_pkg.vhd", "secure_ip.vhd", "blackbox.v" ]
+
+# rom_pkg.vhd is generated and huge, and secure_ip.vhd is encrypted
+file_relations = {
+    "rom_pkg.vhd" : { "provides" : "package rom_pkg",
+                      "requires" : "package ieee.std_logic_1164" },
+    "secure_ip.vhd" : { "provides" : [ "entity secure_ip",
+                                       "architecture secure_ip" ],
+                        "requires" : "package rom_pkg" },
+}
+
+noparse_files = [ "blackbox.v" ]
@@ -0,0 +1,9 @@
+-- Not parsed: the declared relations are used instead, so the missing
+-- package below is not required.
+library ieee;
+use ieee.std_logic_1164.all;
+use work.missing_pkg.all;
+
+package rom_pkg is
+  constant ROM_SIZE : natural := 4;
+end rom_pkg;
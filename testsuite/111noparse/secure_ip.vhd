@@ -0,0 +1,4 @@
+`pragma protect begin_protected
+`pragma protect data_block
+ZW5jcnlwdGVkIG1vZGVsIG5vdCByZWFsbHkgYSB2aGRsIGZpbGU=
+`pragma protect end_protected
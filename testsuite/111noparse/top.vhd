@@ -0,0 +1,12 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use work.rom_pkg.all;
+
+entity top is
+  port (clk : in std_logic);
+end top;
+
+architecture rtl of top is
+begin
+  u0 : entity work.secure_ip port map (clk => clk);
+end rtl;
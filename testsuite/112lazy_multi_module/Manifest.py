@@ -0,0 +1,7 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "top"
+
+files = [ "ab.v", "top.v", "unused.v" ]
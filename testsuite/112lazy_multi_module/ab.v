@@ -0,0 +1,10 @@
+module a (input x, output y);
+   assign y = x;
+endmodule
+module b (input x, output y);
+   a a0 (.x(x), .y(y));
+endmodule
+
+macromodule automatic c (input x, output y);
+   assign y = ~x;
+endmodule
@@ -0,0 +1,6 @@
+module top;
+   wire x, y, z;
+
+   b b0 (.x(x), .y(y));
+   c c0 (.x(y), .y(z));
+endmodule
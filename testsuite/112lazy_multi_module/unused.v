@@ -0,0 +1,3 @@
+module unused;
+   missing m0 ();
+endmodule
@@ -0,0 +1,10 @@
+action = "simulation"
+
+sim_tool = "modelsim"
+
+sim_top = "top"
+
+files = [ "top.v", "mid.v", "leaf.v", "bb.v" ]
+
+# bb.v is a black box providing the module x
+file_relations = { "bb.v" : { "provides" : "module x" } }
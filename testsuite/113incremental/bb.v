@@ -0,0 +1 @@
+// Never read: the relations are declared in the manifest.
@@ -0,0 +1,2 @@
+module leaf;
+endmodule
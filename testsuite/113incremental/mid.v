@@ -0,0 +1,3 @@
+module mid;
+   leaf l0 ();
+endmodule
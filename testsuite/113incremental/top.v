@@ -0,0 +1,4 @@
+module top;
+   mid m0 ();
+   x x0 ();
+endmodule
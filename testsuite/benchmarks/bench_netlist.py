@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Benchmark of the netlist fast path on a generated post-synthesis
+Verilog netlist, 100 MB by default, compared with the Verilog parser.
+The peak memory used by each parse is printed too.
+
+Usage: python testsuite/benchmarks/bench_netlist.py [SIZE_MB [--full]]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", ".."))
+
+from hdlmake.sourcefiles.srcfile import VerilogFile, VerilogNetlistFile
+
+
+HEADER = """\
+// Generated to exercise the netlist parsers
+`timescale 1 ps/ 1 ps
+module top (clk, q);
+input clk;
+output [7:0] q;
+"""
+
+CELL = """\
+(* keep = 1 *) cyclonev_lcell_comb \\cnt[{0}]~{1} (
+	.dataa(\\q[{0}]~reg0_q ),
+	.datab(\\cnt[{1}]~combout ),
+	.combout(\\cnt[{0}]~combout ));
+defparam \\cnt[{0}]~{1} .lut_mask = 64'h6666666666666666;
+dffeas \\q[{0}]~reg{1} (
+	.clk(clk),
+	.d(\\cnt[{0}]~combout ),
+	.q(\\q[{0}]~reg0_q ));
+"""
+
+
+def _generate(path, size):
+    """Write a Verilog netlist of about :param size: bytes at :param path:"""
+    written = 0
+    cell = 0
+    with open(path, "w") as netlist_file:
+        netlist_file.write(HEADER)
+        while written < size:
+            chunk = CELL.format(cell % 8, cell)
+            netlist_file.write(chunk)
+            written += len(chunk)
+            cell += 1
+        netlist_file.write("endmodule\n")
+
+
+def _run(klass, path):
+    """Parse the file at :param path: as a :param klass: and print the time
+    taken and, from a second parse, the peak memory allocated"""
+    dep_file = klass(path, None, "work")
+    start = time.time()
+    dep_file.parser.parse(dep_file)
+    elapsed = time.time() - start
+    traced_file = klass(path, None, "work")
+    tracemalloc.start()
+    traced_file.parser.parse(traced_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:>20} {:>10.2f} {:>10.1f}   {}".format(
+        klass.__name__, elapsed, peak / (1024.0 * 1024.0),
+        ", ".join(sorted(str(rel) for rel in dep_file.provides))))
+
+
+def main():
+    """Parse a generated netlist with the netlist fast path and, if
+    --full is given, with the Verilog parser"""
+    args = [arg for arg in sys.argv[1:] if arg != "--full"]
+    size = float(args[0]) if args else 100
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "top.vo")
+        _generate(path, int(size * 1024 * 1024))
+        print("{:>20} {:>10} {:>10}".format("parser", "seconds", "peak MB"))
+        _run(VerilogNetlistFile, path)
+        if "--full" in sys.argv[1:]:
+            _run(VerilogFile, path)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
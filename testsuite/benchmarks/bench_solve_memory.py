@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Benchmark of the memory used by the files and relations of a large
+design, and of the time taken to create, parse and solve them, on a
+generated design of 50k small VHDL and Verilog files by default. The
+resident memory is read from /proc, so the figures are only printed on
+Linux.
+
+Usage: python testsuite/benchmarks/bench_solve_memory.py [NUM_FILES]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import gc
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", ".."))
+
+from hdlmake.sourcefiles import new_dep_solver as dep_solver
+from hdlmake.sourcefiles.srcfile import create_source_file
+from hdlmake.sourcefiles.sourcefileset import SourceFileSet
+
+
+VHDL_UNIT = """\
+library ieee;
+use ieee.std_logic_1164.all;
+use work.pkg_{pkg}.all;
+
+entity unit_{num} is
+  port (clk : in std_logic; q : out std_logic);
+end unit_{num};
+
+architecture rtl of unit_{num} is
+begin
+  u0 : entity work.cell_{sub0} port map (clk => clk, q => q);
+  u1 : entity work.cell_{sub1} port map (clk => clk, q => open);
+end rtl;
+"""
+
+VHDL_PKG = """\
+library ieee;
+use ieee.std_logic_1164.all;
+
+package pkg_{num} is
+  constant WIDTH_{num} : natural := {num};
+end pkg_{num};
+"""
+
+VLOG_CELL = """\
+module cell_{num} (input clk, output q);
+   leaf_{leaf0} l0 (.clk(clk), .q(q));
+   leaf_{leaf1} l1 (.clk(clk), .q());
+endmodule
+"""
+
+VLOG_LEAF = """\
+module leaf_{num} (input clk, output reg q);
+   always @(posedge clk) q <= ~q;
+endmodule
+"""
+
+
+def _generate(root, num_files):
+    """Write the design in :param root: and return the paths of its files:
+    a quarter of VHDL units using packages and Verilog cells, which use
+    Verilog leaves, so that the relations are shared by many files"""
+    num_units = num_files // 4
+    num_cells = num_files // 4
+    num_pkgs = num_files // 20
+    num_leaves = num_files - num_units - num_cells - num_pkgs
+    paths = []
+
+    def _write(name, text):
+        path = os.path.join(root, name)
+        with open(path, "w") as hdl_file:
+            hdl_file.write(text)
+        paths.append(path)
+    for num in range(num_units):
+        _write("unit_%d.vhd" % num, VHDL_UNIT.format(
+            num=num, pkg=num % num_pkgs, sub0=num % num_cells,
+            sub1=(num * 7) % num_cells))
+    for num in range(num_pkgs):
+        _write("pkg_%d.vhd" % num, VHDL_PKG.format(num=num))
+    for num in range(num_cells):
+        _write("cell_%d.v" % num, VLOG_CELL.format(
+            num=num, leaf0=num % num_leaves, leaf1=(num * 3) % num_leaves))
+    for num in range(num_leaves):
+        _write("leaf_%d.v" % num, VLOG_LEAF.format(num=num))
+    return paths
+
+
+def _rss_mb():
+    """Get the resident memory of the process in MB, None if unknown"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except IOError:
+        pass
+    return None
+
+
+def _report(label, seconds, rss_mb, base_mb):
+    """Print the time and memory of a stage"""
+    if rss_mb is None:
+        print("%-8s %7.2f s" % (label, seconds))
+    else:
+        print("%-8s %7.2f s %8.1f MB" % (label, seconds, rss_mb - base_mb))
+
+
+def main():
+    """Generate the design, then create, parse and solve its files"""
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    root = tempfile.mkdtemp(prefix="hdlmake_bench_")
+    try:
+        paths = _generate(root, num_files)
+        gc.collect()
+        base_mb = _rss_mb() or 0.0
+        start = time.time()
+        fileset = SourceFileSet()
+        for path in paths:
+            fileset.add(create_source_file(path, None, library="work"))
+        create_time = time.time() - start
+        _report("create", create_time, _rss_mb(), base_mb)
+        start = time.time()
+        dep_solver.solve(fileset, ["ieee", "std"])
+        solve_time = time.time() - start
+        gc.collect()
+        _report("solve", solve_time, _rss_mb(), base_mb)
+        num_relations = sum(len(dep_file.provides) + len(dep_file.requires)
+                            for dep_file in fileset)
+        print("%d files, %d relations" % (len(fileset), num_relations))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
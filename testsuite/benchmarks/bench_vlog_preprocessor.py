@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of Hdlmake.
+#
+# Hdlmake is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Hdlmake is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Hdlmake.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Benchmark of the Verilog preprocessor on generated macro-heavy files of
+growing sizes, up to 50 MB by default. The time per MB must stay about
+constant for the preprocessor to scale linearly.
+
+Usage: python testsuite/benchmarks/bench_vlog_preprocessor.py [SIZE_MB ...]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", ".."))
+
+from hdlmake.sourcefiles.vlog_parser import VerilogPreprocessor
+
+
+INCLUDE = """\
+`ifndef BENCH_DEFINES_VH
+`define BENCH_DEFINES_VH
+`define WIDTH 32
+`define REG(name) reg [`WIDTH-1:0] name
+`endif
+"""
+
+CHUNK = """\
+// Block {0}: generated to exercise the preprocessor
+`include "bench_defines.vh"
+`define CELL_{0} cell_{1}
+module block_{0} (input clk, output [`WIDTH-1:0] q);
+  `REG(r);
+`ifdef USE_FAST
+  fast_cell u_fast (.clk(clk));
+`elsif CELL_{0}
+  `CELL_{0} u_cell (.clk(clk), .q(q));
+`else
+  slow_cell u_slow (.clk(clk));
+`endif
+  /* {2} */
+  assign q = r;
+endmodule
+"""
+
+
+def _generate(path, size):
+    """Write a Verilog file of about :param size: bytes at :param path:"""
+    written = 0
+    block = 0
+    with open(path, "w") as vlog_file:
+        while written < size:
+            chunk = CHUNK.format(block, block % 97, "x" * (block % 64))
+            vlog_file.write(chunk)
+            written += len(chunk)
+            block += 1
+
+
+class _BenchFile(object):
+
+    """Minimal stand-in for the VerilogFile preprocessed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.library = "work"
+        self.include_dirs = []
+
+
+def main():
+    """Preprocess a generated file for every size given in the command
+    line and print the time taken"""
+    sizes = [float(arg) for arg in sys.argv[1:]] or [6.25, 12.5, 25, 50]
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmp_dir, "bench_defines.vh"), "w") as inc:
+            inc.write(INCLUDE)
+        print("{:>10} {:>10} {:>10}".format("MB", "seconds", "s/MB"))
+        for size in sizes:
+            path = os.path.join(tmp_dir, "bench.v")
+            _generate(path, int(size * 1024 * 1024))
+            start = time.time()
+            VerilogPreprocessor().preprocess(_BenchFile(path))
+            elapsed = time.time() - start
+            print("{:>10.2f} {:>10.2f} {:>10.3f}".format(
+                size, elapsed, elapsed / size))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 
 import hdlmake.main
 from hdlmake.manifest_parser.configparser import ConfigParser
+import contextlib
+import logging
 import os
 import os.path
 import pytest
@@ -62,6 +64,29 @@ def run(args, **kwargs):
     with Config(**kwargs) as _:
         hdlmake.main.hdlmake(args)
 
+@contextlib.contextmanager
+def fixture_copy(path):
+    # Copy of the fixture at path, that the test can edit
+    copy = path + ".tmp"
+    shutil.rmtree(copy, ignore_errors=True)
+    shutil.copytree(path, copy)
+    try:
+        yield copy
+    finally:
+        shutil.rmtree(copy)
+
+def list_files(args, path, capsys):
+    run(args + ['list-files'], path=path)
+    return [os.path.basename(line)
+            for line in capsys.readouterr().out.splitlines()]
+
+def edit(path, old, new):
+    with open(path) as edited:
+        text = edited.read()
+    assert old in text
+    with open(path, "w") as edited:
+        edited.write(text.replace(old, new))
+
 def test_ise():
     run_compare(path="001ise")
 
@@ -136,6 +161,240 @@ def test_icarus_012():
 def test_icarus_include_083():
     run_compare(path="083icarus_include")
 
+def test_parallel_parse():
+    with Config(path="083icarus_include") as _:
+        hdlmake.main.hdlmake(['-j', '2', 'makefile'])
+        compare_makefile()
+
+def test_parse_cache(caplog):
+    with Config(path="083icarus_include") as _:
+        # The second run uses the cached relations
+        for counts in ["0 hits, 1 misses", "1 hits, 0 misses"]:
+            caplog.clear()
+            with caplog.at_level(logging.DEBUG):
+                hdlmake.main.hdlmake(['--cache', 'makefile'])
+            compare_makefile()
+            assert "Parse cache: %s" % counts in caplog.text
+        assert os.path.exists('.hdlmake_cache/parse_cache.json')
+        shutil.rmtree('.hdlmake_cache')
+
+def test_parse_cache_save(tmp_path, caplog):
+    # The runs sharing a cache dir write their own temporary file, and a
+    # cache that can't be saved is only a warning
+    from hdlmake.sourcefiles.parse_cache import ParseCache
+    caches = [ParseCache(str(tmp_path)) for _ in range(2)]
+    for cache in caches:
+        cache.store_graph(set(), {})
+    for cache in caches:
+        cache.save()
+    assert os.listdir(str(tmp_path)) == ["parse_cache.json"]
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a dir")
+    cache = ParseCache(str(blocked))
+    cache.store_graph(set(), {})
+    cache.save()
+    assert "Unable to save the parse cache" in caplog.text
+
+def test_parse_cache_prune(tmp_path):
+    # The entries of the files no longer in use are dropped when saving
+    from hdlmake.sourcefiles.parse_cache import ParseCache
+    from hdlmake.sourcefiles.srcfile import VerilogFile
+    cache = ParseCache(str(tmp_path))
+    paths = []
+    for name in ["a", "b"]:
+        path = tmp_path / (name + ".v")
+        path.write_text("module %s;\nendmodule\n" % name)
+        vlog_file = VerilogFile(str(path), None, "work")
+        vlog_file.parser.parse(vlog_file)
+        cache.store(vlog_file)
+        paths.append(str(path))
+    cache.save(set(paths))
+    assert sorted(ParseCache(str(tmp_path)).entries) == paths
+    cache.save(set(paths[:1]))
+    assert sorted(ParseCache(str(tmp_path)).entries) == paths[:1]
+
+def test_incremental_solve(capsys):
+    # After each change, the incremental solve gives the same list as
+    # a full solve
+    def check(path, expected):
+        assert list_files(['--incremental'], path, capsys) == expected
+        assert list_files([], path, capsys) == expected
+    with fixture_copy("113incremental") as path:
+        check(path, ["bb.v", "leaf.v", "mid.v", "top.v"])
+        # The second run reuses the graph solved by the first one
+        check(path, ["bb.v", "leaf.v", "mid.v", "top.v"])
+        # Changed requires, and added file
+        with open(os.path.join(path, "leaf2.v"), "w") as leaf2:
+            leaf2.write("module leaf2;\nendmodule\n")
+        edit(os.path.join(path, "Manifest.py"),
+             '"bb.v" ]', '"bb.v", "leaf2.v" ]')
+        edit(os.path.join(path, "mid.v"), "leaf l0", "leaf2 l0")
+        check(path, ["bb.v", "leaf2.v", "mid.v", "top.v"])
+        # Changed provides
+        edit(os.path.join(path, "leaf2.v"), "module leaf2", "module renamed")
+        check(path, ["bb.v", "mid.v", "top.v"])
+        edit(os.path.join(path, "leaf.v"), "module leaf", "module leaf2")
+        check(path, ["bb.v", "leaf.v", "mid.v", "top.v"])
+        # Removed file
+        edit(os.path.join(path, "Manifest.py"), '"mid.v", ', '')
+        check(path, ["bb.v", "top.v"])
+
+def test_incremental_declared_relations(capsys, caplog):
+    # The relations declared in the manifest are compared with the ones
+    # of the previous run, as bb.v is never read
+    with fixture_copy("113incremental") as path:
+        assert list_files(['--incremental'], path, capsys) == [
+            "bb.v", "leaf.v", "mid.v", "top.v"]
+        edit(os.path.join(path, "Manifest.py"), "module x", "module y")
+        caplog.clear()
+        assert list_files(['--incremental'], path, capsys) == [
+            "leaf.v", "mid.v", "top.v"]
+        assert "module 'work.x' in top.v not satisfied" in caplog.text
+        assert list_files([], path, capsys) == ["leaf.v", "mid.v", "top.v"]
+
+def test_incremental_cached_provider(capsys, caplog):
+    # f.v is parsed by a run that doesn't store the graph, so the next
+    # incremental solve finds it in the parse cache only: the files
+    # requiring the module it provides must still be solved again
+    with fixture_copy("113incremental") as path:
+        assert list_files(['--incremental'], path, capsys) == [
+            "bb.v", "leaf.v", "mid.v", "top.v"]
+        with open(os.path.join(path, "f.v"), "w") as f_file:
+            f_file.write("module x;\nendmodule\n")
+        edit(os.path.join(path, "Manifest.py"), '"bb.v" ]', '"bb.v", "f.v" ]')
+        list_files(['--cache'], path, capsys)
+        caplog.clear()
+        expected = ["bb.v", "f.v", "leaf.v", "mid.v", "top.v"]
+        assert list_files(['--incremental'], path, capsys) == expected
+        assert "satisfied by multiple (2) files" in caplog.text
+        assert list_files([], path, capsys) == expected
+
+def test_lazy_solve(capsys, caplog):
+    # Only level1.v and level0.v are parsed
+    with caplog.at_level(logging.INFO):
+        run(['--lazy', 'list-files', '--top', 'level1'],
+            path="053vlog_dep_level")
+    out = capsys.readouterr().out.splitlines()
+    assert [os.path.basename(line) for line in out] == [
+        "level0.v", "level1.v"]
+    assert "Lazy solve: 2 of 4 files" in caplog.text
+
+def test_lazy_multi_module(capsys, caplog):
+    # ab.v declares several modules, which are all found by the scan
+    from hdlmake.sourcefiles.srcfile import VerilogFile
+    ab_file = VerilogFile(os.path.abspath("112lazy_multi_module/ab.v"), None)
+    assert sorted(rel.obj_name for rel in
+                  ab_file.parser.scan_provides(ab_file)) == ["a", "b", "c"]
+    with caplog.at_level(logging.INFO):
+        run(['--lazy', 'list-files'], path="112lazy_multi_module")
+    out = capsys.readouterr().out.splitlines()
+    assert [os.path.basename(line) for line in out] == ["ab.v", "top.v"]
+    assert "Lazy solve: 2 of 3 files" in caplog.text
+    assert "not satisfied" not in caplog.text
+
+def test_vlog_scan_provides(tmp_path):
+    # More like a unittest: the bytes of the file are scanned, skipping
+    # the comments and strings, and the includes stop the scan
+    from hdlmake.sourcefiles.srcfile import VerilogFile
+    def scan(text):
+        path = tmp_path / "scan.v"
+        path.write_bytes(text)
+        vlog_file = VerilogFile(str(path), None)
+        provides = vlog_file.parser.scan_provides(vlog_file)
+        if provides is None:
+            return None
+        return sorted(rel.obj_name for rel in provides)
+    assert scan(b"// module a\n/* module b */\n$display(\"module c\");\n"
+                b"module /* name */ d;\nendmodule\n"
+                b"package static p;\nendpackage\n") == ["d", "p"]
+    assert scan(b"// `include \"x.vh\"\nmodule a;\nendmodule\n") == ["a"]
+    assert scan(b"`include \"x.vh\"\nmodule a;\nendmodule\n") is None
+    assert scan(b"module `NAME;\nendmodule\n") is None
+
+def test_vhdl_work_alias(tmp_path):
+    # More like a unittest: work names the library of the file in any case
+    from hdlmake.sourcefiles.dep_file import DepRelation
+    from hdlmake.sourcefiles.srcfile import VHDLFile
+    path = tmp_path / "alias.vhd"
+    path.write_text("use WORK.pkg.all;\n"
+                    "entity alias is end alias;\n"
+                    "architecture rtl of alias is begin\n"
+                    "  u0 : entity Work.leaf port map (clk => clk);\n"
+                    "end rtl;\n")
+    vhdl_file = VHDLFile(str(path), None, "lib1")
+    vhdl_file.parser.parse(vhdl_file)
+    assert DepRelation("pkg", "lib1", DepRelation.PACKAGE) in (
+        vhdl_file.requires)
+    assert DepRelation("leaf", "lib1", DepRelation.ENTITY) in (
+        vhdl_file.requires)
+
+def test_prefilter(capsys, caplog):
+    from hdlmake.sourcefiles import prefilter
+    run(['list-files'], path="099prefilter")
+    out = capsys.readouterr().out.splitlines()
+    assert [os.path.basename(line) for line in out] == [
+        "consts.vhd", "top.vhd"]
+    # The encrypted file is skipped, so nothing inside of it is required
+    assert "missing" not in caplog.text
+    stats = prefilter.get_stats()
+    assert stats["vhdl protected"][0] == 1
+    assert stats["vhdl entity"][0] == 1
+
+def test_prefilter_mapped_file(tmp_path, monkeypatch):
+    # More like a unittest: the keywords are looked for in any case in the
+    # mapped file, across the windows lowered one at a time
+    from hdlmake.sourcefiles import prefilter
+    from hdlmake.sourcefiles.dep_file import DepRelation
+    from hdlmake.sourcefiles.source_reader import map_file
+    from hdlmake.sourcefiles.srcfile import VHDLFile
+    monkeypatch.setattr(prefilter, "_WINDOW_SIZE", 16)
+    path = tmp_path / "first.vhd"
+    path.write_bytes(b"ENTITY first IS END first;\n" + b" " * 10 +
+                     b"Architecture rtl OF first IS BEGIN\n"
+                     b"  u0 : Entity WORK.leaf PORT MAP (clk => clk);\n"
+                     b"end rtl;\n")
+    with map_file(str(path)) as buf:
+        text = prefilter.Prefilter(buf, ignore_case=True)
+        assert text.has_any(["architecture"])
+        assert not text.has_any(["package", "configuration"])
+        assert not text.is_protected("test", ["entity"])
+    # The entity on the first line is found without a newline before it
+    entity = DepRelation("first", "work", DepRelation.ENTITY)
+    vhdl_file = VHDLFile(str(path), None, "work")
+    assert entity in vhdl_file.parser.scan_provides(vhdl_file)
+    vhdl_file.parser.parse(vhdl_file)
+    assert entity in vhdl_file.provides
+    assert DepRelation("leaf", "work", DepRelation.ENTITY) in (
+        vhdl_file.requires)
+
+def test_include_cache(capsys):
+    # defs.vh is included by both files, but only read once
+    from hdlmake.sourcefiles import include_cache
+    run(['list-files'], path="100vlog_include_cache")
+    out = capsys.readouterr().out.splitlines()
+    assert [os.path.basename(line) for line in out] == ["sub.v", "top.v"]
+    assert include_cache.get_stats() == {"hits": 1, "misses": 1}
+    # The counters of the parse workers are merged back, whichever worker
+    # read the file first
+    run(['-j', '2', 'list-files'], path="100vlog_include_cache")
+    capsys.readouterr()
+    assert sum(include_cache.get_stats().values()) == 2
+
+def test_vlog_defines(capsys, caplog):
+    # USE_FAST comes from the manifest, WITH_MONITOR from iverilog_opt and
+    # __ICARUS__ is predefined by the tool: slow_cell is not required
+    run(['list-files', '--top', 'top'], path="102vlog_defines")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "cells.v", "icarus_model.v", "monitor.v", "top.v"]
+    assert "not satisfied" not in caplog.text
+
+def test_parse_vlog_defines():
+    # More like a unittest
+    from hdlmake.tools.makefile import parse_vlog_defines
+    assert parse_vlog_defines("-sv +define+A+B=2 -DC -D D=x") == {
+        "A": "", "B": "2", "C": "1", "D": "x"}
+
 def test_libero():
     run_compare(path="013libero")
 
@@ -267,6 +526,17 @@ def test_err_fetch():
 def test_xci():
     run_compare(path="023xci")
 
+def test_xci_formats():
+    # The JSON format is supported, and the files are only read up to the
+    # instance name, so the rest of truncated.xci is never seen
+    from hdlmake.sourcefiles.srcfile import XCIFile
+    for path, name in [("023xci/ip.xci", "my_ip"),
+                       ("103xci_json/ip.xci", "clk_wiz_0"),
+                       ("103xci_json/truncated.xci", "fifo_0")]:
+        xci_file = XCIFile(os.path.abspath(path), None, "work")
+        xci_file.parser.parse(xci_file)
+        assert [rel.obj_name for rel in xci_file.provides] == [name]
+
 def test_vlog_parser():
     run_compare(path="024vlog_parser")
 
@@ -428,6 +698,377 @@ def test_dep_level():
     run(['list-files', '--reverse'], path="053vlog_dep_level")
     run(['list-files', '--top', 'level2'], path="053vlog_dep_level")
 
+def test_dep_level_tops(capsys):
+    run(['list-files', '--tops', 'level2,level0,missing'],
+        path="053vlog_dep_level")
+    out = capsys.readouterr().out.splitlines()
+    assert [os.path.basename(line) for line in out] == [
+        "# level2", "level0.v", "level1.v", "level2.v",
+        "# level0", "level0.v",
+        "# missing"]
+
+def test_dep_level_deep_chain():
+    # More like a unittest: a recursive walk would exceed the stack
+    from hdlmake.sourcefiles.dep_file import DepFile
+    files = [DepFile("/chain/f{}.v".format(i), None) for i in range(5000)]
+    for dep_file, required_file in zip(files[1:], files):
+        dep_file.depends_on.add(required_file)
+    assert files[-1].get_dep_level() == 4999
+    assert files[0].get_dep_level() == 0
+
+def test_dep_graph():
+    # More like a unittest: the edges are stored in the CSR arrays
+    from hdlmake.sourcefiles.dep_file import DepFile
+    from hdlmake.sourcefiles.dep_graph import DepGraph
+    files = [DepFile("/graph/f{}.v".format(i), None) for i in range(4)]
+    graph = DepGraph(reversed(files))
+    for row in [[], [0], [0, 1], [1]]:
+        graph.add_row(row)
+    assert files[0] in files[2].depends_on
+    assert files[3] not in files[2].depends_on
+    assert len(files[2].depends_on) == 2
+    assert sorted(graph.reachable([3])) == [0, 1, 3]
+    assert sorted(graph.reachable([1], reverse=True)) == [1, 2, 3]
+    assert graph.bitset_files(graph.closure([3])) == [
+        files[0], files[1], files[3]]
+    assert graph.closure([2, 3]) == 0b1111
+    assert files[3].get_dep_level() == 2
+
+def test_dep_graph_closure():
+    # More like a unittest: only the closures of the shared files are kept
+    from hdlmake.sourcefiles.dep_file import DepFile
+    from hdlmake.sourcefiles.dep_graph import DepGraph
+    files = [DepFile("/graph/f{}.v".format(i), None) for i in range(6)]
+    graph = DepGraph(files)
+    # f1 and f4 depend on each other, f0 and f1 are shared.
+    for row in [[], [0, 4], [0], [1, 2], [1], [3]]:
+        graph.add_row(row)
+    assert graph.closure([5]) == 0b111111
+    assert sorted(graph._closures) == [0, 1]
+    assert graph.closure([2, 4]) == 0b10111
+    assert graph.closure([3, 2]) == 0b11111
+    assert graph.closure([2]) == 0b101
+    assert sorted(graph._closures) == [0, 1]
+    graph.clear_closures()
+    assert not graph._closures
+    assert graph.closure([4]) == 0b10011
+
+def test_vlog_preprocessor():
+    # More like a unittest: nested conditionals, defines and macro expansions
+    from hdlmake.sourcefiles.vlog_parser import VerilogPreprocessor
+    class _File(object):
+        path = os.path.abspath("vlog.v")
+        library = "work"
+        include_dirs = []
+        vlog_defines = {}
+    text = ("`define CELL cell_a\n"
+            "`ifdef UNDEFINED\n"
+            "`ifndef CELL\n`define CELL cell_b\n`endif\n"
+            "`elsif CELL\n"
+            "`ifdef CELL\n`CELL u_a ();\n`else\ncell_c u_c ();\n`endif\n"
+            "`else\ncell_d u_d ();\n"
+            "`endif\n"
+            "`UNKNOWN u_e ();\n")
+    assert VerilogPreprocessor().preprocess(_File(), text) == (
+        "`define CELL cell_a\ncell_a u_a ();\n`UNKNOWN u_e ();\n")
+
+def test_vlog_module_scanner():
+    # More like a unittest: instantiations are found at statement starts
+    from hdlmake.sourcefiles.vlog_parser import (VerilogParser,
+        _Tokens, _scan_modules)
+    text = """
+module top #(parameter W = 8) (input clk, output [W-1:0] q);
+  import "DPI-C" function int c_model(input int a);
+  wire [W-1:0] data;
+  fifo#(.W(W)) u_fifo [1:0] (.clk(clk)), u_fifo2 (.clk(clk));
+  nand g_nand (q[0], data[0], data[1]);
+  my_module u_mine ();
+  (* keep = "true" *) (* dont_touch *) buffer u_buf (.a(data[0]));
+  assign data[1] = data[0] ? (* mark *) data[0] : 1'b0;
+  generate
+    for (i = 0; i < 2; i = i + 1) begin : g_ram
+      ram u_ram (.clk(clk));
+    end
+  endgenerate
+  function [W-1:0] inc;
+    input [W-1:0] x;
+    inc = add(x, 1);
+  endfunction
+  always @(posedge clk) if (f(data)) q <= inc(data);
+endmodule
+interface bus_if;
+endinterface
+"""
+    tokens = _Tokens(text)
+    assert list(_scan_modules(tokens, VerilogParser.reserved_words)) == [
+        ("top", [("fifo", "u_fifo"), ("my_module", "u_mine"),
+                 ("buffer", "u_buf"), ("ram", "u_ram")], []),
+        ("bus_if", [], [])]
+
+def test_sv_dependencies(capsys):
+    # Only the packages, interfaces and bound modules are required, not the
+    # classes, the keywords used as scopes nor the strings
+    from hdlmake.sourcefiles.srcfile import SVFile
+    requires = {}
+    for name in ["pkg.sv", "bus_if.sv", "dut.sv", "binds.sv", "tb.sv"]:
+        sv_file = SVFile(os.path.abspath(os.path.join("101sv_deps", name)),
+                         None, "work")
+        sv_file.parser.parse(sv_file)
+        requires[name] = sorted(rel.obj_name for rel in sv_file.requires)
+    assert requires == {"pkg.sv": [],
+                        "bus_if.sv": [],
+                        "dut.sv": ["bus_if", "pkg"],
+                        "binds.sv": ["chk"],
+                        "tb.sv": ["bus_if", "dut", "pkg"]}
+    run(['list-files', '--top', 'tb'], path="101sv_deps")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "bus_if.sv", "dut.sv", "pkg.sv", "tb.sv"]
+
+def test_vhdl_secondary_units(capsys):
+    # The package body and the architecture in their own files are part of
+    # the design, but only them are analyzed again when they change
+    from hdlmake.sourcefiles.srcfile import VHDLFile
+    from hdlmake.sourcefiles.dep_file import DepRelation
+    body = VHDLFile(os.path.abspath("104vhdl_units/pkg_body.vhd"),
+                    None, "work")
+    body.parser.parse(body)
+    assert body.provides == set(
+        [DepRelation("pkg", "work", DepRelation.PACKAGE_BODY)])
+    assert body.requires == set(
+        [DepRelation("pkg", "work", DepRelation.PACKAGE)])
+    run(['list-files', '--top', 'top'], path="104vhdl_units")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "counter.vhd", "counter_rtl.vhd", "pkg.vhd", "pkg_body.vhd",
+        "top.vhd"]
+    with Config(path="104vhdl_units") as _:
+        hdlmake.main.hdlmake(['makefile'])
+        with open("Makefile") as makefile:
+            rules = makefile.read()
+        os.remove("Makefile")
+    assert ("work/top/.top_vhd: top.vhd \\\n"
+            "work/counter/.counter_vhd \\\n"
+            "work/pkg/.pkg_vhd\n") in rules
+
+def test_vhdl2008_units(capsys, caplog):
+    # Contexts, configurations and package instantiations are relations
+    # too, and a configuration can be the top
+    from hdlmake.sourcefiles.srcfile import VHDLFile
+    from hdlmake.sourcefiles.dep_file import DepRelation
+    fifo_pkg = VHDLFile(os.path.abspath("105vhdl2008_units/fifo_pkg.vhd"),
+                        None, "work")
+    fifo_pkg.parser.parse(fifo_pkg)
+    assert fifo_pkg.provides == set(
+        [DepRelation("fifo_pkg", "work", DepRelation.PACKAGE)])
+    assert fifo_pkg.requires == set(
+        [DepRelation("gen_fifo_pkg", "work", DepRelation.PACKAGE)])
+    tb_file = VHDLFile(os.path.abspath("105vhdl2008_units/tb.vhd"),
+                       None, "work")
+    tb_file.parser.parse(tb_file)
+    assert DepRelation("proj_ctx", "work",
+                       DepRelation.CONTEXT) in tb_file.requires
+    assert DepRelation("monitor_cfg", "work",
+                       DepRelation.CONFIGURATION) in tb_file.requires
+    run(['list-files', '--top', 'tb_cfg'], path="105vhdl2008_units")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "counter.vhd", "fifo_pkg.vhd", "gen_fifo_pkg.vhd", "monitor.vhd",
+        "proj_ctx.vhd", "tb.vhd", "tb_cfg.vhd", "types_pkg.vhd"]
+    # The IEEE context is provided by the simulator
+    assert "not satisfied" not in caplog.text
+
+def test_library_dirs(capsys, caplog):
+    # The cells are only added when required, even indirectly, and
+    # and_cell.v is preferred to and_cell.vhd
+    for args in [['list-files'], ['--lazy', 'list-files']]:
+        run(args, path="109library_dirs")
+        out = capsys.readouterr().out.splitlines()
+        assert sorted(os.path.basename(line) for line in out) == [
+            "and_cell.v", "cell_pkg.vhd", "dff_cell.v", "mux_cell.vhd",
+            "reg_cell.v", "sync_cell.v", "tb.v", "top.vhd"]
+    assert "unused_cell" not in caplog.text
+    assert "not satisfied" not in caplog.text
+
+def test_symbol_index(capsys, caplog):
+    # The files of the module are not parsed by the design using it, until
+    # they change
+    from hdlmake.sourcefiles.srcfile import VerilogFile
+    from hdlmake.sourcefiles.symbol_index import SymbolIndex
+    with Config(path="110symbol_index") as _:
+        os.chdir("ip")
+        try:
+            hdlmake.main.hdlmake(['symbol-index'])
+        finally:
+            os.chdir("..")
+    try:
+        with caplog.at_level(logging.INFO):
+            run(['list-files'], path="110symbol_index")
+        out = capsys.readouterr().out.splitlines()
+        assert [os.path.basename(line) for line in out] == [
+            "ip_core.v", "ip_top.vhd", "tb.v"]
+        assert "3 files reused, 0 parsed" in caplog.text
+        index = SymbolIndex.load("110symbol_index/ip")
+        core = VerilogFile(os.path.abspath("110symbol_index/ip/ip_core.v"),
+                           None, "work", [])
+        core.vlog_defines = {}
+        assert index.lookup(core)
+        assert [rel.obj_name for rel in core.provides] == ["ip_core"]
+        # Changed defines or contents
+        core = VerilogFile(os.path.abspath("110symbol_index/ip/ip_core.v"),
+                           None, "work", [])
+        core.vlog_defines = {"IP_WIDTH": "16"}
+        assert not index.lookup(core)
+        index.entries["ip_core.v"]["included_files"]["ip_defs.vh"] = "0"
+        core.vlog_defines = {}
+        assert not index.lookup(core)
+    finally:
+        os.remove("110symbol_index/ip/hdlmake_index.json")
+
+def test_symbol_index_save(tmp_path, caplog):
+    # The runs writing the same index write their own temporary file, and
+    # an index that can't be saved is only a warning
+    from hdlmake.sourcefiles.symbol_index import SymbolIndex
+    indexes = [SymbolIndex(str(tmp_path)) for _ in range(2)]
+    for index in indexes:
+        assert index.save()
+    assert os.listdir(str(tmp_path)) == ["hdlmake_index.json"]
+    assert SymbolIndex.load(str(tmp_path)) is not None
+    assert not SymbolIndex(str(tmp_path / "missing")).save()
+    assert "Unable to save the symbol index" in caplog.text
+
+def test_noparse_files(capsys, caplog):
+    # The declared relations are used instead of parsing the files
+    from hdlmake.module.module import _parse_relation
+    from hdlmake.sourcefiles.dep_file import DepRelation
+    assert _parse_relation("Package IEEE.numeric_std", "work") == \
+        DepRelation("numeric_std", "ieee", DepRelation.PACKAGE)
+    assert _parse_relation("package body rom_pkg", "lib") == \
+        DepRelation("rom_pkg", "lib", DepRelation.PACKAGE_BODY)
+    assert _parse_relation("counter", "lib") == \
+        DepRelation("counter", "lib", DepRelation.ENTITY)
+    with pytest.raises(Exception):
+        _parse_relation("component counter", "work")
+    run(['list-files'], path="111noparse")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "rom_pkg.vhd", "secure_ip.vhd", "top.vhd"]
+    assert "missing" not in caplog.text
+    assert "not satisfied" not in caplog.text
+
+def test_interned_relations():
+    # Equal relations are shared, also after being sent to a parse worker,
+    # and the files of a language share their parser
+    import pickle
+    from hdlmake.sourcefiles.dep_file import DepRelation
+    from hdlmake.sourcefiles.srcfile import VHDLFile
+    rel = DepRelation("Counter", "Work", DepRelation.ENTITY)
+    assert rel is DepRelation("counter", "work", DepRelation.ENTITY)
+    assert pickle.loads(pickle.dumps(rel)) is rel
+    assert rel != DepRelation("counter", "work", DepRelation.ARCHITECTURE)
+    # Only the lowered names are interned, until the table is cleared
+    assert ((DepRelation.ENTITY, "work", "counter") in DepRelation._interned
+            and (DepRelation.ENTITY, "Work", "Counter")
+            not in DepRelation._interned)
+    DepRelation.clear_interned()
+    assert DepRelation("counter", "work", DepRelation.ENTITY) == rel
+    rel = DepRelation("counter", "work", DepRelation.ENTITY)
+    first = VHDLFile(os.path.abspath("104vhdl_units/pkg.vhd"), None)
+    second = VHDLFile(os.path.abspath("104vhdl_units/top.vhd"), None)
+    assert not hasattr(first, "__dict__")
+    assert first.parser is second.parser
+    copy = pickle.loads(pickle.dumps(first))
+    assert (copy.path, copy.library) == (first.path, "work")
+
+def test_netlists(capsys):
+    # The netlists only provide their units and require the cells and
+    # packages they use
+    from hdlmake.sourcefiles.srcfile import create_source_file
+    relations = {}
+    for name in ["counter.vo", "filter.vho", "unused.vm"]:
+        netlist = create_source_file(
+            os.path.abspath(os.path.join("106netlists", name)), None, "work")
+        netlist.parser.parse(netlist)
+        relations[name] = (sorted(rel.obj_name for rel in netlist.provides),
+                           sorted(rel.obj_name for rel in netlist.requires))
+    assert relations == {
+        "counter.vo": (["counter"],
+                       ["cyclonev_io_obuf", "cyclonev_lcell_comb", "dffeas"]),
+        "filter.vho": (["filter", "filter"],
+                       ["coeff_rom", "cyclonev_components", "filter",
+                        "mac_block", "std_logic_1164"]),
+        "unused.vm": (["unused"], ["lut1"])}
+    run(['list-files', '--top', 'tb'], path="106netlists")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "counter.vo", "filter.vho", "tb.v"]
+
+def test_lazy_netlists(capsys, caplog):
+    # The scan finds the units provided by the netlists, so unused.vm is
+    # never parsed
+    from hdlmake.sourcefiles.srcfile import create_source_file
+    for name in ["counter.vo", "filter.vho", "unused.vm"]:
+        netlist = create_source_file(
+            os.path.abspath(os.path.join("106netlists", name)), None, "work")
+        provides = netlist.parser.scan_provides(netlist)
+        netlist.parser.parse(netlist)
+        assert set(provides) == set(netlist.provides), name
+    with caplog.at_level(logging.DEBUG):
+        run(['--lazy', 'list-files', '--top', 'tb'], path="106netlists")
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(os.path.basename(line) for line in out) == [
+        "counter.vo", "filter.vho", "tb.v"]
+    assert "Parsing netlist" in caplog.text
+    assert "Parsing netlist %s" % os.path.abspath(
+        "106netlists/unused.vm") not in caplog.text
+    assert "Lazy solve: 3 of 4 files" in caplog.text
+
+def test_source_encodings():
+    # The files are read whatever their encoding and line endings
+    from hdlmake.sourcefiles.srcfile import VHDLFile, VerilogFile
+    vhdl_file = VHDLFile(
+        os.path.abspath("107source_encodings/latin1.vhd"), None, "work")
+    vhdl_file.parser.parse(vhdl_file)
+    assert [rel.obj_name for rel in vhdl_file.provides] == ["compteur"]
+    vlog_file = VerilogFile(
+        os.path.abspath("107source_encodings/crlf.v"), None, "work")
+    vlog_file.parser.parse(vlog_file)
+    assert [rel.obj_name for rel in vlog_file.requires] == ["fast_cell"]
+
+def test_pathological_sources(tmp_path):
+    # Every file of the corpus, repeated up to half a megabyte, is parsed in
+    # a bounded time: no scan may backtrack over the whole file again and
+    # again, as it did on unterminated constructs
+    import time
+    from hdlmake.sourcefiles.srcfile import create_source_file
+    for name in sorted(os.listdir("108pathological")):
+        with open(os.path.join("108pathological", name)) as seed_file:
+            seed = seed_file.read()
+        path = str(tmp_path / name)
+        with open(path, "w") as source_file:
+            source_file.write(seed * (512 * 1024 // len(seed)))
+        source_file = create_source_file(path, None, library="work")
+        start = time.time()
+        source_file.parser.parse(source_file)
+        assert time.time() - start < 3.0, name
+
+def test_vhdl_parser_conformance():
+    # The relations found in every VHDL file of the testsuite are the ones
+    # found by the former parser, which ran one re.sub pass per construct
+    import json
+    from hdlmake.sourcefiles.srcfile import VHDLFile
+    rel_names = {1: "entity", 2: "package", 3: "architecture"}
+    def _names(rels):
+        return sorted("%s %s.%s" % (rel_names[rel.rel_type], rel.lib_name,
+                                    rel.obj_name) for rel in rels)
+    with open("vhdl_relations.json") as ref_file:
+        reference = json.load(ref_file)
+    for path, relations in reference.items():
+        vhdl_file = VHDLFile(os.path.abspath(path), None, "work")
+        vhdl_file.parser.parse(vhdl_file)
+        assert _names(vhdl_file.provides) == relations["provides"], path
+        assert _names(vhdl_file.requires) == relations["requires"], path
+
 def test_modelsim_windows():
     assert hdlmake.util.shell.check_windows_tools() is False
     run_compare(path="057msim_windows", my_os='windows')